@@ -1,10 +1,29 @@
 # src/app.py
+import os
+
 from flask import Flask
+import database
+import metricas
+import consultas_lentas
+import backups
+from migrations import migrar
+from historico import compactar as compactar_historico
+from tarefas_lote import recuperar_tarefas
 from routes import api_bp  # ❌ cuidado: era "api_bp", não "api_protobuf"
 from web import web_bp           # ✅ sem "src."
 
 def create_app():
     app = Flask(__name__, template_folder='../templates')
+    database.init_app(app)  # pool de conexões + teardown no fim do app context
+    metricas.init_app(app)  # latência por rota e SQL por requisição (/api/metrics)
+    consultas_lentas.init_app(app)  # log opcional (SQLITE_CONSULTA_LENTA_MS)
+    backups.init_app(app)  # backups agendados opcionais (BACKUP_INTERVALO_MIN)
+    # Sob o gunicorn, o processo mestre já fez esta etapa (on_starting)
+    if os.environ.get('EQUIPAMENTOS_BANCO_PREPARADO') != '1':
+        with app.app_context():
+            migrar(database.get_db_connection())  # esquema, índice FTS5 e índices das consultas
+            compactar_historico(database.get_db_connection())  # retenção e agrupamento (incremental)
+        recuperar_tarefas()  # cargas interrompidas e espelhos antigos em LOTES_DIR
     app.register_blueprint(web_bp)
     app.register_blueprint(api_bp, url_prefix='/api')  # ← nome correto da variável
     return app
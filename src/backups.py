@@ -0,0 +1,348 @@
+# src/backups.py - Backups online do banco (API de backup do SQLite)
+#
+# Copiar o arquivo .db com o app gravando pode gerar uma cópia corrompida
+# (páginas de transações diferentes, WAL não incluído). A API de backup copia
+# uma fotografia consistente em passos de poucas páginas; entre um passo e
+# outro a thread dorme, e o SQLite fica livre para as requisições.
+#
+# Com BACKUP_INTERVALO_MIN > 0, uma thread do app gera os backups
+# periodicamente; cada backup é verificado antes de entrar na pasta, e só os
+# BACKUP_RETENCAO mais recentes são mantidos. Duração, reinícios e a
+# latência das requisições durante o backup vão para o log.
+#   python src/backups.py criar
+#   python src/backups.py listar
+#   python src/backups.py verificar [arquivo]
+#   python src/backups.py restaurar arquivo
+import argparse
+import logging
+import os
+import sqlite3
+import statistics
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import database
+import metricas
+
+try:
+    import fcntl  # trava entre processos (Linux/macOS)
+except ImportError:
+    fcntl = None
+
+BACKUP_DIR = os.path.abspath(os.environ.get(
+    'BACKUP_DIR',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'backups')
+))
+
+CONFIG = {
+    'BACKUP_INTERVALO_MIN': int(os.environ.get('BACKUP_INTERVALO_MIN', 0)),  # 0 = sem agendamento
+    'BACKUP_RETENCAO': int(os.environ.get('BACKUP_RETENCAO', 7)),
+    'BACKUP_PAGINAS_POR_PASSO': int(os.environ.get('BACKUP_PAGINAS_POR_PASSO', 256)),
+    'BACKUP_PAUSA_MS': int(os.environ.get('BACKUP_PAUSA_MS', 5)),
+}
+
+PREFIXO_ARQUIVO = 'equipamentos-'
+SUFIXO_ARQUIVO = '.db'
+
+_logger = logging.getLogger('equipamentos.backup')
+_lock = threading.Lock()  # um backup por vez neste processo
+_parar = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+# ============================================================================
+# LATÊNCIA DAS REQUISIÇÕES DURANTE O BACKUP
+# ============================================================================
+
+class _Latencias:
+    """Latências recentes (referência) e as observadas durante o backup"""
+
+    def __init__(self, tamanho_referencia: int = 1000):
+        self._referencia: deque = deque(maxlen=tamanho_referencia)
+        self._durante: Optional[List[float]] = None
+        self._lock = threading.Lock()
+
+    def observar(self, duracao: float) -> None:
+        with self._lock:
+            if self._durante is not None:
+                self._durante.append(duracao)
+            else:
+                self._referencia.append(duracao)
+
+    def iniciar(self) -> None:
+        with self._lock:
+            self._durante = []
+
+    def concluir(self) -> Dict[str, Any]:
+        with self._lock:
+            durante, self._durante = self._durante or [], None
+            referencia = list(self._referencia)
+        return {'durante': _resumir(durante), 'referencia': _resumir(referencia)}
+
+def _resumir(valores: List[float]) -> Dict[str, Any]:
+    if not valores:
+        return {'requisicoes': 0}
+    ordenados = sorted(valores)
+    return {
+        'requisicoes': len(valores),
+        'media_ms': round(statistics.fmean(valores) * 1000, 1),
+        'p95_ms': round(ordenados[int(0.95 * (len(ordenados) - 1))] * 1000, 1),
+        'max_ms': round(ordenados[-1] * 1000, 1),
+    }
+
+def _formatar_latencia(resumo: Dict[str, Any]) -> str:
+    if not resumo['requisicoes']:
+        return 'sem requisições'
+    return (f"{resumo['requisicoes']} req, média {resumo['media_ms']} ms, "
+            f"p95 {resumo['p95_ms']} ms, máx {resumo['max_ms']} ms")
+
+_latencias = _Latencias()
+
+# ============================================================================
+# BACKUP, VERIFICAÇÃO E RESTAURAÇÃO
+# ============================================================================
+
+def listar_backups(pasta: str = BACKUP_DIR) -> List[str]:
+    """Caminhos dos backups concluídos, do mais antigo ao mais recente"""
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(
+        os.path.join(pasta, nome) for nome in os.listdir(pasta)
+        if nome.startswith(PREFIXO_ARQUIVO) and nome.endswith(SUFIXO_ARQUIVO)
+    )
+
+def verificar_backup(caminho: str) -> Dict[str, Any]:
+    """integrity_check, versão do esquema e total de equipamentos do arquivo"""
+    conn = sqlite3.connect(f'file:{caminho}?mode=ro', uri=True)
+    try:
+        erros = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        resultado: Dict[str, Any] = {'arquivo': caminho, 'ok': erros == ['ok'], 'erros': [] if erros == ['ok'] else erros}
+        if resultado['ok']:
+            resultado['versao_esquema'] = conn.execute("SELECT MAX(versao) FROM schema_migracoes").fetchone()[0]
+            resultado['equipamentos'] = conn.execute("SELECT COUNT(*) FROM equipamentos").fetchone()[0]
+        return resultado
+    finally:
+        conn.close()
+
+def _copiar(origem: sqlite3.Connection, destino: sqlite3.Connection,
+            paginas: int, pausa: float) -> Dict[str, int]:
+    """
+    Backup em passos de `paginas` páginas. Sem a transação de leitura aberta
+    abaixo, qualquer escrita de outra conexão faria a cópia recomeçar do
+    zero (e, com escritas frequentes, nunca terminar). Com ela, todos os
+    passos leem a mesma fotografia (WAL) e quem grava não espera.
+    """
+    estado = {'passos': 0, 'reinicios': 0, 'paginas': 0}
+    restantes_antes = None
+
+    def progresso(_status: int, restantes: int, total: int) -> None:
+        nonlocal restantes_antes
+        estado['passos'] += 1
+        estado['paginas'] = total
+        if restantes_antes is not None and restantes > restantes_antes:
+            estado['reinicios'] += 1
+        restantes_antes = restantes
+        if restantes and pausa:
+            time.sleep(pausa)  # libera o banco (e o GIL) entre os passos
+
+    origem.execute("BEGIN")
+    origem.execute("SELECT COUNT(*) FROM schema_migracoes").fetchone()
+    try:
+        origem.backup(destino, pages=paginas, progress=progresso)
+    finally:
+        origem.rollback()
+    return estado
+
+def criar_backup(
+    db_path: Optional[str] = None,
+    pasta: str = BACKUP_DIR,
+    paginas: Optional[int] = None,
+    pausa_ms: Optional[int] = None,
+    retencao: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Gera um backup com data e hora no nome, verifica e aplica a retenção.
+    Retorna duração, páginas, passos, reinícios e a latência das requisições
+    deste processo durante a cópia.
+    """
+    paginas = paginas or CONFIG['BACKUP_PAGINAS_POR_PASSO']
+    pausa = (CONFIG['BACKUP_PAUSA_MS'] if pausa_ms is None else pausa_ms) / 1000
+    retencao = retencao or CONFIG['BACKUP_RETENCAO']
+    os.makedirs(pasta, exist_ok=True)
+
+    nome = f"{PREFIXO_ARQUIVO}{datetime.now().strftime('%Y%m%d-%H%M%S')}{SUFIXO_ARQUIVO}"
+    caminho = os.path.join(pasta, nome)
+    parcial = caminho + '.parcial'
+
+    with _lock:
+        _latencias.iniciar()
+        inicio = time.perf_counter()
+        origem = database.criar_conexao(db_path)
+        destino = sqlite3.connect(parcial)
+        try:
+            estado = _copiar(origem, destino, paginas, pausa)
+            # A cópia herda o modo WAL; um arquivo único é mais fácil de mover
+            destino.execute("PRAGMA journal_mode = DELETE")
+        except Exception:
+            destino.close()
+            os.remove(parcial)
+            raise
+        finally:
+            origem.close()
+            latencia = _latencias.concluir()
+        destino.close()
+        duracao = time.perf_counter() - inicio
+
+        verificacao = verificar_backup(parcial)
+        if not verificacao['ok']:
+            os.remove(parcial)
+            raise RuntimeError(f"Backup inválido: {'; '.join(verificacao['erros'][:5])}")
+        os.replace(parcial, caminho)
+
+        removidos = []
+        for antigo in listar_backups(pasta)[:-retencao]:
+            os.remove(antigo)
+            removidos.append(os.path.basename(antigo))
+
+    resultado = {
+        'arquivo': caminho,
+        'duracao_segundos': round(duracao, 3),
+        'tamanho_bytes': os.path.getsize(caminho),
+        'equipamentos': verificacao['equipamentos'],
+        'removidos': removidos,
+        'latencia': latencia,
+        **estado,
+    }
+    _logger.info(
+        "Backup %s concluído em %.2fs (%d páginas, %d passos, %d reinício(s)); "
+        "requisições durante o backup: %s; antes: %s",
+        nome, duracao, estado['paginas'], estado['passos'], estado['reinicios'],
+        _formatar_latencia(latencia['durante']), _formatar_latencia(latencia['referencia'])
+    )
+    return resultado
+
+def restaurar_backup(caminho: str, db_path: Optional[str] = None, copia_seguranca: bool = True) -> Dict[str, Any]:
+    """
+    Restaura um backup verificado sobre o banco em uso (em um passo, de forma
+    atômica para as outras conexões). Antes, guarda um backup do estado atual.
+    """
+    verificacao = verificar_backup(caminho)
+    if not verificacao['ok']:
+        raise RuntimeError(f"Backup inválido: {'; '.join(verificacao['erros'][:5])}")
+
+    seguranca = criar_backup(db_path)['arquivo'] if copia_seguranca else None
+    origem = sqlite3.connect(f'file:{caminho}?mode=ro', uri=True)
+    destino = database.criar_conexao(db_path)
+    try:
+        versao_antes = destino.execute("SELECT versao FROM controle_versao WHERE id = 1").fetchone()[0]
+        origem.backup(destino, pages=-1)
+        # A versão restaurada pode coincidir com uma já vista pelos caches
+        # e ETags dos processos em execução: segue sempre adiante
+        destino.execute(
+            "UPDATE controle_versao SET versao = MAX(versao, ?) + 1 WHERE id = 1", (versao_antes,)
+        )
+        destino.commit()
+    finally:
+        origem.close()
+        destino.close()
+    _logger.info("Banco restaurado de %s (cópia de segurança: %s)", caminho, seguranca)
+    return {'restaurado_de': caminho, 'copia_seguranca': seguranca, 'equipamentos': verificacao['equipamentos']}
+
+# ============================================================================
+# AGENDAMENTO
+# ============================================================================
+
+def _backup_pendente(intervalo: float) -> bool:
+    backups = listar_backups()
+    return not backups or time.time() - os.path.getmtime(backups[-1]) >= intervalo
+
+def _executar_agendado(intervalo: float) -> None:
+    """Gera um backup se o último tiver mais de `intervalo` segundos"""
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    with open(os.path.join(BACKUP_DIR, '.trava'), 'w') as trava:
+        if fcntl is not None:
+            try:
+                # Com vários processos do app, só um faz o backup
+                fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return
+        if _backup_pendente(intervalo):
+            criar_backup()
+
+def _agendador(intervalo: float) -> None:
+    while not _parar.wait(min(60.0, intervalo)):
+        try:
+            _executar_agendado(intervalo)
+        except Exception:
+            _logger.exception("Falha no backup agendado")
+
+def init_app(app) -> None:
+    """Inicia a thread de backups se BACKUP_INTERVALO_MIN (env ou app.config) for > 0"""
+    global _thread
+    for chave in CONFIG:
+        if chave in app.config:
+            CONFIG[chave] = int(app.config[chave])
+    if _latencias.observar not in metricas.observadores_requisicao:
+        metricas.observadores_requisicao.append(_latencias.observar)
+    if CONFIG['BACKUP_INTERVALO_MIN'] <= 0 or _thread is not None:
+        return
+
+    if not _logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(levelname)s: %(message)s'))
+        _logger.addHandler(handler)
+        _logger.setLevel(logging.INFO)
+    _thread = threading.Thread(
+        target=_agendador, args=(CONFIG['BACKUP_INTERVALO_MIN'] * 60,),
+        name='backup', daemon=True
+    )
+    _thread.start()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Backups online do banco de equipamentos')
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    criacao = subcomandos.add_parser('criar', help='Gera um backup agora')
+    criacao.add_argument('--paginas', type=int, help='Páginas copiadas por passo')
+    criacao.add_argument('--pausa-ms', type=int, help='Pausa entre os passos')
+    subcomandos.add_parser('listar', help='Lista os backups da pasta')
+    verificacao = subcomandos.add_parser('verificar', help='Verifica um backup (padrão: o mais recente)')
+    verificacao.add_argument('arquivo', nargs='?')
+    restauracao = subcomandos.add_parser('restaurar', help='Restaura um backup sobre o banco atual')
+    restauracao.add_argument('arquivo')
+    restauracao.add_argument('--sem-copia-seguranca', action='store_true',
+                             help='Não gera um backup do estado atual antes de restaurar')
+    args = parser.parse_args()
+
+    if args.comando == 'criar':
+        resultado = criar_backup(paginas=args.paginas, pausa_ms=args.pausa_ms)
+        print(f"{resultado['arquivo']}: {resultado['equipamentos']} equipamentos, "
+              f"{resultado['tamanho_bytes']} bytes em {resultado['duracao_segundos']}s "
+              f"({resultado['passos']} passos, {resultado['reinicios']} reinício(s))")
+        for nome in resultado['removidos']:
+            print(f"Removido pela retenção: {nome}")
+    elif args.comando == 'listar':
+        for caminho in listar_backups():
+            print(f"{os.path.basename(caminho)}  {os.path.getsize(caminho)} bytes")
+    elif args.comando == 'verificar':
+        backups = listar_backups()
+        caminho = args.arquivo or (backups[-1] if backups else None)
+        if not caminho:
+            raise SystemExit("Nenhum backup encontrado")
+        resultado = verificar_backup(caminho)
+        if resultado['ok']:
+            print(f"{caminho}: ok (esquema v{resultado['versao_esquema']}, {resultado['equipamentos']} equipamentos)")
+        else:
+            print(f"{caminho}: CORROMPIDO")
+            for erro in resultado['erros']:
+                print(f"  {erro}")
+        raise SystemExit(0 if resultado['ok'] else 1)
+    else:
+        resultado = restaurar_backup(args.arquivo, copia_seguranca=not args.sem_copia_seguranca)
+        if resultado['copia_seguranca']:
+            print(f"Estado anterior guardado em {resultado['copia_seguranca']}")
+        print(f"Restaurado de {resultado['restaurado_de']} ({resultado['equipamentos']} equipamentos)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,435 @@
+# src/benchmark.py - Micro-benchmarks das funções do models.py e das rotas /api
+#
+# Roda sobre uma base sintética (gerar_dados.py) e grava um JSON com as
+# medições, que pode ser comparado com o de outro commit.
+#   python src/benchmark.py --linhas 100000                 # gera data/benchmark.db se não existir
+#   python src/benchmark.py --saida antes.json
+#   python src/benchmark.py --saida depois.json --comparar antes.json
+#   python src/benchmark.py --filtro centro_custo            # só cenários cujo nome contém o texto
+import argparse
+import inspect
+import io
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Prefixo dos registros criados pelos cenários de escrita (removidos no final)
+PREFIXO_TEMPORARIO = 'BENCH-'
+
+class Cenario:
+    """
+    Uma medição: `executar` é cronometrada; `preparar` (opcional) roda antes de
+    cada repetição, fora do cronômetro, e seu retorno é passado a `executar`.
+    `alvo` é a função do models ou a rota ("GET /api/...") coberta.
+    """
+
+    def __init__(self, nome: str, grupo: str, alvo: str, executar: Callable,
+                 preparar: Optional[Callable[[], Any]] = None):
+        self.nome = nome
+        self.grupo = grupo
+        self.alvo = alvo
+        self.executar = executar
+        self.preparar = preparar
+
+def _commit_atual() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _consumir(resultado) -> int:
+    """Esgota os geradores de blocos (iterar_*) e retorna o número de linhas"""
+    _, blocos = resultado
+    return sum(len(bloco) for bloco in blocos)
+
+def _medir(cenario: Cenario, repeticoes: int, aquecimento: int) -> Dict[str, Any]:
+    tempos = []
+    for i in range(aquecimento + repeticoes):
+        preparado = cenario.preparar() if cenario.preparar else None
+        inicio = time.perf_counter()
+        cenario.executar(preparado)
+        duracao = (time.perf_counter() - inicio) * 1000
+        if i >= aquecimento:
+            tempos.append(duracao)
+
+    tempos.sort()
+    return {
+        'grupo': cenario.grupo,
+        'alvo': cenario.alvo,
+        'repeticoes': repeticoes,
+        'min_ms': round(tempos[0], 3),
+        'mediana_ms': round(statistics.median(tempos), 3),
+        'media_ms': round(statistics.fmean(tempos), 3),
+        'max_ms': round(tempos[-1], 3),
+    }
+
+# ============================================================================
+# CENÁRIOS
+# ============================================================================
+
+def _amostras(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """Valores reais da base usados como parâmetros dos cenários"""
+    centro_custo = conn.execute(
+        "SELECT centro_custo FROM resumo_centro_status GROUP BY centro_custo ORDER BY SUM(total) DESC LIMIT 1"
+    ).fetchone()[0]
+    patrimonios = [row[0] for row in conn.execute(
+        "SELECT patrimonio FROM equipamentos WHERE patrimonio NOT LIKE ? ORDER BY id LIMIT 1000",
+        (PREFIXO_TEMPORARIO + '%',)
+    )]
+    return {
+        'centro_custo': centro_custo,
+        'patrimonio': patrimonios[0],
+        'patrimonios': patrimonios,
+        'termo': 'lenovo',
+    }
+
+def _gerar_log_consultas_lentas(arquivo: str, registros: int = 10000, formatos: int = 50) -> None:
+    """Log de consultas lentas sintético (se ainda não existir), para o cenário do resumo"""
+    if os.path.exists(arquivo):
+        return
+    with open(arquivo, 'w', encoding='utf-8') as f:
+        for i in range(registros):
+            f.write(json.dumps({
+                'data': datetime.now().isoformat(timespec='seconds'),
+                'duracao_ms': round(50 + (i * 7919) % 950, 3),
+                'sql': f'SELECT * FROM equipamentos WHERE campo_{i % formatos} = ? ORDER BY id LIMIT ?',
+                'parametros': 2,
+                'rota': 'GET /api/equipamentos/pesquisa',
+                'plano': ['SCAN equipamentos'],
+                'varredura_completa': True,
+            }, ensure_ascii=False) + '\n')
+
+def _criar_temporarios(conn: sqlite3.Connection, quantidade: int) -> List[str]:
+    """Insere equipamentos descartáveis (para os cenários de exclusão)"""
+    prefixo = f'{PREFIXO_TEMPORARIO}{time.perf_counter_ns()}-'
+    patrimonios = [f'{prefixo}{i}' for i in range(quantidade)]
+    with conn:
+        conn.executemany(
+            "INSERT INTO equipamentos (patrimonio, tipo, centro_custo, status) VALUES (?, 'Notebook', 'BENCHMARK', 'Em uso')",
+            [(p,) for p in patrimonios]
+        )
+    return patrimonios
+
+def cenarios_models(models, conn: sqlite3.Connection, amostra: Dict[str, Any]) -> List[Cenario]:
+    import facetas  # como o models, só depois de EQUIPAMENTOS_DB_PATH definido
+
+    cc = amostra['centro_custo']
+    pats = amostra['patrimonios']
+    primeira = models.buscar_equipamentos_cursor(ordenar_por='valor_locacao', por_pagina=50)
+    cursor_valor = primeira[1]
+
+    def c(nome: str, executar: Callable, preparar: Optional[Callable] = None, alvo: Optional[str] = None) -> Cenario:
+        return Cenario(nome, 'models', alvo or nome.split(' ')[0], executar, preparar)
+
+    return [
+        c('buscar_equipamentos (tipo+status)', lambda _: models.buscar_equipamentos({'tipo': ['Notebook'], 'status': ['Em uso']})),
+        c('buscar_equipamentos (patrimonio)', lambda _: models.buscar_equipamentos({'patrimonio': [amostra['patrimonio']]})),
+        c('buscar_equipamentos_avancado (q)', lambda _: models.buscar_equipamentos_avancado({'q': amostra['termo']})),
+        c('buscar_equipamentos_avancado (q, relevancia)', lambda _: models.buscar_equipamentos_avancado(
+            {'q': amostra['termo']}, ordenar_por='relevancia')),
+        c('buscar_equipamentos_avancado (filtros, pagina 200)', lambda _: models.buscar_equipamentos_avancado(
+            {'tipo': 'Notebook', 'status': 'Em uso'}, pagina=200, por_pagina=50)),
+        c('buscar_equipamentos_avancado (centro_custo, data DESC)', lambda _: models.buscar_equipamentos_avancado(
+            {'centro_custo': cc}, ordenar_por='data_recebimento', ordenar_direcao='DESC')),
+        c('buscar_equipamentos_por_chaves (1000)', lambda _: models.buscar_equipamentos_por_chaves(pats)),
+        c('contar_facetas_busca (q, 3 campos)', lambda _: models.contar_facetas_busca(
+            {'q': amostra['termo']}, ['status', 'tipo', 'centro_custo'])),
+        c('codificar_cursor', lambda _: models.codificar_cursor('valor_locacao', 'ASC', 123.45, 999)),
+        c('decodificar_cursor', lambda _: models.decodificar_cursor(cursor_valor, 'valor_locacao', 'ASC')),
+        c('buscar_equipamentos_cursor (primeira pagina, com total)', lambda _: models.buscar_equipamentos_cursor(
+            ordenar_por='valor_locacao', por_pagina=50, contar_total=True)),
+        c('buscar_equipamentos_cursor (pagina seguinte)', lambda _: models.buscar_equipamentos_cursor(
+            ordenar_por='valor_locacao', por_pagina=50, cursor=cursor_valor)),
+        c('iterar_equipamentos_avancado (tudo)', lambda _: _consumir(models.iterar_equipamentos_avancado())),
+        c('atualizar_equipamento', lambda _: models.atualizar_equipamento(
+            amostra['patrimonio'], {'observacao': 'benchmark'})),
+        c('atualizar_equipamentos_em_massa (1000)', lambda _: models.atualizar_equipamentos_em_massa(
+            {'observacao': 'benchmark'}, patrimonios=pats)),
+        c('deletar_equipamentos_em_massa (1000)', lambda temporarios: models.deletar_equipamentos_em_massa(
+            patrimonios=temporarios), preparar=lambda: _criar_temporarios(conn, 1000)),
+        Cenario('facetas.montar_facetas (sem cache)', 'models', 'facetas.montar_facetas',
+                lambda _: facetas.montar_facetas()),
+        c('obter_valores_distintos (usuario)', lambda _: models.obter_valores_distintos('usuario')),
+        c('obter_estatisticas_gerais', lambda _: models.obter_estatisticas_gerais()),
+        c('obter_resumo_dashboard', lambda _: models.obter_resumo_dashboard()),
+        c('listar_centros_custo', lambda _: models.listar_centros_custo()),
+        c('obter_distribuicao_status_centros_custo', lambda _: models.obter_distribuicao_status_centros_custo()),
+        c('buscar_equipamentos_por_centro_custo', lambda _: models.buscar_equipamentos_por_centro_custo(
+            cc, {'status': 'Em uso'})),
+        c('iterar_equipamentos_centro_custo', lambda _: _consumir(models.iterar_equipamentos_centro_custo(cc))),
+        c('obter_resumo_centro_custo', lambda _: models.obter_resumo_centro_custo(cc)),
+        c('obter_equipamentos_mais_valiosos_centro_custo', lambda _: models.obter_equipamentos_mais_valiosos_centro_custo(cc, 10)),
+        c('obter_equipamentos_recentes_centro_custo', lambda _: models.obter_equipamentos_recentes_centro_custo(cc, 10)),
+        c('contar_equipamentos_centro_custo', lambda _: models.contar_equipamentos_centro_custo(cc)),
+        c('verificar_centro_custo_existe', lambda _: models.verificar_centro_custo_existe(cc)),
+    ]
+
+def cenarios_rotas(cliente, conn: sqlite3.Connection, amostra: Dict[str, Any]) -> List[Cenario]:
+    import relatorio_pdf
+    from historico import inicio_historico
+
+    cc = amostra['centro_custo']
+    pats = amostra['patrimonios']
+    pat = amostra['patrimonio']
+    # Momento mais antigo remontável: o inventário desfaz todo o histórico guardado
+    inicio = inicio_historico(conn).replace(' ', 'T')
+
+    def requisitar(metodo: str, url: str, **kwargs) -> None:
+        resposta = cliente.open(url, method=metodo, **kwargs)
+        resposta.get_data()  # consome respostas em streaming
+        if resposta.status_code >= 400:
+            raise RuntimeError(f'{metodo} {url} -> {resposta.status_code}: {resposta.get_data(as_text=True)[:200]}')
+
+    def get(nome: str, regra: str, url: str) -> Cenario:
+        return Cenario(nome, 'rotas', f'GET {regra}', lambda _: requisitar('GET', url))
+
+    def pdf(nome: str, regra: str, url: str) -> Cenario:
+        # Sem o cache de PDFs: mede a geração (com o cache seria uma leitura em memória)
+        return Cenario(nome, 'rotas', f'GET {regra}', lambda _: requisitar('GET', url),
+                       preparar=relatorio_pdf._cache_pdfs.limpar)
+
+    def alterar_amostra() -> None:
+        # Garante ao menos um evento no histórico do patrimônio de amostra
+        with conn:
+            conn.execute("UPDATE equipamentos SET observacao = ? WHERE patrimonio = ?",
+                         (f'benchmark {time.perf_counter_ns()}', pat))
+
+    def arquivo_lote(linhas_extras: str = '') -> tuple:
+        conteudo = 'patrimonio,observacao\n' + ''.join(f'{p},benchmark\n' for p in pats) + linhas_extras
+        return (io.BytesIO(conteudo.encode('utf-8')), 'benchmark.csv')
+
+    def csv_lote(_) -> None:
+        requisitar('POST', '/api/equipamentos/lote', data={
+            'acao': 'update',
+            'file': arquivo_lote()
+        }, content_type='multipart/form-data')
+
+    def lote_assincrono(_) -> str:
+        # Do envio até a conclusão, acompanhando o status como o cliente faz;
+        # a linha inexistente gera o relatório de erros
+        resposta = cliente.post('/api/equipamentos/lote', data={
+            'acao': 'update',
+            'assincrono': '1',
+            'file': arquivo_lote(f'{PREFIXO_TEMPORARIO}inexistente,benchmark\n')
+        }, content_type='multipart/form-data')
+        if resposta.status_code != 202:
+            raise RuntimeError(f'POST /api/equipamentos/lote -> {resposta.status_code}: {resposta.get_data(as_text=True)[:200]}')
+        status_url = resposta.get_json()['status_url']
+        while True:
+            tarefa = cliente.get(status_url).get_json()['tarefa']
+            if tarefa['status'] in ('concluida', 'falhou'):
+                return tarefa['id']
+            time.sleep(0.005)
+
+    tarefas: List[str] = []
+
+    def tarefa_concluida() -> str:
+        if not tarefas:
+            tarefas.append(lote_assincrono(None))
+        return tarefas[0]
+
+    return [
+        get('GET /api/equipamentos (tipo)', '/api/equipamentos', '/api/equipamentos?tipo=Monitor'),
+        get('GET /api/equipamentos/filtros/tipo', '/api/equipamentos/filtros/<campo>', '/api/equipamentos/filtros/tipo'),
+        get('GET /api/equipamentos/facetas', '/api/equipamentos/facetas', '/api/equipamentos/facetas'),
+        get('GET /api/equipamentos/pesquisa (q)', '/api/equipamentos/pesquisa',
+            f"/api/equipamentos/pesquisa?q={amostra['termo']}"),
+        get('GET /api/equipamentos/pesquisa (q, facetas)', '/api/equipamentos/pesquisa',
+            f"/api/equipamentos/pesquisa?q={amostra['termo']}&facetas=status,tipo,centro_custo"),
+        get('GET /api/equipamentos/pesquisa (pagina 200)', '/api/equipamentos/pesquisa',
+            '/api/equipamentos/pesquisa?status=Em uso&pagina=200'),
+        get('GET /api/equipamentos/pesquisa (cursor)', '/api/equipamentos/pesquisa',
+            '/api/equipamentos/pesquisa?cursor=&ordenar_por=data_recebimento'),
+        get('GET /api/equipamentos/pesquisa (1000 linhas, colunar)', '/api/equipamentos/pesquisa',
+            '/api/equipamentos/pesquisa?por_pagina=1000&formato=colunar'),
+        get('GET /api/equipamentos/estatisticas', '/api/equipamentos/estatisticas', '/api/equipamentos/estatisticas'),
+        get('GET /api/centros-custo', '/api/centros-custo', '/api/centros-custo'),
+        get('GET /api/centros-custo/<cc>', '/api/centros-custo/<centro_custo>', f'/api/centros-custo/{cc}'),
+        get('GET /api/centros-custo/<cc>/equipamentos', '/api/centros-custo/<centro_custo>/equipamentos',
+            f'/api/centros-custo/{cc}/equipamentos'),
+        get('GET /api/centros-custo/<cc>/equipamentos/valiosos', '/api/centros-custo/<centro_custo>/equipamentos/valiosos',
+            f'/api/centros-custo/{cc}/equipamentos/valiosos'),
+        get('GET /api/centros-custo/<cc>/equipamentos/recentes', '/api/centros-custo/<centro_custo>/equipamentos/recentes',
+            f'/api/centros-custo/{cc}/equipamentos/recentes'),
+        get('GET /api/equipamentos/exportar', '/api/equipamentos/exportar', '/api/equipamentos/exportar'),
+        get('GET /api/centros-custo/<cc>/equipamentos/exportar', '/api/centros-custo/<centro_custo>/equipamentos/exportar',
+            f'/api/centros-custo/{cc}/equipamentos/exportar'),
+        get('GET /api/centros-custo/<cc>/relatorio', '/api/centros-custo/<centro_custo>/relatorio',
+            f'/api/centros-custo/{cc}/relatorio'),
+        pdf('GET /api/equipamentos/relatorio.pdf (tipo, sem cache)', '/api/equipamentos/relatorio.pdf',
+            '/api/equipamentos/relatorio.pdf?tipo=Notebook'),
+        pdf('GET /api/centros-custo/<cc>/relatorio.pdf (sem cache)', '/api/centros-custo/<centro_custo>/relatorio.pdf',
+            f'/api/centros-custo/{cc}/relatorio.pdf'),
+        pdf('GET /api/centros-custo/relatorios.zip (todos, sem cache)', '/api/centros-custo/relatorios.zip',
+            '/api/centros-custo/relatorios.zip'),
+        Cenario('GET /api/equipamentos/<patrimonio>/historico', 'rotas', 'GET /api/equipamentos/<patrimonio>/historico',
+                lambda _: requisitar('GET', f'/api/equipamentos/{pat}/historico'), preparar=alterar_amostra),
+        get('GET /api/equipamentos/inventario (inicio do historico)', '/api/equipamentos/inventario',
+            f'/api/equipamentos/inventario?data={inicio}'),
+        get('GET /api/equipamentos/inventario (csv, centro_custo)', '/api/equipamentos/inventario',
+            f'/api/equipamentos/inventario?data={inicio}&centro_custo={cc}&formato=csv'),
+        get('GET /api/dashboard', '/api/dashboard', '/api/dashboard'),
+        get('GET /api/dashboard/centros-custo', '/api/dashboard/centros-custo', '/api/dashboard/centros-custo'),
+        get('GET /api/health', '/api/health', '/api/health'),
+        get('GET /api/metrics', '/api/metrics', '/api/metrics'),
+        get('GET /api/consultas-lentas', '/api/consultas-lentas', '/api/consultas-lentas?ordenar=max'),
+        Cenario('POST /api/equipamentos', 'rotas', 'POST /api/equipamentos',
+                lambda patrimonio: requisitar('POST', '/api/equipamentos', json={'patrimonio': patrimonio, 'tipo': 'Notebook'}),
+                preparar=lambda: f'{PREFIXO_TEMPORARIO}{time.perf_counter_ns()}'),
+        Cenario('POST /api/equipamentos/busca-lote (1000)', 'rotas', 'POST /api/equipamentos/busca-lote',
+                lambda _: requisitar('POST', '/api/equipamentos/busca-lote', json={'chaves': pats})),
+        Cenario('PATCH /api/equipamentos/<patrimonio>', 'rotas', 'PATCH /api/equipamentos/<patrimonio>',
+                lambda _: requisitar('PATCH', f'/api/equipamentos/{pat}', json={'observacao': 'benchmark'})),
+        Cenario('DELETE /api/equipamentos/<patrimonio>', 'rotas', 'DELETE /api/equipamentos/<patrimonio>',
+                lambda temporarios: requisitar('DELETE', f'/api/equipamentos/{temporarios[0]}'),
+                preparar=lambda: _criar_temporarios(conn, 1)),
+        Cenario('PATCH /api/equipamentos/em-massa (1000)', 'rotas', 'PATCH /api/equipamentos/em-massa',
+                lambda _: requisitar('PATCH', '/api/equipamentos/em-massa',
+                                     json={'patrimonios': pats, 'dados': {'observacao': 'benchmark'}})),
+        Cenario('DELETE /api/equipamentos/em-massa (1000)', 'rotas', 'DELETE /api/equipamentos/em-massa',
+                lambda temporarios: requisitar('DELETE', '/api/equipamentos/em-massa', json={'patrimonios': temporarios}),
+                preparar=lambda: _criar_temporarios(conn, 1000)),
+        Cenario('POST /api/equipamentos/lote (update 1000)', 'rotas', 'POST /api/equipamentos/lote', csv_lote),
+        Cenario('POST /api/equipamentos/lote (assincrono, update 1000)', 'rotas',
+                'POST /api/equipamentos/lote', lote_assincrono),
+        get('GET /api/equipamentos/lote/tarefas', '/api/equipamentos/lote/tarefas', '/api/equipamentos/lote/tarefas'),
+        Cenario('GET /api/equipamentos/lote/tarefas/<tarefa_id>', 'rotas', 'GET /api/equipamentos/lote/tarefas/<tarefa_id>',
+                lambda tarefa_id: requisitar('GET', f'/api/equipamentos/lote/tarefas/{tarefa_id}'),
+                preparar=tarefa_concluida),
+        Cenario('GET /api/equipamentos/lote/tarefas/<tarefa_id>/erros', 'rotas',
+                'GET /api/equipamentos/lote/tarefas/<tarefa_id>/erros',
+                lambda tarefa_id: requisitar('GET', f'/api/equipamentos/lote/tarefas/{tarefa_id}/erros'),
+                preparar=tarefa_concluida),
+    ]
+
+def _sem_cenario(models, app, cenarios: List[Cenario]) -> List[str]:
+    """Funções públicas do models e rotas /api que nenhum cenário cobre"""
+    cobertos = {c.alvo for c in cenarios}
+    funcoes = [
+        nome for nome, funcao in inspect.getmembers(models, inspect.isfunction)
+        if funcao.__module__ == models.__name__ and not nome.startswith('_')
+    ]
+    rotas = [
+        f'{metodo} {regra.rule}'
+        for regra in app.url_map.iter_rules() if regra.rule.startswith('/api')
+        for metodo in sorted(regra.methods - {'HEAD', 'OPTIONS'})
+    ]
+    return [alvo for alvo in funcoes + rotas if alvo not in cobertos]
+
+# ============================================================================
+# EXECUÇÃO E COMPARAÇÃO
+# ============================================================================
+
+def comparar(atual: Dict[str, Any], anterior: Dict[str, Any], limite: float = 1.2) -> None:
+    """Tabela de medianas lado a lado; razões acima de `limite` ficam marcadas com "!!" """
+    antes = anterior.get('resultados', {})
+    print(f"\nComparação com {anterior.get('metadados', {}).get('commit') or 'arquivo anterior'}:")
+    print(f"   {'cenário':<60} {'antes':>10} {'depois':>10} {'razão':>7}")
+    for nome, medicao in atual['resultados'].items():
+        if nome not in antes:
+            continue
+        a, d = antes[nome]['mediana_ms'], medicao['mediana_ms']
+        razao = d / a if a else float('inf')
+        alerta = '!!' if razao > limite else '  '
+        print(f"{alerta} {nome:<60} {a:>10.2f} {d:>10.2f} {razao:>6.2f}x")
+
+def executar(cenarios: List[Cenario], repeticoes: int, aquecimento: int) -> Dict[str, Dict[str, Any]]:
+    resultados = {}
+    for cenario in cenarios:
+        try:
+            resultados[cenario.nome] = _medir(cenario, repeticoes, aquecimento)
+        except Exception as e:
+            resultados[cenario.nome] = {'grupo': cenario.grupo, 'alvo': cenario.alvo, 'erro': str(e)}
+            print(f"   {cenario.nome:<60} ERRO: {e}")
+            continue
+        print(f"   {cenario.nome:<60} {resultados[cenario.nome]['mediana_ms']:>10.2f} ms")
+    return resultados
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmarks do models.py e das rotas /api')
+    parser.add_argument('--banco', default=os.path.join(RAIZ, 'data', 'benchmark.db'),
+                        help='Banco sintético (padrão: data/benchmark.db)')
+    parser.add_argument('--linhas', type=int, default=100000, help='Tamanho da base, se precisar gerá-la')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--aquecimento', type=int, default=1)
+    parser.add_argument('--filtro', default='', help='Só cenários cujo nome contém este texto')
+    parser.add_argument('--saida', help='Arquivo JSON de resultados (padrão: data/benchmark-<commit>.json)')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para comparar')
+    args = parser.parse_args()
+
+    banco = os.path.abspath(args.banco)
+    # O caminho do banco é lido na importação do database
+    os.environ['EQUIPAMENTOS_DB_PATH'] = banco
+    # Arquivos das cargas em segundo plano ao lado do banco sintético, fora de data/lotes
+    os.environ.setdefault('LOTES_DIR', os.path.join(os.path.dirname(banco), 'lotes-benchmark'))
+    # Resumo de consultas lentas lido de um log sintético, não do log real de data/
+    os.environ.setdefault('CONSULTAS_LENTAS_LOG', os.path.join(os.path.dirname(banco), 'consultas_lentas-benchmark.log'))
+    _gerar_log_consultas_lentas(os.environ['CONSULTAS_LENTAS_LOG'])
+
+    from gerar_dados import popular_banco
+    if not os.path.exists(banco):
+        popular_banco(banco, args.linhas, args.semente)
+
+    import models
+    from app import create_app
+    from database import criar_conexao
+
+    app = create_app()
+    cliente = app.test_client()
+    conn = criar_conexao(banco)
+    amostra = _amostras(conn)
+    total_linhas = conn.execute("SELECT COUNT(*) FROM equipamentos").fetchone()[0]
+
+    cenarios = cenarios_models(models, conn, amostra) + cenarios_rotas(cliente, conn, amostra)
+    faltando = _sem_cenario(models, app, cenarios)
+    cenarios = [c for c in cenarios if args.filtro in c.nome]
+
+    print(f"Base: {banco} ({total_linhas} equipamentos, centro de custo de amostra: {amostra['centro_custo']})")
+    resultados = executar(cenarios, args.repeticoes, args.aquecimento)
+
+    with conn:
+        conn.execute("DELETE FROM equipamentos WHERE patrimonio LIKE ?", (PREFIXO_TEMPORARIO + '%',))
+    conn.close()
+
+    commit = _commit_atual()
+    saida = {
+        'metadados': {
+            'commit': commit,
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'plataforma': platform.platform(),
+            'banco': banco,
+            'linhas': total_linhas,
+            'repeticoes': args.repeticoes,
+            'aquecimento': args.aquecimento,
+        },
+        'resultados': resultados,
+        'sem_cenario': faltando,
+    }
+    if faltando:
+        print(f"\nSem cenário de benchmark: {', '.join(faltando)}")
+
+    arquivo = args.saida or os.path.join(RAIZ, 'data', f"benchmark-{commit or 'local'}.json")
+    with open(arquivo, 'w', encoding='utf-8') as f:
+        json.dump(saida, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em {arquivo}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            comparar(saida, json.load(f))
+
+if __name__ == '__main__':
+    main()
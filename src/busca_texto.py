@@ -0,0 +1,171 @@
+# src/busca_texto.py - Índice de texto completo (FTS5) para o termo geral "q"
+import re
+import sqlite3
+from typing import Optional
+
+from database import executar_script
+
+# Colunas cobertas pela busca geral (mesmas do antigo LIKE '%termo%')
+COLUNAS_FTS = ['patrimonio', 'descritivo', 'numero_serie', 'usuario', 'host', 'local_atual', 'tipo']
+
+_colunas = ', '.join(COLUNAS_FTS)
+_novos = ', '.join(f'new.{c}' for c in COLUNAS_FTS)
+_antigos = ', '.join(f'old.{c}' for c in COLUNAS_FTS)
+
+# Tabela FTS5 de conteúdo externo: guarda só o índice, os dados continuam em
+# "equipamentos". Triggers mantêm o índice sincronizado.
+SQL_INDICE_FTS = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS equipamentos_fts USING fts5(
+        {_colunas},
+        content='equipamentos',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS equipamentos_fts_ai AFTER INSERT ON equipamentos BEGIN
+        INSERT INTO equipamentos_fts(rowid, {_colunas}) VALUES (new.id, {_novos});
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS equipamentos_fts_ad AFTER DELETE ON equipamentos BEGIN
+        INSERT INTO equipamentos_fts(equipamentos_fts, rowid, {_colunas}) VALUES ('delete', old.id, {_antigos});
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS equipamentos_fts_au AFTER UPDATE OF id, {_colunas} ON equipamentos BEGIN
+        INSERT INTO equipamentos_fts(equipamentos_fts, rowid, {_colunas}) VALUES ('delete', old.id, {_antigos});
+        INSERT INTO equipamentos_fts(rowid, {_colunas}) VALUES (new.id, {_novos});
+    END;
+"""
+
+# Patrimônio e número de série são digitados pela metade (o final do
+# patrimônio, um trecho do serial). O tokenizador trigram do FTS5 responde
+# a trechos em qualquer posição, como LIKE '%trecho%', sem varrer a tabela.
+COLUNAS_IDENTIFICADORES = ['patrimonio', 'numero_serie']
+
+_colunas_ids = ', '.join(COLUNAS_IDENTIFICADORES)
+_novos_ids = ', '.join(f'new.{c}' for c in COLUNAS_IDENTIFICADORES)
+_antigos_ids = ', '.join(f'old.{c}' for c in COLUNAS_IDENTIFICADORES)
+
+# O trigram só usa o índice com trechos de 3 caracteres ou mais
+TAMANHO_MINIMO_TRECHO = 3
+
+SQL_INDICE_IDENTIFICADORES = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS equipamentos_ids_fts USING fts5(
+        {_colunas_ids},
+        content='equipamentos',
+        content_rowid='id',
+        tokenize='trigram'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS equipamentos_ids_fts_ai AFTER INSERT ON equipamentos BEGIN
+        INSERT INTO equipamentos_ids_fts(rowid, {_colunas_ids}) VALUES (new.id, {_novos_ids});
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS equipamentos_ids_fts_ad AFTER DELETE ON equipamentos BEGIN
+        INSERT INTO equipamentos_ids_fts(equipamentos_ids_fts, rowid, {_colunas_ids}) VALUES ('delete', old.id, {_antigos_ids});
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS equipamentos_ids_fts_au AFTER UPDATE OF id, {_colunas_ids} ON equipamentos BEGIN
+        INSERT INTO equipamentos_ids_fts(equipamentos_ids_fts, rowid, {_colunas_ids}) VALUES ('delete', old.id, {_antigos_ids});
+        INSERT INTO equipamentos_ids_fts(rowid, {_colunas_ids}) VALUES (new.id, {_novos_ids});
+    END;
+"""
+
+_fts_ativo: Optional[bool] = None
+_identificadores_ativo: Optional[bool] = None
+
+def criar_indice_fts(conn: sqlite3.Connection) -> bool:
+    """
+    Cria (se necessário) o índice FTS5 e seus triggers dentro da transação
+    corrente, reconstruindo-o a partir da tabela na primeira vez.
+    Retorna False se o SQLite não tiver FTS5 (a busca continua usando LIKE).
+    """
+    global _fts_ativo
+    existia = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'equipamentos_fts'"
+    ).fetchone() is not None
+
+    try:
+        executar_script(conn, SQL_INDICE_FTS)
+    except sqlite3.OperationalError:
+        _fts_ativo = False
+        return False
+
+    if not existia:
+        conn.execute("INSERT INTO equipamentos_fts(equipamentos_fts) VALUES ('rebuild')")
+    _fts_ativo = True
+    return True
+
+def fts_ativo(conn: sqlite3.Connection) -> bool:
+    """Indica se o índice FTS5 existe e pode ser consultado"""
+    global _fts_ativo
+    if _fts_ativo is None:
+        try:
+            conn.execute("SELECT 1 FROM equipamentos_fts LIMIT 0")
+            _fts_ativo = True
+        except sqlite3.OperationalError:
+            _fts_ativo = False
+    return _fts_ativo
+
+def criar_indice_identificadores(conn: sqlite3.Connection) -> bool:
+    """
+    Cria (se necessário) o índice trigram de patrimônio/número de série e
+    seus triggers dentro da transação corrente, reconstruindo-o na primeira
+    vez. Retorna False se o SQLite não tiver FTS5 ou o tokenizador trigram
+    (3.34+); nesse caso os trechos de identificador usam LIKE.
+    """
+    global _identificadores_ativo
+    existia = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'equipamentos_ids_fts'"
+    ).fetchone() is not None
+
+    try:
+        executar_script(conn, SQL_INDICE_IDENTIFICADORES)
+    except sqlite3.OperationalError:
+        _identificadores_ativo = False
+        return False
+
+    if not existia:
+        conn.execute("INSERT INTO equipamentos_ids_fts(equipamentos_ids_fts) VALUES ('rebuild')")
+    _identificadores_ativo = True
+    return True
+
+def identificadores_ativo(conn: sqlite3.Connection) -> bool:
+    """Indica se o índice trigram de identificadores existe e pode ser consultado"""
+    global _identificadores_ativo
+    if _identificadores_ativo is None:
+        try:
+            conn.execute("SELECT 1 FROM equipamentos_ids_fts LIMIT 0")
+            _identificadores_ativo = True
+        except sqlite3.OperationalError:
+            _identificadores_ativo = False
+    return _identificadores_ativo
+
+def montar_consulta_fts(termo: str) -> Optional[str]:
+    """
+    Converte o termo digitado em uma expressão MATCH com prefixo por palavra:
+    "notebook len" -> "notebook"* AND "len"*
+    Retorna None se o termo não tiver nenhuma palavra indexável.
+    """
+    palavras = re.findall(r'\w+', termo or '')
+    if not palavras:
+        return None
+    return ' AND '.join('"{}"*'.format(p.replace('"', '""')) for p in palavras)
+
+def montar_consulta_trecho(termo: str) -> Optional[str]:
+    """
+    Converte o termo em uma expressão MATCH do índice trigram que casa o
+    termo inteiro em qualquer posição (equivale a LIKE '%termo%').
+    Retorna None se o termo for curto demais para o índice.
+    """
+    termo = (termo or '').strip()
+    if len(termo) < TAMANHO_MINIMO_TRECHO:
+        return None
+    return '"{}"'.format(termo.replace('"', '""'))
+
+def reconstruir_indice_fts(conn: sqlite3.Connection) -> None:
+    """Reconstrói os índices FTS5 inteiros a partir da tabela equipamentos"""
+    with conn:
+        conn.execute("INSERT INTO equipamentos_fts(equipamentos_fts) VALUES ('rebuild')")
+        if identificadores_ativo(conn):
+            conn.execute("INSERT INTO equipamentos_ids_fts(equipamentos_ids_fts) VALUES ('rebuild')")
@@ -0,0 +1,80 @@
+# src/cache.py - Versão dos dados e cache em memória invalidado por ela
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Contador de escrita: qualquer INSERT/UPDATE/DELETE em "equipamentos"
+# incrementa a versão, na mesma transação da alteração
+SQL_CONTROLE_VERSAO = """
+    CREATE TABLE IF NOT EXISTS controle_versao (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        versao INTEGER NOT NULL
+    );
+
+    INSERT OR IGNORE INTO controle_versao (id, versao) VALUES (1, 1);
+
+    CREATE TRIGGER IF NOT EXISTS versao_ai AFTER INSERT ON equipamentos BEGIN
+        UPDATE controle_versao SET versao = versao + 1 WHERE id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS versao_au AFTER UPDATE ON equipamentos BEGIN
+        UPDATE controle_versao SET versao = versao + 1 WHERE id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS versao_ad AFTER DELETE ON equipamentos BEGIN
+        UPDATE controle_versao SET versao = versao + 1 WHERE id = 1;
+    END;
+"""
+
+def versao_dados(conn: sqlite3.Connection) -> int:
+    """Versão atual dos dados (muda a cada escrita em equipamentos)"""
+    return conn.execute("SELECT versao FROM controle_versao WHERE id = 1").fetchone()[0]
+
+class CacheVersionado:
+    """
+    Cache LRU em memória cujas entradas só valem para a versão dos dados em
+    que foram calculadas. Requisições simultâneas para a mesma chave esperam
+    o primeiro cálculo em vez de repeti-lo.
+    """
+
+    def __init__(self, max_itens: int = 256):
+        self.max_itens = max_itens
+        self._itens: "OrderedDict[Hashable, Tuple[int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._locks_chave: Dict[Hashable, threading.Lock] = {}
+
+    def obter(self, chave: Hashable, versao: int) -> Optional[Any]:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None or item[0] != versao:
+                return None
+            self._itens.move_to_end(chave)
+            return item[1]
+
+    def guardar(self, chave: Hashable, versao: int, valor: Any) -> None:
+        with self._lock:
+            self._itens[chave] = (versao, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def obter_ou_calcular(self, chave: Hashable, versao: int, calcular: Callable[[], Any]) -> Any:
+        valor = self.obter(chave, versao)
+        if valor is not None:
+            return valor
+
+        with self._lock:
+            lock_chave = self._locks_chave.setdefault(chave, threading.Lock())
+        with lock_chave:
+            # Outro thread pode ter calculado enquanto esperávamos
+            valor = self.obter(chave, versao)
+            if valor is None:
+                valor = calcular()
+                if valor is not None:
+                    self.guardar(chave, versao, valor)
+        return valor
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
@@ -0,0 +1,225 @@
+# src/consultas_lentas.py - Log de consultas lentas com EXPLAIN QUERY PLAN
+#
+# Opcional: ativado quando SQLITE_CONSULTA_LENTA_MS > 0. Cada comando que
+# passar do limite (execução + leitura das linhas) é gravado em um log
+# rotativo (JSON por linha) com o SQL normalizado, a quantidade de
+# parâmetros, a duração, a rota e o plano de execução.
+#
+# Com vários processos (EQUIPAMENTOS_MULTIPROCESSO=1, definido pelo
+# gunicorn.conf.py) o log não é rotacionado pelo app: a rotação de um
+# processo renomearia o arquivo em que os outros ainda escrevem. Todos
+# acrescentam (O_APPEND) ao mesmo arquivo, reaberto se outro programa
+# (logrotate) o rotacionar.
+#   python src/consultas_lentas.py resumo             # piores formatos de consulta
+#   python src/consultas_lentas.py resumo --top 5 --ordenar max
+#   python src/consultas_lentas.py limpar
+import argparse
+import glob
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import database
+
+ARQUIVO_PADRAO = os.environ.get(
+    'CONSULTAS_LENTAS_LOG',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'consultas_lentas.log')
+)
+TAMANHO_MAXIMO_LOG = 5 * 1024 * 1024
+ARQUIVOS_ROTACAO = 3
+
+# Comandos sem plano de execução
+_SEM_PLANO = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE', 'PRAGMA',
+              'CREATE', 'DROP', 'ALTER', 'ANALYZE', 'VACUUM', 'EXPLAIN')
+
+_logger: Optional[logging.Logger] = None
+_limite_segundos = 0.0
+_local = threading.local()
+
+def normalizar_sql(sql: str) -> str:
+    """
+    Formato da consulta, independente dos valores: literais viram ?, listas
+    IN (?, ?, ...) viram IN (?...) e espaços são colapsados
+    """
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'(?<![\w.])-?\d+(?:\.\d+)?\b', '?', sql)
+    sql = re.sub(r'\(\s*\?(?:\s*,\s*\?)+\s*\)', '(?...)', sql)
+    return ' '.join(sql.split())
+
+def _quantidade_parametros(parametros: Any) -> Optional[int]:
+    if isinstance(parametros, (list, tuple, dict)):
+        return len(parametros)
+    return None  # executemany com gerador
+
+def _plano(conn: sqlite3.Connection, sql: str, parametros: Any) -> List[str]:
+    if sql.lstrip().split(None, 1)[0].upper() in _SEM_PLANO:
+        return []
+    if not isinstance(parametros, (list, tuple, dict)):
+        parametros = ()  # executemany: o plano é o mesmo para todas as linhas
+    try:
+        return [linha[3] for linha in conn.execute("EXPLAIN QUERY PLAN " + sql, parametros).fetchall()]
+    except sqlite3.Error as e:
+        return [f'(plano indisponível: {e})']
+
+def _rota_atual() -> Optional[str]:
+    try:
+        from flask import has_request_context, request
+        if has_request_context():
+            return f'{request.method} {request.url_rule.rule if request.url_rule else request.path}'
+    except ImportError:
+        pass
+    return None
+
+def _observar(conn: sqlite3.Connection, sql: str, parametros: Any, duracao: float) -> None:
+    if duracao < _limite_segundos or getattr(_local, 'registrando', False) or _logger is None:
+        return
+    # O próprio EXPLAIN passa pelos observadores: evita recursão
+    _local.registrando = True
+    try:
+        plano = _plano(conn, sql, parametros)
+        _logger.info(json.dumps({
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'duracao_ms': round(duracao * 1000, 3),
+            'sql': normalizar_sql(sql),
+            'parametros': _quantidade_parametros(parametros),
+            'rota': _rota_atual(),
+            'plano': plano,
+            'varredura_completa': any(
+                linha.startswith('SCAN ') and ' INDEX ' not in linha and 'VIRTUAL TABLE' not in linha
+                for linha in plano
+            ),
+        }, ensure_ascii=False))
+    except Exception:
+        pass  # o log nunca deve derrubar a consulta original
+    finally:
+        _local.registrando = False
+
+def ativar(limite_ms: float, arquivo: str = ARQUIVO_PADRAO) -> None:
+    """Passa a registrar comandos com duração >= limite_ms"""
+    global _logger, _limite_segundos
+    _limite_segundos = limite_ms / 1000
+    if _logger is None:
+        _logger = logging.getLogger('equipamentos.consultas_lentas')
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+        if os.environ.get('EQUIPAMENTOS_MULTIPROCESSO') == '1':
+            handler = logging.handlers.WatchedFileHandler(arquivo, encoding='utf-8')
+        else:
+            handler = logging.handlers.RotatingFileHandler(
+                arquivo, maxBytes=TAMANHO_MAXIMO_LOG, backupCount=ARQUIVOS_ROTACAO, encoding='utf-8'
+            )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        _logger.addHandler(handler)
+    if _observar not in database.observadores_comando:
+        database.observadores_comando.append(_observar)
+
+def desativar() -> None:
+    global _logger
+    if _observar in database.observadores_comando:
+        database.observadores_comando.remove(_observar)
+    if _logger is not None:
+        for handler in list(_logger.handlers):
+            handler.close()
+            _logger.removeHandler(handler)
+        _logger = None
+
+def init_app(app) -> None:
+    """Ativa o log se SQLITE_CONSULTA_LENTA_MS (env ou app.config) for > 0"""
+    limite = float(app.config.get('SQLITE_CONSULTA_LENTA_MS', database.CONFIG['SQLITE_CONSULTA_LENTA_MS']))
+    if limite > 0:
+        ativar(limite, app.config.get('CONSULTAS_LENTAS_LOG', ARQUIVO_PADRAO))
+
+# ============================================================================
+# RESUMO
+# ============================================================================
+
+def arquivos_log(arquivo: str = ARQUIVO_PADRAO) -> List[str]:
+    """
+    O log atual e suas rotações numéricas (arquivo.1, arquivo.2, ...), do
+    rotacionado mais antigo até o atual. Outros arquivos com o mesmo prefixo
+    (arquivo.bak, arquivo_antigo) não fazem parte do log
+    """
+    rotacionados = [c for c in glob.glob(glob.escape(arquivo) + '.*') if c.rsplit('.', 1)[-1].isdigit()]
+    rotacionados.sort(key=lambda c: int(c.rsplit('.', 1)[-1]), reverse=True)
+    return rotacionados + ([arquivo] if os.path.exists(arquivo) else [])
+
+def ler_registros(arquivo: str = ARQUIVO_PADRAO) -> List[Dict[str, Any]]:
+    """Registros do log atual e dos arquivos já rotacionados"""
+    registros = []
+    for caminho in arquivos_log(arquivo):
+        with open(caminho, encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    registros.append(json.loads(linha))
+                except ValueError:
+                    continue
+    return registros
+
+def resumir(arquivo: str = ARQUIVO_PADRAO, top: int = 20, ordenar: str = 'total') -> List[Dict[str, Any]]:
+    """
+    Agrupa os registros por formato de consulta (SQL normalizado) e retorna
+    os piores, ordenados por tempo total, máximo ou número de ocorrências
+    """
+    grupos: Dict[str, Dict[str, Any]] = {}
+    for registro in ler_registros(arquivo):
+        grupo = grupos.setdefault(registro['sql'], {
+            'sql': registro['sql'],
+            'ocorrencias': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'rotas': set(),
+        })
+        grupo['ocorrencias'] += 1
+        grupo['total_ms'] += registro['duracao_ms']
+        grupo['max_ms'] = max(grupo['max_ms'], registro['duracao_ms'])
+        if registro.get('rota'):
+            grupo['rotas'].add(registro['rota'])
+        # Os registros vêm em ordem cronológica: fica o plano mais recente
+        grupo['plano'] = registro.get('plano', [])
+        grupo['varredura_completa'] = registro.get('varredura_completa', False)
+        grupo['ultima_ocorrencia'] = registro.get('data')
+
+    chaves = {'total': 'total_ms', 'max': 'max_ms', 'ocorrencias': 'ocorrencias'}
+    resultado = sorted(grupos.values(), key=lambda g: g[chaves.get(ordenar, 'total_ms')], reverse=True)[:top]
+    for grupo in resultado:
+        grupo['media_ms'] = round(grupo['total_ms'] / grupo['ocorrencias'], 3)
+        grupo['total_ms'] = round(grupo['total_ms'], 3)
+        grupo['rotas'] = sorted(grupo['rotas'])
+    return resultado
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Log de consultas lentas')
+    parser.add_argument('comando', choices=['resumo', 'limpar'])
+    parser.add_argument('--arquivo', default=ARQUIVO_PADRAO)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--ordenar', choices=['total', 'max', 'ocorrencias'], default='total')
+    args = parser.parse_args()
+
+    if args.comando == 'limpar':
+        for caminho in arquivos_log(args.arquivo):
+            os.remove(caminho)
+        print("Log de consultas lentas removido.")
+        return
+
+    grupos = resumir(args.arquivo, args.top, args.ordenar)
+    if not grupos:
+        print("Nenhuma consulta lenta registrada.")
+        return
+    for grupo in grupos:
+        alerta = '!!' if grupo['varredura_completa'] else '  '
+        print(f"\n{alerta} {grupo['ocorrencias']}x  total {grupo['total_ms']:.1f} ms  "
+              f"média {grupo['media_ms']:.1f} ms  máx {grupo['max_ms']:.1f} ms")
+        print(f"   {grupo['sql'][:300]}")
+        if grupo['rotas']:
+            print(f"   rotas: {', '.join(grupo['rotas'])}")
+        for linha in grupo['plano']:
+            print(f"     {linha}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,359 @@
+# src/database.py - Gerenciador de conexões SQLite
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from flask import g, has_app_context
+
+# Caminho absoluto para o banco (funciona em qualquer ambiente)
+DB_PATH = os.environ.get(
+    'EQUIPAMENTOS_DB_PATH',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'equipamentos.db')
+)
+
+# Ajustes de desempenho (podem ser sobrescritos por variáveis de ambiente
+# ou pelo app.config em init_app)
+CONFIG = {
+    'SQLITE_BUSY_TIMEOUT_MS': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'SQLITE_CACHE_SIZE_KB': int(os.environ.get('SQLITE_CACHE_SIZE_KB', 16384)),
+    'SQLITE_MMAP_SIZE': int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024)),
+    'SQLITE_POOL_SIZE': int(os.environ.get('SQLITE_POOL_SIZE', 8)),
+    # Limite do log de consultas lentas (0 = desativado)
+    'SQLITE_CONSULTA_LENTA_MS': int(os.environ.get('SQLITE_CONSULTA_LENTA_MS', 0)),
+    # Novas tentativas de BEGIN IMMEDIATE quando o busy_timeout se esgota
+    'SQLITE_TENTATIVAS_ESCRITA': int(os.environ.get('SQLITE_TENTATIVAS_ESCRITA', 5)),
+    'SQLITE_ESPERA_ESCRITA_MS': int(os.environ.get('SQLITE_ESPERA_ESCRITA_MS', 50)),
+}
+
+def _configurar_conexao(conn: sqlite3.Connection) -> None:
+    """Aplica os PRAGMAs de desempenho em uma conexão recém-aberta"""
+    conn.row_factory = sqlite3.Row  # permite acesso por nome da coluna
+    conn.execute(f"PRAGMA busy_timeout = {CONFIG['SQLITE_BUSY_TIMEOUT_MS']}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    # Valor negativo = tamanho em KiB (e não em páginas)
+    conn.execute(f"PRAGMA cache_size = -{CONFIG['SQLITE_CACHE_SIZE_KB']}")
+    conn.execute(f"PRAGMA mmap_size = {CONFIG['SQLITE_MMAP_SIZE']}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+
+# ============================================================================
+# INSTRUMENTAÇÃO
+# ============================================================================
+
+# Chamados a cada comando como observador(sql, duracao_em_segundos).
+# Leituras de linhas (fetchone/fetchmany/fetchall e a iteração direta, for
+# row in cursor) chamam com sql=None: somam tempo de SQLite sem contar um
+# novo comando. Na iteração, o tempo das linhas é acumulado e repassado a
+# cada LINHAS_POR_REPASSE linhas, e não a cada uma.
+observadores_sql: List[Callable[[Optional[str], float], None]] = []
+LINHAS_POR_REPASSE = 256
+
+# Chamados uma vez por comando concluído, com o tempo total (execução +
+# leitura das linhas): observador(conexao, sql, parametros, duracao_total).
+# Um SELECT é concluído ao esgotar as linhas (fetch* ou iteração direta), ao
+# reexecutar o cursor, ao fechá-lo ou quando ele é descartado; DML/DDL, logo
+# após o execute.
+observadores_comando: List[Callable[[sqlite3.Connection, str, Any, float], None]] = []
+
+class CursorInstrumentado(sqlite3.Cursor):
+    """Cursor que informa aos observadores cada comando e o tempo gasto"""
+
+    _comando: Optional[Tuple[str, Any]] = None  # (sql, parametros) em andamento
+    _tempo_comando = 0.0
+    _tempo_iteracao = 0.0  # linhas iteradas ainda não repassadas
+    _linhas_iteracao = 0
+
+    def _medir(self, chamada: Callable, sql: Optional[str], *args):
+        inicio = time.perf_counter()
+        try:
+            return chamada(*args)
+        finally:
+            duracao = time.perf_counter() - inicio
+            for observador in observadores_sql:
+                observador(sql, duracao)
+            if self._comando is not None:
+                self._tempo_comando += duracao
+
+    def _repassar_iteracao(self) -> None:
+        """Repassa aos observadores o tempo acumulado das linhas iteradas"""
+        duracao = self._tempo_iteracao
+        self._tempo_iteracao = 0.0
+        self._linhas_iteracao = 0
+        for observador in observadores_sql:
+            observador(None, duracao)
+        if self._comando is not None:
+            self._tempo_comando += duracao
+
+    def _iniciar_comando(self, sql: str, parametros: Any) -> None:
+        self._concluir_comando()
+        if observadores_comando:
+            self._comando = (sql, parametros)
+            self._tempo_comando = 0.0
+
+    def _concluir_comando(self) -> None:
+        if self._linhas_iteracao:
+            self._repassar_iteracao()
+        if self._comando is None:
+            return
+        sql, parametros = self._comando
+        self._comando = None
+        for observador in observadores_comando:
+            observador(self.connection, sql, parametros, self._tempo_comando)
+
+    def _executar(self, chamada: Callable, sql: str, parametros: Any):
+        if not observadores_sql and not observadores_comando and self._comando is None:
+            return chamada(sql, parametros)
+        self._iniciar_comando(sql, parametros)
+        try:
+            resultado = self._medir(chamada, sql, sql, parametros)
+        except Exception:
+            self._comando = None
+            raise
+        if self.description is None:
+            self._concluir_comando()
+        return resultado
+
+    def execute(self, sql, parametros=(), /):
+        return self._executar(super().execute, sql, parametros)
+
+    def executemany(self, sql, sequencia, /):
+        return self._executar(super().executemany, sql, sequencia)
+
+    def __next__(self):
+        if not observadores_sql and self._comando is None:
+            return super().__next__()
+        inicio = time.perf_counter()
+        try:
+            linha = super().__next__()
+        except StopIteration:
+            self._tempo_iteracao += time.perf_counter() - inicio
+            self._concluir_comando()
+            raise
+        except BaseException:
+            self._tempo_iteracao += time.perf_counter() - inicio
+            self._repassar_iteracao()
+            self._comando = None
+            raise
+        self._tempo_iteracao += time.perf_counter() - inicio
+        self._linhas_iteracao += 1
+        if self._linhas_iteracao >= LINHAS_POR_REPASSE:
+            self._repassar_iteracao()
+        return linha
+
+    def fetchone(self):
+        if not observadores_sql and self._comando is None:
+            return super().fetchone()
+        linha = self._medir(super().fetchone, None)
+        if linha is None:
+            self._concluir_comando()
+        return linha
+
+    def fetchmany(self, size=None):
+        tamanho = self.arraysize if size is None else size
+        if not observadores_sql and self._comando is None:
+            return super().fetchmany(tamanho)
+        linhas = self._medir(super().fetchmany, None, tamanho)
+        if len(linhas) < tamanho:
+            self._concluir_comando()
+        return linhas
+
+    def fetchall(self):
+        if not observadores_sql and self._comando is None:
+            return super().fetchall()
+        linhas = self._medir(super().fetchall, None)
+        self._concluir_comando()
+        return linhas
+
+    def close(self):
+        self._concluir_comando()
+        return super().close()
+
+    def __del__(self):
+        # Cursor descartado sem esgotar as linhas nem ser fechado (ex.: um
+        # fetchone() de uma linha só, ou um for interrompido)
+        try:
+            self._concluir_comando()
+        except Exception:
+            pass
+
+class ConexaoInstrumentada(sqlite3.Connection):
+    """
+    Conexão cujos atalhos execute/executemany passam pelo CursorInstrumentado
+    (os atalhos nativos não chamam o cursor da subclasse) e cujo COMMIT conta
+    como comando
+    """
+
+    def cursor(self, factory=CursorInstrumentado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=(), /):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, sequencia, /):
+        return self.cursor().executemany(sql, sequencia)
+
+    def commit(self):
+        if (not observadores_sql and not observadores_comando) or not self.in_transaction:
+            return super().commit()
+        inicio = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            duracao = time.perf_counter() - inicio
+            for observador in observadores_sql:
+                observador('COMMIT', duracao)
+            for observador in observadores_comando:
+                observador(self, 'COMMIT', (), duracao)
+
+def criar_conexao(db_path: Optional[str] = None) -> sqlite3.Connection:
+    """Abre uma nova conexão já configurada (fora do pool)"""
+    conn = sqlite3.connect(
+        db_path or DB_PATH,
+        timeout=CONFIG['SQLITE_BUSY_TIMEOUT_MS'] / 1000,
+        check_same_thread=False,
+        factory=ConexaoInstrumentada
+    )
+    _configurar_conexao(conn)
+    return conn
+
+class PoolConexoes:
+    """
+    Pool simples de conexões SQLite reaproveitadas entre requisições
+    """
+
+    def __init__(self, db_path: str, tamanho_maximo: int):
+        self.db_path = db_path
+        self.tamanho_maximo = tamanho_maximo
+        self._livres: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=tamanho_maximo)
+
+    def obter(self) -> sqlite3.Connection:
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            return criar_conexao(self.db_path)
+
+    def devolver(self, conn: sqlite3.Connection) -> None:
+        # Nunca devolve ao pool uma conexão com transação pendente
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._livres.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def fechar_todas(self) -> None:
+        while True:
+            try:
+                self._livres.get_nowait().close()
+            except queue.Empty:
+                break
+
+_pool: Optional[PoolConexoes] = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+def obter_pool() -> PoolConexoes:
+    """Retorna o pool global, criando-o na primeira chamada"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexoes(DB_PATH, CONFIG['SQLITE_POOL_SIZE'])
+    return _pool
+
+def get_db_connection() -> sqlite3.Connection:
+    """
+    Retorna a conexão da requisição atual (dentro do Flask) ou da thread atual
+    (scripts e CLI). A conexão é reaproveitada e NÃO deve ser fechada pelo
+    chamador; use `with conn:` para delimitar transações.
+    """
+    if has_app_context():
+        conn = g.get('_db_conn')
+        if conn is None:
+            conn = g._db_conn = obter_pool().obter()
+        return conn
+
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _local.conn = criar_conexao()
+    return conn
+
+def liberar_conexao(exc: Optional[BaseException] = None) -> None:
+    """Devolve ao pool a conexão usada no contexto da aplicação"""
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        obter_pool().devolver(conn)
+
+def fechar_conexoes() -> None:
+    """Fecha a conexão da thread atual e todas as conexões ociosas do pool"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+    if _pool is not None:
+        _pool.fechar_todas()
+
+# ============================================================================
+# TRANSAÇÕES DE ESCRITA
+# ============================================================================
+
+def banco_ocupado(erro: sqlite3.OperationalError) -> bool:
+    """SQLITE_BUSY / SQLITE_LOCKED ("database is locked")"""
+    codigo = getattr(erro, 'sqlite_errorcode', None)  # Python 3.11+
+    if codigo is not None:
+        return codigo & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    mensagem = str(erro)
+    return 'locked' in mensagem or 'busy' in mensagem
+
+def iniciar_escrita(conn: sqlite3.Connection) -> None:
+    """
+    Abre uma transação de escrita (BEGIN IMMEDIATE). O lock de escritor é
+    obtido já no BEGIN: depois dele os comandos da transação não recebem
+    SQLITE_BUSY, e uma transação que leu antes de escrever não falha ao
+    tentar promover o lock (o que o busy_timeout não resolve).
+
+    Se outro processo segurar o lock além do busy_timeout, tenta de novo
+    com espera exponencial e aleatória, para os processos não voltarem
+    todos ao mesmo tempo.
+    """
+    tentativas = max(1, CONFIG['SQLITE_TENTATIVAS_ESCRITA'])
+    for tentativa in range(tentativas):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as erro:
+            if not banco_ocupado(erro) or tentativa == tentativas - 1:
+                raise
+            espera = CONFIG['SQLITE_ESPERA_ESCRITA_MS'] / 1000 * (2 ** tentativa)
+            time.sleep(espera * random.uniform(0.5, 1.5))
+
+def dividir_script(script: str) -> List[str]:
+    """Divide um script SQL em comandos completos (respeita BEGIN...END de triggers)"""
+    comandos, atual = [], ''
+    for linha in script.splitlines(keepends=True):
+        atual += linha
+        if sqlite3.complete_statement(atual):
+            comandos.append(atual.strip())
+            atual = ''
+    if atual.strip():
+        comandos.append(atual.strip())
+    return comandos
+
+def executar_script(conn: sqlite3.Connection, script: str) -> None:
+    """
+    Executa um script comando a comando dentro da transação corrente
+    (ao contrário de executescript, que faz COMMIT antes de começar)
+    """
+    for comando in dividir_script(script):
+        conn.execute(comando)
+
+def init_app(app) -> None:
+    """Registra o gerenciador de conexões na aplicação Flask"""
+    for chave in CONFIG:
+        if chave in app.config:
+            CONFIG[chave] = int(app.config[chave])
+    app.teardown_appcontext(liberar_conexao)
@@ -0,0 +1,75 @@
+# src/facetas.py - Valores distintos e contagens dos campos de filtro (facetas)
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+from cache import CacheVersionado, versao_dados
+from database import get_db_connection
+from models import CAMPOS_FILTRO
+
+TAMANHO_BLOCO_LEITURA = 5000
+
+_cache_facetas = CacheVersionado(max_itens=64)
+
+def _ordem_sqlite(item) -> tuple:
+    """Mesma ordem do ORDER BY do SQLite: números antes de texto"""
+    valor = item[0]
+    if isinstance(valor, (int, float)):
+        return (0, valor, '')
+    return (1, 0, str(valor))
+
+def normalizar_campos(campos: Optional[Sequence[str]]) -> List[str]:
+    """Campos pedidos que podem virar faceta (todos, se nenhum for informado)"""
+    if not campos:
+        return list(CAMPOS_FILTRO)
+    return [campo for campo in CAMPOS_FILTRO if campo in campos]
+
+def contar_valores(cursor, quantidade_campos: int) -> List[Counter]:
+    """
+    Consome o cursor (uma coluna por campo) em blocos e conta os valores de
+    cada coluna em uma única passada
+    """
+    contadores = [Counter() for _ in range(quantidade_campos)]
+    while True:
+        bloco = cursor.fetchmany(TAMANHO_BLOCO_LEITURA)
+        if not bloco:
+            break
+        for contador, coluna in zip(contadores, zip(*bloco)):
+            contador.update(coluna)
+    return contadores
+
+def formatar_facetas(campos: Sequence[str], contadores: Sequence[Counter]) -> Dict[str, List[Dict[str, Any]]]:
+    """{campo: [{'valor', 'total'}, ...]} em ordem de valor, sem nulos e vazios"""
+    return {
+        campo: [
+            {'valor': valor, 'total': total}
+            for valor, total in sorted(contador.items(), key=_ordem_sqlite)
+            if valor is not None and valor != ''
+        ]
+        for campo, contador in zip(campos, contadores)
+    }
+
+def montar_facetas(campos: Optional[Sequence[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Valores distintos e quantidade de equipamentos de cada campo de filtro,
+    lendo a tabela uma única vez (em vez de um SELECT DISTINCT por campo)
+    """
+    campos = normalizar_campos(campos)
+    if not campos:
+        return {}
+
+    cursor = get_db_connection().cursor()
+    cursor.row_factory = None  # tuplas simples: a contagem é por coluna
+    try:
+        cursor.execute(f"SELECT {', '.join(campos)} FROM equipamentos")
+        contadores = contar_valores(cursor, len(campos))
+    finally:
+        cursor.close()
+    return formatar_facetas(campos, contadores)
+
+def obter_facetas(campos: Optional[Sequence[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Facetas em cache até a próxima alteração nos equipamentos"""
+    campos = normalizar_campos(campos)
+    versao = versao_dados(get_db_connection())
+    return _cache_facetas.obter_ou_calcular(
+        ('facetas', tuple(campos)), versao, lambda: montar_facetas(campos)
+    )
@@ -0,0 +1,212 @@
+# src/gerar_dados.py - Gerador de base sintética para testes de escala
+#
+# Gera um banco novo (esquema completo via migrações) com distribuições
+# parecidas com as da base real: poucos centros de custo concentrando a
+# maioria dos ativos, notebooks e monitores dominando os tipos, etc.
+# A mesma semente sempre produz exatamente os mesmos dados.
+#   python src/gerar_dados.py --linhas 100000
+#   python src/gerar_dados.py --linhas 1000000 --semente 7 --saida /tmp/grande.db
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+from typing import Iterator, List, Sequence, Tuple
+
+from database import criar_conexao, executar_script
+
+BANCO_PADRAO = os.path.join(os.path.dirname(__file__), '..', 'data', 'benchmark.db')
+
+COLUNAS = [
+    'tipo', 'descritivo', 'centro_custo', 'patrimonio', 'numero_serie',
+    'local_atual', 'setor', 'usuario', 'funcao', 'obra_projeto', 'observacao',
+    'data_recebimento', 'data_devolucao', 'valor_locacao', 'status',
+    'teamviewer_id', 'cargo', 'host'
+]
+
+# (tipo, peso, faixa de valor de locação, descritivos)
+TIPOS = [
+    ('Notebook', 45, (250.0, 650.0), ['NOTEBOOK LENOVO THINKPAD L14', 'NOTEBOOK DELL LATITUDE 5440',
+                                      'NOTEBOOK LENOVO THINKPAD E14', 'NOTEBOOK HP PROBOOK 440 G9']),
+    ('Monitor', 32, (40.0, 120.0), ['MONITOR PHILIPS 221V8L', 'MONITOR AOC 27G2BK', 'MONITOR DELL P2422H']),
+    ('Desktop', 8, (180.0, 420.0), ['DESKTOP DELL OPTIPLEX 7010', 'DESKTOP LENOVO THINKCENTRE M70Q']),
+    ('Celular', 6, (60.0, 160.0), ['CELULAR SAMSUNG GALAXY A54', 'CELULAR MOTOROLA G84']),
+    ('Tablet', 5, (80.0, 210.0), ['TABLET SAMSUNG GALAXY TAB A8', 'TABLET LENOVO TAB M10']),
+    ('Impressora', 4, (150.0, 520.0), ['IMPRESSORA HP LASERJET M428', 'IMPRESSORA EPSON L6270']),
+]
+
+STATUS = [('Em uso', 78), ('Devolvido', 17), ('Manutenção', 3), ('Estoque', 2)]
+
+SETORES = [('ENGENHARIA', 30), ('PRODUÇÃO', 20), ('SSMA', 10), ('SUPRIMENTOS', 8), ('PLANEJAMENTO', 8),
+           ('QUALIDADE', 7), ('ADMINISTRATIVO', 7), ('FINANCEIRO', 4), ('TI', 3), ('RH', 3)]
+
+FUNCOES = ['ENGENHEIRO', 'ASSISTENTE DE ENGENHARIA', 'ANALISTA DE PLANEJAMENTO JR', 'COORDENADOR DE ENGENHARIA',
+           'TECNICO DE SEGURANCA DO TRABALHO', 'COMPRADOR', 'ANALISTA ADMINISTRATIVO', 'ENCARREGADO DE OBRA',
+           'TECNICO DE ENFERMAGEM DO TRABALHO PL', 'GERENTE DE CONTRATO', 'ESTAGIARIO']
+
+CENTROS_REAIS = ['CTC INFRA', 'ARKLOK', 'A2WORKS', 'CONSORCIO BRi9']
+
+NOMES = ['ANA', 'BRUNO', 'CAMILA', 'DANIEL', 'EDUARDO', 'FERNANDA', 'GABRIEL', 'HELENA', 'IGOR', 'JULIANA',
+         'LUCAS', 'MARIANA', 'NATALIA', 'OTAVIO', 'PAULA', 'RAFAEL', 'SABRINA', 'THIAGO', 'VANESSA', 'JOSE',
+         'CARLOS', 'AFONSO', 'DAIAN', 'GUILHERME', 'LETICIA', 'MARCOS', 'PRISCILA', 'RODRIGO', 'TATIANE', 'VITOR']
+
+SOBRENOMES = ['SILVA', 'SANTOS', 'OLIVEIRA', 'SOUZA', 'LIMA', 'PEREIRA', 'COSTA', 'RODRIGUES', 'ALMEIDA',
+              'NASCIMENTO', 'CARVALHO', 'ARAUJO', 'RIBEIRO', 'TEIXEIRA', 'XAVIER', 'ANDRADE', 'CRUZ', 'VIDAL',
+              'MACEDO', 'MOREIRA', 'BARBOSA', 'ROCHA', 'DIAS', 'MENDES', 'CASTRO', 'CAMPOS', 'FREITAS', 'PINTO']
+
+def _pesos_zipf(quantidade: int, expoente: float = 1.1) -> List[float]:
+    """Pesos de cauda longa: o primeiro item é o mais frequente"""
+    return [1 / (k ** expoente) for k in range(1, quantidade + 1)]
+
+def _escolher(rng: random.Random, opcoes: Sequence, pesos: Sequence[float], quantidade: int) -> List:
+    return rng.choices(opcoes, weights=pesos, k=quantidade)
+
+def gerar_equipamentos(linhas: int, semente: int = 42, hoje: date = None) -> Iterator[Tuple]:
+    """
+    Gera `linhas` equipamentos (tuplas na ordem de COLUNAS).
+    Escala: ~1 centro de custo a cada 2.500 ativos, ~1 local a cada 500 e
+    ~1,7 ativo por usuário em média. Patrimônio e número de série são únicos.
+    """
+    rng = random.Random(semente)
+    hoje = hoje or date(2026, 1, 1)
+
+    centros = CENTROS_REAIS + [f'OBRA {n:04d}' for n in range(1, max(0, linhas // 2500 - len(CENTROS_REAIS)) + 1)]
+    pesos_centros = _pesos_zipf(len(centros))
+    locais = [f'OBRA TB{n:02d}' for n in range(1, max(5, linhas // 500) + 1)]
+    pesos_locais = _pesos_zipf(len(locais), 0.9)
+    obras = [f'SCALA DATACENTER TB{n:02d}' for n in range(1, max(3, linhas // 20000) + 1)]
+
+    usuarios = [
+        f'{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)} {n:05d}'
+        for n in range(max(1, int(linhas * 0.6)))
+    ]
+
+    tipos = [t for t, _, _, _ in TIPOS]
+    dados_tipo = {t: (faixa, descritivos) for t, _, faixa, descritivos in TIPOS}
+
+    bloco = 10000
+    for inicio in range(0, linhas, bloco):
+        n = min(bloco, linhas - inicio)
+        tipos_bloco = _escolher(rng, tipos, [p for _, p, _, _ in TIPOS], n)
+        status_bloco = _escolher(rng, [s for s, _ in STATUS], [p for _, p in STATUS], n)
+        setores_bloco = _escolher(rng, [s for s, _ in SETORES], [p for _, p in SETORES], n)
+        centros_bloco = _escolher(rng, centros, pesos_centros, n)
+        locais_bloco = _escolher(rng, locais, pesos_locais, n)
+
+        for j in range(n):
+            i = inicio + j
+            tipo = tipos_bloco[j]
+            status = status_bloco[j]
+            faixa, descritivos = dados_tipo[tipo]
+
+            # Recebimentos nos últimos 5 anos, concentrados nos mais recentes
+            recebimento = hoje - timedelta(days=int(rng.betavariate(1.2, 2.5) * 1825))
+            devolucao = None
+            if status == 'Devolvido':
+                devolucao = min(hoje, recebimento + timedelta(days=rng.randint(30, 900)))
+
+            prefixo = rng.choices(['ARK', 'NOT', 'LOC', ''], weights=[55, 20, 10, 15])[0]
+            patrimonio = f'{prefixo}{400000 + i}' if prefixo else str(10000 + i)
+            computador = tipo in ('Notebook', 'Desktop')
+
+            yield (
+                tipo,
+                rng.choice(descritivos),
+                centros_bloco[j],
+                patrimonio,
+                f'{rng.choice("ABCDEFGHJKPRSTX")}{rng.choice("ABCDEFGHJKPRSTX")}{i:08X}',
+                locais_bloco[j],
+                setores_bloco[j],
+                rng.choice(usuarios) if status != 'Estoque' else None,
+                rng.choice(FUNCOES),
+                rng.choice(obras),
+                'Gerado para benchmark' if rng.random() < 0.05 else None,
+                recebimento.isoformat(),
+                devolucao.isoformat() if devolucao else None,
+                round(rng.uniform(*faixa), 2) if rng.random() > 0.08 else None,
+                status,
+                str(rng.randint(100000000, 999999999)) if computador and rng.random() < 0.7 else None,
+                rng.choice(FUNCOES),
+                f'NB-{i:07d}' if computador else None,
+            )
+
+def popular_banco(db_path: str, linhas: int, semente: int = 42, tamanho_bloco: int = 10000,
+                  substituir: bool = False, verboso: bool = True) -> float:
+    """
+    Cria o banco em `db_path` (migrações + dados sintéticos) e retorna o
+    tempo gasto em segundos.
+
+    Carga em massa: os triggers de inserção dos índices FTS e os índices das
+    consultas são removidos durante os INSERTs e recriados no final (os
+    índices FTS são reconstruídos de uma vez), tudo na mesma transação. Os triggers de resumo
+    e de versão continuam ativos.
+    """
+    from busca_texto import SQL_INDICE_FTS, SQL_INDICE_IDENTIFICADORES, identificadores_ativo
+    from migrations import SQL_INDICES_CONSULTAS, migrar
+
+    if os.path.exists(db_path):
+        if not substituir:
+            raise FileExistsError(f'{db_path} já existe (use --substituir)')
+        for sufixo in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + sufixo):
+                os.remove(db_path + sufixo)
+
+    inicio = time.perf_counter()
+    conn = criar_conexao(db_path)
+    migrar(conn)
+    conn.execute("PRAGMA cache_size = -262144")  # 256 MB só para a carga
+
+    sql = f"INSERT INTO equipamentos ({', '.join(COLUNAS)}) VALUES ({', '.join('?' * len(COLUNAS))})"
+    linhas_geradas = gerar_equipamentos(linhas, semente)
+    inseridas = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DROP TRIGGER IF EXISTS equipamentos_fts_ai")
+        conn.execute("DROP TRIGGER IF EXISTS equipamentos_ids_fts_ai")
+        indices = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_equip_%'"
+        )]
+        for indice in indices:
+            conn.execute(f"DROP INDEX {indice}")
+
+        while True:
+            bloco = [linha for _, linha in zip(range(tamanho_bloco), linhas_geradas)]
+            if not bloco:
+                break
+            conn.executemany(sql, bloco)
+            inseridas += len(bloco)
+            if verboso:
+                print(f'\r{inseridas}/{linhas} linhas', end='', flush=True)
+
+        if verboso:
+            print('\nRecriando índices e índice FTS...')
+        executar_script(conn, SQL_INDICES_CONSULTAS)
+        executar_script(conn, SQL_INDICE_FTS)
+        conn.execute("INSERT INTO equipamentos_fts(equipamentos_fts) VALUES ('rebuild')")
+        if identificadores_ativo(conn):
+            executar_script(conn, SQL_INDICE_IDENTIFICADORES)
+            conn.execute("INSERT INTO equipamentos_ids_fts(equipamentos_ids_fts) VALUES ('rebuild')")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    conn.execute("ANALYZE")
+    conn.close()
+
+    duracao = time.perf_counter() - inicio
+    if verboso:
+        print(f'{inseridas} equipamentos gerados em {duracao:.1f}s -> {db_path}')
+    return duracao
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Gera uma base sintética de equipamentos')
+    parser.add_argument('--linhas', type=int, default=100000, help='Quantidade de equipamentos (padrão: 100000)')
+    parser.add_argument('--semente', type=int, default=42, help='Semente do gerador (padrão: 42)')
+    parser.add_argument('--saida', default=BANCO_PADRAO, help='Arquivo do banco (padrão: data/benchmark.db)')
+    parser.add_argument('--substituir', action='store_true', help='Sobrescreve o banco se já existir')
+    args = parser.parse_args()
+
+    popular_banco(os.path.abspath(args.saida), args.linhas, args.semente, substituir=args.substituir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# src/gunicorn.conf.py - Servidor de produção com vários processos
+#   gunicorn -c src/gunicorn.conf.py
+#
+# Cada worker é um processo com seu próprio pool de conexões SQLite, então
+# as leituras usam todos os núcleos. As escritas continuam sendo uma por vez
+# (um escritor no SQLite): WAL deixa as leituras seguirem durante uma escrita
+# e iniciar_escrita (database.py) espera o lock com novas tentativas.
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+wsgi_app = 'wsgi:app'
+bind = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 4))
+# Uploads em lote síncronos podem levar mais que o padrão de 30 s
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+# Sem preload: conexões SQLite não devem atravessar o fork
+preload_app = False
+accesslog = os.environ.get('WEB_ACCESSLOG') or None
+
+# Herdados pelos workers: métricas somadas entre processos (metricas.py) e
+# log de consultas lentas sem rotação pelo app (consultas_lentas.py)
+os.environ['EQUIPAMENTOS_MULTIPROCESSO'] = '1'
+_METRICAS_TEMPORARIAS = os.path.join(tempfile.gettempdir(), f'equipamentos-metricas-{os.getpid()}')
+os.environ.setdefault('METRICAS_DIR', _METRICAS_TEMPORARIAS)
+
+def on_starting(server):
+    """
+    Migrações, compactação do histórico e limpeza das cargas em lote uma
+    vez, no processo mestre, antes dos workers. Eles herdam
+    EQUIPAMENTOS_BANCO_PREPARADO e o create_app pula essa etapa.
+    """
+    # Métricas de uma execução anterior não entram na soma
+    metricas_dir = os.environ['METRICAS_DIR']
+    os.makedirs(metricas_dir, exist_ok=True)
+    for nome in os.listdir(metricas_dir):
+        if nome.endswith('.json'):
+            os.remove(os.path.join(metricas_dir, nome))
+
+    sys.path.insert(0, chdir)
+    from database import criar_conexao
+    from historico import compactar
+    from migrations import migrar
+    from tarefas_lote import recuperar_tarefas
+
+    conn = criar_conexao()
+    try:
+        aplicadas = migrar(conn)
+        compactacao = compactar(conn)
+    finally:
+        conn.close()
+    tarefas = recuperar_tarefas()
+    os.environ['EQUIPAMENTOS_BANCO_PREPARADO'] = '1'
+    if aplicadas:
+        server.log.info("Migrações aplicadas: %s", aplicadas)
+    if compactacao['removidos'] or compactacao['agrupados']:
+        server.log.info("Histórico compactado: %s", compactacao)
+    if tarefas['interrompidas'] or tarefas['removidas']:
+        server.log.info("Cargas em lote: %s", tarefas)
+
+def on_exit(server):
+    if os.environ['METRICAS_DIR'] == _METRICAS_TEMPORARIAS:
+        shutil.rmtree(_METRICAS_TEMPORARIAS, ignore_errors=True)
@@ -0,0 +1,390 @@
+# src/historico.py - Histórico de alterações dos equipamentos (somente inserção)
+#
+# Triggers gravam um evento por INSERT/UPDATE/DELETE em "equipamentos", na
+# mesma transação da alteração (inclusive nas cargas em lote e na
+# importação, em que os eventos saem junto com cada executemany):
+#   I - inclusão (sem valores: a linha atual e os eventos seguintes a remontam)
+#   U - alteração, só com os campos que mudaram: {"campo": [antigo, novo]}
+#   D - exclusão, com a linha completa (única cópia que sobra)
+# O estado em uma data é remontado a partir da tabela atual, desfazendo os
+# eventos posteriores a ela.
+#   python src/historico.py status
+#   python src/historico.py compactar --retencao-dias 730 --agrupar-apos-dias 30
+import argparse
+import heapq
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from database import criar_conexao, executar_script, get_db_connection, iniciar_escrita
+
+# Colunas acompanhadas (todas, menos o id)
+CAMPOS_HISTORICO = (
+    'tipo', 'descritivo', 'centro_custo', 'patrimonio', 'numero_serie',
+    'local_atual', 'setor', 'usuario', 'funcao', 'obra_projeto', 'observacao',
+    'data_recebimento', 'data_devolucao', 'valor_locacao', 'status',
+    'teamviewer_id', 'cargo', 'host'
+)
+
+# Política de compactação: eventos mais antigos que a retenção são
+# descartados; alterações seguidas do mesmo equipamento no mesmo dia, mais
+# antigas que o agrupamento, viram um único evento
+HISTORICO_RETENCAO_DIAS = int(os.environ.get('HISTORICO_RETENCAO_DIAS', 730))
+HISTORICO_AGRUPAR_APOS_DIAS = int(os.environ.get('HISTORICO_AGRUPAR_APOS_DIAS', 30))
+
+TAMANHO_BLOCO_LEITURA = 1000
+FORMATO_MOMENTO = '%Y-%m-%d %H:%M:%f'  # strftime do SQLite (%f = SS.SSS)
+
+_AGORA = f"strftime('{FORMATO_MOMENTO}', 'now', 'localtime')"
+
+# Só os campos alterados: json_patch remove as chaves com valor nulo
+_ALTERACOES = "json_patch('{}', json_object(" + ", ".join(
+    f"'{campo}', CASE WHEN old.{campo} IS NOT new.{campo} "
+    f"THEN json_array(old.{campo}, new.{campo}) END"
+    for campo in CAMPOS_HISTORICO
+) + "))"
+
+_LINHA_ANTIGA = "json_object(" + ", ".join(f"'{campo}', old.{campo}" for campo in CAMPOS_HISTORICO) + ")"
+
+SQL_HISTORICO = f"""
+    CREATE TABLE IF NOT EXISTS historico_equipamentos (
+        id INTEGER PRIMARY KEY,
+        equipamento_id INTEGER NOT NULL,
+        patrimonio TEXT,
+        operacao TEXT NOT NULL CHECK (operacao IN ('I', 'U', 'D')),
+        alterado_em TEXT NOT NULL,
+        alteracoes TEXT
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_historico_equipamento ON historico_equipamentos(equipamento_id, id);
+    CREATE INDEX IF NOT EXISTS idx_historico_patrimonio ON historico_equipamentos(patrimonio);
+    CREATE INDEX IF NOT EXISTS idx_historico_data ON historico_equipamentos(alterado_em);
+
+    -- inicio: momento mais antigo que o histórico consegue remontar
+    -- agrupado_ate: até onde a compactação já agrupou (limite de dia)
+    CREATE TABLE IF NOT EXISTS historico_controle (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        inicio TEXT NOT NULL,
+        agrupado_ate TEXT NOT NULL
+    );
+
+    INSERT OR IGNORE INTO historico_controle (id, inicio, agrupado_ate) VALUES (1, {_AGORA}, '');
+
+    CREATE TRIGGER IF NOT EXISTS historico_ai AFTER INSERT ON equipamentos BEGIN
+        INSERT INTO historico_equipamentos (equipamento_id, patrimonio, operacao, alterado_em)
+        VALUES (new.id, new.patrimonio, 'I', {_AGORA});
+    END;
+
+    -- Guarda o patrimônio anterior: trocas de patrimônio continuam
+    -- encontráveis pelo número antigo (o novo está na tabela atual)
+    CREATE TRIGGER IF NOT EXISTS historico_au AFTER UPDATE ON equipamentos BEGIN
+        INSERT INTO historico_equipamentos (equipamento_id, patrimonio, operacao, alterado_em, alteracoes)
+        SELECT old.id, old.patrimonio, 'U', {_AGORA}, alteracoes
+        FROM (SELECT {_ALTERACOES} AS alteracoes)
+        WHERE alteracoes <> '{{}}';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS historico_ad AFTER DELETE ON equipamentos BEGIN
+        INSERT INTO historico_equipamentos (equipamento_id, patrimonio, operacao, alterado_em, alteracoes)
+        VALUES (old.id, old.patrimonio, 'D', {_AGORA}, {_LINHA_ANTIGA});
+    END;
+"""
+
+def criar_historico(conn: sqlite3.Connection) -> None:
+    """Cria tabela, índices e triggers (usado pela migração)"""
+    executar_script(conn, SQL_HISTORICO)
+
+def _formatar_momento(momento: datetime) -> str:
+    return momento.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+def interpretar_momento(valor: str) -> str:
+    """
+    'AAAA-MM-DD' (fim do dia) ou 'AAAA-MM-DDTHH:MM[:SS]' no formato dos
+    eventos. Lança ValueError se a data for inválida.
+    """
+    valor = (valor or '').strip()
+    if len(valor) == 10:
+        momento = datetime.strptime(valor, '%Y-%m-%d') + timedelta(days=1, milliseconds=-1)
+    else:
+        momento = datetime.fromisoformat(valor)
+    return _formatar_momento(momento)
+
+def _evento(row) -> Dict[str, Any]:
+    return {
+        'id': row['id'],
+        'equipamento_id': row['equipamento_id'],
+        'patrimonio': row['patrimonio'],
+        'operacao': row['operacao'],
+        'alterado_em': row['alterado_em'],
+        'alteracoes': json.loads(row['alteracoes']) if row['alteracoes'] else {},
+    }
+
+# ============================================================================
+# CONSULTAS
+# ============================================================================
+
+def historico_equipamento(patrimonio: str, limite: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Eventos do equipamento, do mais recente ao mais antigo. Inclui o que foi
+    gravado com patrimônios anteriores e os equipamentos já excluídos que
+    usaram este patrimônio.
+    """
+    conn = get_db_connection()
+    ids = [row[0] for row in conn.execute(
+        """
+        SELECT id FROM equipamentos WHERE patrimonio = ?
+        UNION
+        SELECT equipamento_id FROM historico_equipamentos WHERE patrimonio = ?
+        """,
+        (patrimonio, patrimonio)
+    )]
+    if not ids:
+        return []
+
+    marcadores = ', '.join('?' * len(ids))
+    query = f"""
+        SELECT id, equipamento_id, patrimonio, operacao, alterado_em, alteracoes
+        FROM historico_equipamentos
+        WHERE equipamento_id IN ({marcadores})
+        ORDER BY id DESC
+    """
+    params: List[Any] = list(ids)
+    if limite:
+        query += " LIMIT ?"
+        params.append(limite)
+    return [_evento(row) for row in conn.execute(query, params)]
+
+def inicio_historico(conn: Optional[sqlite3.Connection] = None) -> str:
+    conn = conn or get_db_connection()
+    return conn.execute("SELECT inicio FROM historico_controle WHERE id = 1").fetchone()[0]
+
+def _desfazer(estado: Optional[Dict[str, Any]], evento) -> Optional[Dict[str, Any]]:
+    """Estado do equipamento antes do evento, a partir do estado depois dele"""
+    operacao = evento['operacao']
+    if operacao == 'I':
+        return None
+    alteracoes = json.loads(evento['alteracoes'])
+    if operacao == 'D':
+        return {'id': evento['equipamento_id'], **alteracoes}
+    estado = dict(estado or {'id': evento['equipamento_id']})
+    for campo, (antigo, _novo) in alteracoes.items():
+        estado[campo] = antigo
+    return estado
+
+def _atende(linha: Dict[str, Any], filtros: Dict[str, Any]) -> bool:
+    return all(linha.get(campo) == valor for campo, valor in filtros.items())
+
+def inventario_em(
+    momento: str,
+    filtros: Optional[Dict[str, Any]] = None,
+    tamanho_bloco: int = TAMANHO_BLOCO_LEITURA
+) -> Tuple[List[str], Iterator[List[Tuple]]]:
+    """
+    Inventário como estava em `momento` (ver interpretar_momento), em blocos
+    ordenados por id, como em iterar_equipamentos_avancado. Só os
+    equipamentos alterados depois do momento são remontados em memória; os
+    demais vêm direto da tabela (com os filtros de igualdade no SQL).
+    Lança ValueError para momentos anteriores ao início do histórico.
+    """
+    conn = get_db_connection()
+    filtros = {campo: valor for campo, valor in (filtros or {}).items() if campo in CAMPOS_HISTORICO and valor}
+    conn.execute("BEGIN")  # tabela e eventos da mesma fotografia
+    try:
+        inicio = inicio_historico(conn)
+        if momento < inicio:
+            raise ValueError(f"Histórico disponível a partir de {inicio}")
+
+        eventos = conn.execute(
+            """
+            SELECT equipamento_id, operacao, alteracoes
+            FROM historico_equipamentos
+            WHERE alterado_em > ?
+            ORDER BY id DESC
+            """,
+            (momento,)
+        ).fetchall()
+
+        alterados = sorted({evento['equipamento_id'] for evento in eventos})
+        estados: Dict[int, Optional[Dict[str, Any]]] = {}
+        for inicio_bloco in range(0, len(alterados), 500):
+            ids = alterados[inicio_bloco:inicio_bloco + 500]
+            for row in conn.execute(
+                f"SELECT * FROM equipamentos WHERE id IN ({', '.join('?' * len(ids))})", ids
+            ):
+                estados[row['id']] = dict(row)
+        for evento in eventos:
+            estados[evento['equipamento_id']] = _desfazer(estados.get(evento['equipamento_id']), evento)
+
+        where = " AND ".join(f"{campo} = ?" for campo in filtros)
+        cursor = conn.execute(
+            "SELECT * FROM equipamentos" + (f" WHERE {where}" if where else "") + " ORDER BY id",
+            list(filtros.values())
+        )
+        colunas = [descricao[0] for descricao in cursor.description]
+    except Exception:
+        conn.rollback()
+        raise
+
+    remontados = [
+        tuple(estado.get(coluna) for coluna in colunas)
+        for _, estado in sorted(estados.items())
+        if estado is not None and _atende(estado, filtros)
+    ]
+
+    def linhas() -> Iterator[Tuple]:
+        try:
+            while True:
+                bloco = cursor.fetchmany(tamanho_bloco)
+                if not bloco:
+                    break
+                for row in bloco:
+                    if row['id'] not in estados:
+                        yield tuple(row)
+        finally:
+            cursor.close()
+            conn.rollback()  # encerra a transação de leitura
+
+    def blocos() -> Iterator[List[Tuple]]:
+        bloco: List[Tuple] = []
+        for linha in heapq.merge(linhas(), remontados, key=lambda linha: linha[0]):
+            bloco.append(linha)
+            if len(bloco) >= tamanho_bloco:
+                yield bloco
+                bloco = []
+        if bloco:
+            yield bloco
+
+    return colunas, blocos()
+
+# ============================================================================
+# COMPACTAÇÃO
+# ============================================================================
+
+def _agrupar_alteracoes(eventos: Sequence[sqlite3.Row]) -> Dict[str, List[Any]]:
+    """Une alterações seguidas: primeiro valor antigo e último valor novo"""
+    unidas: Dict[str, List[Any]] = {}
+    for evento in eventos:
+        for campo, (antigo, novo) in json.loads(evento['alteracoes']).items():
+            if campo in unidas:
+                unidas[campo][1] = novo
+            else:
+                unidas[campo] = [antigo, novo]
+    return {campo: valores for campo, valores in unidas.items() if valores[0] != valores[1]}
+
+def compactar(
+    conn: sqlite3.Connection,
+    retencao_dias: int = HISTORICO_RETENCAO_DIAS,
+    agrupar_apos_dias: int = HISTORICO_AGRUPAR_APOS_DIAS
+) -> Dict[str, int]:
+    """
+    Aplica a política de compactação em uma transação:
+    - remove eventos mais antigos que `retencao_dias` (o início do
+      histórico avança junto);
+    - une as alterações (U) seguidas de um mesmo equipamento em um mesmo
+      dia, mais antigas que `agrupar_apos_dias`. Nesse período, o estado
+      remontado passa a ter resolução de um dia.
+    Incremental: cada dia só é agrupado uma vez.
+    """
+    hoje = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    limite_retencao = _formatar_momento(hoje - timedelta(days=retencao_dias))
+    limite_agrupamento = _formatar_momento(hoje - timedelta(days=agrupar_apos_dias))
+    resultado = {'removidos': 0, 'agrupados': 0}
+
+    iniciar_escrita(conn)
+    try:
+        inicio, agrupado_ate = conn.execute(
+            "SELECT inicio, agrupado_ate FROM historico_controle WHERE id = 1"
+        ).fetchone()
+
+        resultado['removidos'] = conn.execute(
+            "DELETE FROM historico_equipamentos WHERE alterado_em < ?", (limite_retencao,)
+        ).rowcount
+        if limite_retencao > inicio:
+            conn.execute("UPDATE historico_controle SET inicio = ? WHERE id = 1", (limite_retencao,))
+
+        if limite_agrupamento > agrupado_ate:
+            cursor = conn.execute(
+                """
+                SELECT id, equipamento_id, patrimonio, operacao, alterado_em, alteracoes
+                FROM historico_equipamentos
+                WHERE alterado_em >= ? AND alterado_em < ?
+                ORDER BY equipamento_id, id
+                """,
+                (max(agrupado_ate, limite_retencao), limite_agrupamento)
+            )
+            atualizar, remover = [], []
+
+            def eventos():
+                while True:
+                    bloco = cursor.fetchmany(TAMANHO_BLOCO_LEITURA)
+                    if not bloco:
+                        break
+                    yield from bloco
+
+            def sequencia(evento) -> Tuple[int, str, bool]:
+                # Alterações (U) do mesmo equipamento e dia; I e D quebram a sequência
+                return evento['equipamento_id'], evento['alterado_em'][:10], evento['operacao'] == 'U'
+
+            for (_, _, alteracao), grupo in groupby(eventos(), key=sequencia):
+                grupo = list(grupo)
+                if not alteracao or len(grupo) < 2:
+                    continue
+                *anteriores, ultimo = grupo
+                remover.extend((evento['id'],) for evento in anteriores)
+                unidas = _agrupar_alteracoes(grupo)
+                if unidas:
+                    # Fica o último evento, com o patrimônio de antes do primeiro
+                    atualizar.append((json.dumps(unidas, ensure_ascii=False), grupo[0]['patrimonio'], ultimo['id']))
+                else:
+                    remover.append((ultimo['id'],))  # voltou ao valor original no mesmo dia
+
+            conn.executemany(
+                "UPDATE historico_equipamentos SET alteracoes = ?, patrimonio = ? WHERE id = ?", atualizar
+            )
+            conn.executemany("DELETE FROM historico_equipamentos WHERE id = ?", remover)
+            conn.execute("UPDATE historico_controle SET agrupado_ate = ? WHERE id = 1", (limite_agrupamento,))
+            resultado['agrupados'] = len(remover)
+
+        if resultado['removidos'] or resultado['agrupados']:
+            # Respostas de histórico em cache (ETag) deixam de valer
+            conn.execute("UPDATE controle_versao SET versao = versao + 1 WHERE id = 1")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return resultado
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Histórico de alterações dos equipamentos')
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    subcomandos.add_parser('status', help='Tamanho e período coberto pelo histórico')
+    compactacao = subcomandos.add_parser('compactar', help='Aplica a política de retenção e agrupamento')
+    compactacao.add_argument('--retencao-dias', type=int, default=HISTORICO_RETENCAO_DIAS)
+    compactacao.add_argument('--agrupar-apos-dias', type=int, default=HISTORICO_AGRUPAR_APOS_DIAS)
+    args = parser.parse_args()
+
+    from migrations import migrar
+
+    conn = criar_conexao()
+    migrar(conn)
+    if args.comando == 'compactar':
+        resultado = compactar(conn, args.retencao_dias, args.agrupar_apos_dias)
+        print(f"{resultado['removidos']} evento(s) removido(s) pela retenção, "
+              f"{resultado['agrupados']} unido(s) pelo agrupamento.")
+    else:
+        total, mais_antigo = conn.execute(
+            "SELECT COUNT(*), MIN(alterado_em) FROM historico_equipamentos"
+        ).fetchone()
+        inicio, agrupado_ate = conn.execute(
+            "SELECT inicio, agrupado_ate FROM historico_controle WHERE id = 1"
+        ).fetchone()
+        print(f"Eventos: {total} (mais antigo: {mais_antigo or '-'})")
+        print(f"Estado remontável a partir de: {inicio}")
+        print(f"Agrupado até: {agrupado_ate or '-'}")
+    conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+# src/importar_legado.py - Importação das planilhas de inventário no formato legado
+#
+# Formato recebido das obras (ex.: data/equipamentos.csv): separado por ";",
+# UTF-8 com BOM, cabeçalhos em maiúsculas ("CENTRO CUSTO", "USUÁRIO"...) e
+# patrimônio e número de série juntos em PATRIMONIO_NUMERO_SERIE
+# ("7720 / AF12502354461"). As linhas são lidas em streaming e gravadas em
+# blocos grandes com upsert pelo patrimônio (insere ou atualiza as colunas
+# presentes na planilha).
+#   python src/importar_legado.py data/equipamentos.csv
+#   python src/importar_legado.py obra.csv --bloco 20000 --rejeitados rejeitados.csv
+#   python src/importar_legado.py obra.csv --banco /tmp/teste.db --tudo-ou-nada
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+import unicodedata
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Cabeçalho normalizado (sem acentos/pontuação) -> coluna da tabela
+MAPA_COLUNAS = {
+    'DESCRITIVO': 'descritivo',
+    'TIPO': 'tipo',
+    'CENTRO CUSTO': 'centro_custo',
+    'CENTRO DE CUSTO': 'centro_custo',
+    'PATRIMONIO': 'patrimonio',
+    'NUMERO SERIE': 'numero_serie',
+    'NUMERO DE SERIE': 'numero_serie',
+    'LOCAL ATUAL': 'local_atual',
+    'SETOR': 'setor',
+    'USUARIO': 'usuario',
+    'FUNCAO': 'funcao',
+    'CARGO': 'cargo',
+    'OBRA PROJETO': 'obra_projeto',
+    'OBSERVACAO': 'observacao',
+    'STATUS': 'status',
+    'HOST': 'host',
+    'TEAMVIEWER': 'teamviewer_id',
+    'TEAMVIEWER ID': 'teamviewer_id',
+    'DATA RECEBIMENTO': 'data_recebimento',
+    'DATA DEVOLUCAO': 'data_devolucao',
+    'VALOR LOCACAO': 'valor_locacao',
+}
+
+# Coluna combinada "PATRIMÔNIO / NÚMERO DE SÉRIE"
+COLUNA_COMBINADA = 'PATRIMONIO NUMERO SERIE'
+
+# Primeira palavra do descritivo -> tipo (quando a planilha não tem TIPO)
+MAPA_TIPOS = {
+    'NOTEBOOK': 'Notebook',
+    'MONITOR': 'Monitor',
+    'TABLET': 'Tablet',
+    'DESKTOP': 'Desktop',
+    'MICROCOMPUTADOR': 'Desktop',
+    'GABINETE': 'Desktop',
+    'SMALL': 'Desktop',  # SMALL PC / SMALL FORM FACTOR
+    'SMARTPHONE': 'Celular',
+    'CELULAR': 'Celular',
+    'IMPRESSORA': 'Impressora',
+}
+
+# Marcadores usados nas planilhas para "sem patrimônio" / "sem número de série"
+_VALOR_AUSENTE = re.compile(r'^(SEM\b.*|S/?N|N/?A|-+)$', re.IGNORECASE)
+
+def normalizar_cabecalho(nome: str) -> str:
+    """'USUÁRIO' -> 'USUARIO', 'OBRA / PROJETO' -> 'OBRA PROJETO'"""
+    sem_acentos = unicodedata.normalize('NFKD', nome).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^A-Z0-9]+', ' ', sem_acentos.upper()).split())
+
+def _valor(texto: Optional[str]) -> str:
+    texto = (texto or '').strip()
+    return '' if _VALOR_AUSENTE.match(texto) else texto
+
+def separar_patrimonio_serie(valor: str) -> Tuple[str, str]:
+    """'7720 / AF12502354461' -> ('7720', 'AF12502354461'); sem '/', é só o patrimônio"""
+    patrimonio, _, serie = (valor or '').partition('/')
+    return _valor(patrimonio), _valor(serie)
+
+def inferir_tipo(descritivo: str) -> str:
+    palavras = descritivo.split()
+    if not palavras:
+        return ''
+    primeira = normalizar_cabecalho(palavras[0])
+    return MAPA_TIPOS.get(primeira, primeira.capitalize())
+
+def mapear_cabecalho(cabecalho: List[str]) -> Tuple[Dict[int, str], List[str]]:
+    """Índice da coluna -> campo da tabela, e os cabeçalhos ignorados"""
+    mapa, ignorados = {}, []
+    for indice, nome in enumerate(cabecalho):
+        normalizado = normalizar_cabecalho(nome)
+        if normalizado == COLUNA_COMBINADA:
+            mapa[indice] = COLUNA_COMBINADA
+        elif normalizado in MAPA_COLUNAS:
+            mapa[indice] = MAPA_COLUNAS[normalizado]
+        elif normalizado:
+            ignorados.append(nome)
+    return mapa, ignorados
+
+def ler_planilha(caminho: str, delimitador: str = ';', estatisticas: Optional[Dict[str, int]] = None
+                 ) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    Lê a planilha linha a linha e gera (linha_no_arquivo, dados) já no
+    formato do processar_lote. Linhas totalmente vazias são puladas.
+    """
+    estatisticas = estatisticas if estatisticas is not None else {}
+    estatisticas.setdefault('lidas', 0)
+    estatisticas.setdefault('vazias', 0)
+
+    with open(caminho, encoding='utf-8-sig', newline='') as arquivo:
+        leitor = csv.reader(arquivo, delimiter=delimitador)
+        cabecalho = next(leitor, None)
+        if not cabecalho:
+            raise ValueError(f'{caminho}: arquivo vazio')
+        mapa, ignorados = mapear_cabecalho(cabecalho)
+        if 'patrimonio' not in mapa.values() and COLUNA_COMBINADA not in mapa.values():
+            raise ValueError(f'{caminho}: coluna de patrimônio não encontrada no cabeçalho')
+        if ignorados:
+            print(f"Colunas ignoradas: {', '.join(ignorados)}", file=sys.stderr)
+
+        for linha in leitor:
+            estatisticas['lidas'] += 1
+            if not any(campo.strip() for campo in linha):
+                estatisticas['vazias'] += 1
+                continue
+
+            dados: Dict[str, str] = {}
+            for indice, campo in mapa.items():
+                if indice >= len(linha):
+                    continue
+                if campo == COLUNA_COMBINADA:
+                    dados['patrimonio'], serie = separar_patrimonio_serie(linha[indice])
+                    if serie:
+                        dados['numero_serie'] = serie
+                elif campo in ('patrimonio', 'numero_serie'):
+                    dados[campo] = _valor(linha[indice])
+                else:
+                    dados[campo] = linha[indice].strip()
+
+            if not dados.get('tipo'):
+                dados['tipo'] = inferir_tipo(dados.get('descritivo', ''))
+            yield leitor.line_num, dados
+
+def _com_progresso(linhas: Iterator, inicio: float, intervalo: int = 10000) -> Iterator:
+    for quantidade, item in enumerate(linhas, 1):
+        if quantidade % intervalo == 0:
+            decorrido = time.perf_counter() - inicio
+            print(f'\r{quantidade} linhas ({quantidade / decorrido:,.0f} linhas/s)', end='', file=sys.stderr, flush=True)
+        yield item
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Importa planilhas de inventário no formato legado (upsert)')
+    parser.add_argument('arquivo', help='CSV no formato legado')
+    parser.add_argument('--banco', help='Banco de destino (padrão: EQUIPAMENTOS_DB_PATH ou data/equipamentos.db)')
+    parser.add_argument('--delimitador', default=';')
+    parser.add_argument('--bloco', type=int, default=10000, help='Linhas por transação (padrão: 10000)')
+    parser.add_argument('--tudo-ou-nada', action='store_true', help='Uma única transação; qualquer rejeição desfaz tudo')
+    parser.add_argument('--rejeitados', help='Grava as linhas rejeitadas (linha;motivo) neste arquivo')
+    args = parser.parse_args()
+
+    if args.banco:
+        # O caminho do banco é lido na importação do database
+        os.environ['EQUIPAMENTOS_DB_PATH'] = os.path.abspath(args.banco)
+
+    from database import criar_conexao
+    from lote import processar_lote
+    from migrations import migrar
+
+    conn = criar_conexao()
+    migrar(conn)
+
+    estatisticas: Dict[str, int] = {}
+    inicio = time.perf_counter()
+    resultado = processar_lote(
+        'upsert',
+        _com_progresso(ler_planilha(args.arquivo, args.delimitador, estatisticas), inicio),
+        tamanho_bloco=args.bloco,
+        tudo_ou_nada=args.tudo_ou_nada,
+        conn=conn,
+        detalhes=False  # só o total: a lista de gravados cresceria com a planilha
+    )
+    duracao = time.perf_counter() - inicio
+    conn.close()
+
+    processadas = estatisticas['lidas'] - estatisticas['vazias']
+    print(f"\r{estatisticas['lidas']} linhas lidas ({estatisticas['vazias']} vazias) em {duracao:.2f}s "
+          f"- {processadas / duracao if duracao else 0:,.0f} linhas/s", file=sys.stderr)
+    print(f"Importadas (inseridas ou atualizadas): {resultado['sucesso']}")
+    print(f"Rejeitadas: {len(resultado['erros'])}")
+    print(f"Transações: {resultado['transacoes']}")
+    if resultado['revertido']:
+        print("Carga revertida (--tudo-ou-nada com rejeições): nada foi gravado.")
+
+    for mensagem in resultado['erros'][:20]:
+        print(f"  {mensagem}")
+    if len(resultado['erros']) > 20:
+        print(f"  ... e mais {len(resultado['erros']) - 20}")
+
+    if args.rejeitados and resultado['erros']:
+        with open(args.rejeitados, 'w', encoding='utf-8-sig', newline='') as f:
+            escritor = csv.writer(f, delimiter=';')
+            escritor.writerow(['LINHA', 'MOTIVO'])
+            for mensagem in resultado['erros']:
+                numero = re.match(r'Linha (\d+)', mensagem)
+                escritor.writerow([numero.group(1) if numero else '', mensagem])
+        print(f"Rejeitadas gravadas em {args.rejeitados}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+# src/lote.py - Processamento transacional de cargas em lote
+import sqlite3
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from database import iniciar_escrita
+from models import get_db_connection, CAMPOS_CADASTRO, CAMPOS_ATUALIZACAO
+
+ACOES_VALIDAS = ('create', 'update', 'delete', 'upsert')
+TAMANHO_BLOCO_PADRAO = 5000
+
+DESCRICAO_ACAO = {
+    'create': 'Criado',
+    'update': 'Atualizado',
+    'delete': 'Excluído',
+    'upsert': 'Importado'
+}
+
+# (linha_num, patrimonio, colunas, parametros)
+ItemLote = Tuple[int, str, Tuple[str, ...], Tuple[Any, ...]]
+
+def _montar_sql(acao: str, colunas: Tuple[str, ...]) -> str:
+    """Monta o comando SQL de uma ação para um conjunto de colunas"""
+    if acao == 'create':
+        return (f"INSERT INTO equipamentos ({', '.join(colunas)}) "
+                f"VALUES ({', '.join(['?'] * len(colunas))})")
+    if acao == 'upsert':
+        # Insere ou, se o patrimônio já existir, atualiza só as colunas informadas
+        set_clause = ", ".join([f"{c} = excluded.{c}" for c in colunas if c != 'patrimonio'])
+        return (f"INSERT INTO equipamentos ({', '.join(colunas)}) "
+                f"VALUES ({', '.join(['?'] * len(colunas))}) "
+                f"ON CONFLICT (patrimonio) DO UPDATE SET {set_clause}")
+    if acao == 'update':
+        set_clause = ", ".join([f"{c} = ?" for c in colunas])
+        return f"UPDATE equipamentos SET {set_clause} WHERE patrimonio = ?"
+    return "DELETE FROM equipamentos WHERE patrimonio = ?"
+
+def preparar_linha(acao: str, patrimonio: str, linha: Dict[str, Any]) -> Tuple[Tuple[str, ...], Tuple[Any, ...]]:
+    """
+    Valida uma linha do CSV e devolve (colunas, parâmetros) para o SQL da ação.
+    Lança ValueError com a mensagem exibida no relatório de erros.
+    """
+    if acao == 'delete':
+        return (), (patrimonio,)
+
+    campos = CAMPOS_CADASTRO if acao in ('create', 'upsert') else CAMPOS_ATUALIZACAO
+    dados = {
+        k: v.strip() for k, v in linha.items()
+        if k in campos and k != 'patrimonio' and v and v.strip()
+    }
+
+    if acao == 'create':
+        if not dados.get('tipo'):
+            raise ValueError("Tipo é obrigatório para criação")
+        dados['patrimonio'] = patrimonio
+        if 'status' not in dados:
+            dados['status'] = 'Em uso'
+        return tuple(dados.keys()), tuple(dados.values())
+
+    if acao == 'upsert':
+        # Sem status padrão: na inserção vale o DEFAULT da tabela e na
+        # atualização o status atual é mantido
+        if not dados.get('tipo'):
+            raise ValueError("Tipo é obrigatório para importação")
+        dados['patrimonio'] = patrimonio
+        return tuple(dados.keys()), tuple(dados.values())
+
+    if not dados:
+        raise ValueError("Nenhum campo para atualizar")
+    return tuple(dados.keys()), tuple(dados.values()) + (patrimonio,)
+
+def _executar_linha(cursor: sqlite3.Cursor, acao: str, item: ItemLote) -> None:
+    """Executa uma única linha (caminho lento, usado quando o grupo falha)"""
+    _, _, colunas, params = item
+    cursor.execute(_montar_sql(acao, colunas), params)
+    if acao in ('update', 'delete') and cursor.rowcount == 0:
+        raise ValueError("Equipamento não encontrado")
+
+def _executar_bloco_direto(cursor: sqlite3.Cursor, acao: str, itens: List[ItemLote]) -> bool:
+    """
+    Caminho rápido: executa o bloco sem SAVEPOINT, um executemany por grupo
+    de colunas. Retorna False na primeira falha; quem chama desfaz a
+    transação e reprocessa o bloco com _executar_bloco.
+
+    Com um SAVEPOINT aberto o SQLite descarrega o índice FTS5 a cada
+    comando dos gatilhos (um segmento por linha), e o custo das fusões
+    cresce com a tabela; sem ele a carga mantém a vazão constante.
+    """
+    for colunas, grupo in groupby(itens, key=lambda item: item[2]):
+        grupo = list(grupo)
+        try:
+            cursor.executemany(_montar_sql(acao, colunas), [item[3] for item in grupo])
+        except sqlite3.Error:
+            return False
+        if acao not in ('create', 'upsert') and cursor.rowcount != len(grupo):
+            return False
+    return True
+
+def _executar_bloco(
+    cursor: sqlite3.Cursor,
+    acao: str,
+    itens: List[ItemLote],
+    sucessos: List[Tuple[int, str]],
+    erros: List[Tuple[int, str]]
+) -> None:
+    """
+    Executa um bloco de linhas dentro da transação aberta.
+
+    Linhas consecutivas com as mesmas colunas são enviadas em um único
+    executemany. Se o grupo falhar (constraint, patrimônio inexistente...),
+    ele é desfeito via SAVEPOINT e reprocessado linha a linha, cada uma em
+    seu próprio SAVEPOINT, para manter o relatório de erros por linha.
+    """
+    for colunas, grupo in groupby(itens, key=lambda item: item[2]):
+        grupo = list(grupo)
+        cursor.execute("SAVEPOINT lote_grupo")
+        try:
+            cursor.executemany(_montar_sql(acao, colunas), [item[3] for item in grupo])
+            ok = acao in ('create', 'upsert') or cursor.rowcount == len(grupo)
+        except sqlite3.Error:
+            ok = False
+
+        if ok:
+            cursor.execute("RELEASE lote_grupo")
+            sucessos.extend((item[0], item[1]) for item in grupo)
+            continue
+
+        cursor.execute("ROLLBACK TO lote_grupo")
+        for item in grupo:
+            linha_num, patrimonio = item[0], item[1]
+            cursor.execute("SAVEPOINT lote_linha")
+            try:
+                _executar_linha(cursor, acao, item)
+                cursor.execute("RELEASE lote_linha")
+                sucessos.append((linha_num, patrimonio))
+            except (sqlite3.Error, ValueError) as e:
+                cursor.execute("ROLLBACK TO lote_linha")
+                cursor.execute("RELEASE lote_linha")
+                erros.append((linha_num, f"Linha {linha_num} ({patrimonio}): {str(e)}"))
+        cursor.execute("RELEASE lote_grupo")
+
+def processar_lote(
+    acao: str,
+    linhas: Iterable[Tuple[int, Dict[str, Any]]],
+    tamanho_bloco: int = TAMANHO_BLOCO_PADRAO,
+    tudo_ou_nada: bool = False,
+    conn: Optional[sqlite3.Connection] = None,
+    progresso: Optional[Callable[[int, int], None]] = None,
+    detalhes: bool = True
+) -> Dict[str, Any]:
+    """
+    Aplica create/update/delete/upsert para as linhas (linha_num, dados) de um CSV.
+
+    - modo padrão: um COMMIT a cada `tamanho_bloco` linhas; linhas com erro
+      são descartadas individualmente e as demais são gravadas.
+    - tudo_ou_nada: uma única transação; qualquer erro desfaz a carga inteira.
+    - progresso(sucessos, erros): chamado após cada bloco.
+    - detalhes=False: só conta as linhas gravadas, sem guardar a lista
+      "Criado: PAT..." (cargas grandes).
+    """
+    if acao not in ACOES_VALIDAS:
+        raise ValueError(f"Ação inválida: {acao}")
+
+    conn = conn or get_db_connection()
+    cursor = conn.cursor()
+    tamanho_bloco = max(1, tamanho_bloco)
+
+    sucessos: List[Tuple[int, str]] = []
+    erros: List[Tuple[int, str]] = []
+    transacoes = 0
+    total_sucessos = 0
+    bloco: List[ItemLote] = []
+
+    def descarregar():
+        nonlocal transacoes, total_sucessos
+        if not bloco:
+            return
+        # Transações de escrita (IMMEDIATE): com o lock obtido no BEGIN, um
+        # SQLITE_BUSY de outro processo não vira erro de linha no relatório
+        if tudo_ou_nada or conn.in_transaction:
+            if not conn.in_transaction:
+                iniciar_escrita(conn)
+            _executar_bloco(cursor, acao, bloco, sucessos, erros)
+        else:
+            # O bloco é uma transação própria: tenta sem SAVEPOINT e, se
+            # alguma linha falhar, refaz o bloco com o relatório por linha
+            iniciar_escrita(conn)
+            if _executar_bloco_direto(cursor, acao, bloco):
+                sucessos.extend((item[0], item[1]) for item in bloco)
+            else:
+                conn.rollback()
+                iniciar_escrita(conn)
+                _executar_bloco(cursor, acao, bloco, sucessos, erros)
+        bloco.clear()
+        if not tudo_ou_nada:
+            conn.commit()
+            transacoes += 1
+        if not detalhes:
+            total_sucessos += len(sucessos)
+            sucessos.clear()
+        if progresso:
+            progresso(total_sucessos + len(sucessos), len(erros))
+
+    try:
+        for linha_num, linha in linhas:
+            patrimonio = (linha.get('patrimonio') or '').strip()
+            if not patrimonio:
+                erros.append((linha_num, f"Linha {linha_num}: Patrimônio obrigatório"))
+                continue
+            try:
+                colunas, params = preparar_linha(acao, patrimonio, linha)
+            except ValueError as e:
+                erros.append((linha_num, f"Linha {linha_num} ({patrimonio}): {str(e)}"))
+                continue
+
+            bloco.append((linha_num, patrimonio, colunas, params))
+            if len(bloco) >= tamanho_bloco:
+                descarregar()
+        descarregar()
+
+        if tudo_ou_nada:
+            if erros:
+                conn.rollback()
+                sucessos.clear()
+                total_sucessos = 0
+            else:
+                conn.commit()
+                transacoes += 1
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+    erros.sort(key=lambda e: e[0])
+    sucessos.sort(key=lambda s: s[0])
+    descricao = DESCRICAO_ACAO[acao]
+
+    return {
+        "sucesso": total_sucessos + len(sucessos),
+        "erros": [mensagem for _, mensagem in erros],
+        "detalhes": [f"{descricao}: {patrimonio}" for _, patrimonio in sucessos],
+        "transacoes": transacoes,
+        "revertido": bool(tudo_ou_nada and erros)
+    }
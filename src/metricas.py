@@ -0,0 +1,276 @@
+# src/metricas.py - Métricas de latência por rota e de SQL por requisição
+#
+# Contadores e histogramas em memória (por processo), exportados no formato
+# texto do Prometheus em GET /api/metrics.
+#
+# Com vários processos (gunicorn), cada um grava suas séries em
+# METRICAS_DIR/<pid>.json a cada segundo, e /api/metrics soma as de todos:
+# a resposta não depende do worker que atendeu a coleta.
+import copy
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from flask import g, has_app_context, request
+
+import database
+
+PREFIXO = 'equipamentos_'
+METRICAS_DIR = os.environ.get('METRICAS_DIR', '')
+INTERVALO_GRAVACAO_SEGUNDOS = 1.0
+
+# Limites (le) dos histogramas
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_COMANDOS = (1, 2, 5, 10, 25, 50, 100, 250, 1000, 5000)
+
+Rotulos = Tuple[Tuple[str, str], ...]
+
+class Histograma:
+    """Histograma cumulativo no estilo Prometheus, separado por rótulos"""
+
+    def __init__(self, nome: str, descricao: str, buckets: Sequence[float]):
+        self.nome = nome
+        self.descricao = descricao
+        self.buckets = tuple(buckets)
+        # rótulos -> [contagem por bucket..., soma, total]
+        self._series: Dict[Rotulos, List[float]] = {}
+
+    def observar(self, rotulos: Rotulos, valor: float) -> None:
+        serie = self._series.get(rotulos)
+        if serie is None:
+            serie = self._series[rotulos] = [0] * len(self.buckets) + [0.0, 0]
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                serie[i] += 1
+        serie[-2] += valor
+        serie[-1] += 1
+
+    def somar(self, rotulos: Rotulos, serie: List[float]) -> None:
+        """Soma a série de outro processo"""
+        atual = self._series.get(rotulos)
+        if atual is None:
+            self._series[rotulos] = list(serie)
+        else:
+            self._series[rotulos] = [a + b for a, b in zip(atual, serie)]
+
+    def exportar(self) -> List[str]:
+        linhas = [f'# HELP {self.nome} {self.descricao}', f'# TYPE {self.nome} histogram']
+        for rotulos, serie in sorted(self._series.items()):
+            for limite, contagem in zip(self.buckets, serie):
+                linhas.append(f'{self.nome}_bucket{_formatar_rotulos(rotulos + (("le", _numero(limite)),))} {contagem}')
+            linhas.append(f'{self.nome}_bucket{_formatar_rotulos(rotulos + (("le", "+Inf"),))} {serie[-1]}')
+            linhas.append(f'{self.nome}_sum{_formatar_rotulos(rotulos)} {_numero(serie[-2])}')
+            linhas.append(f'{self.nome}_count{_formatar_rotulos(rotulos)} {serie[-1]}')
+        return linhas
+
+class Contador:
+    def __init__(self, nome: str, descricao: str):
+        self.nome = nome
+        self.descricao = descricao
+        self._series: Dict[Rotulos, float] = {}
+
+    def incrementar(self, rotulos: Rotulos, valor: float = 1) -> None:
+        self._series[rotulos] = self._series.get(rotulos, 0) + valor
+
+    somar = incrementar
+
+    def exportar(self) -> List[str]:
+        linhas = [f'# HELP {self.nome} {self.descricao}', f'# TYPE {self.nome} counter']
+        for rotulos, valor in sorted(self._series.items()):
+            linhas.append(f'{self.nome}{_formatar_rotulos(rotulos)} {_numero(valor)}')
+        return linhas
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+def _escapar(valor: str) -> str:
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _formatar_rotulos(rotulos: Rotulos) -> str:
+    if not rotulos:
+        return ''
+    return '{' + ','.join(f'{chave}="{_escapar(str(valor))}"' for chave, valor in rotulos) + '}'
+
+# ============================================================================
+# REGISTRO DAS MÉTRICAS
+# ============================================================================
+
+_lock = threading.Lock()
+_inicio_processo = time.time()
+
+requisicoes = Contador(
+    PREFIXO + 'http_requisicoes_total',
+    'Requisições atendidas por rota, método e status HTTP')
+duracao_requisicao = Histograma(
+    PREFIXO + 'http_requisicao_duracao_segundos',
+    'Latência das requisições (até o fim do corpo, inclusive streaming)', BUCKETS_SEGUNDOS)
+comandos_por_requisicao = Histograma(
+    PREFIXO + 'sql_comandos_por_requisicao',
+    'Comandos SQL executados por requisição', BUCKETS_COMANDOS)
+tempo_sql_por_requisicao = Histograma(
+    PREFIXO + 'sql_duracao_por_requisicao_segundos',
+    'Tempo gasto no SQLite por requisição', BUCKETS_SEGUNDOS)
+comandos_sql = Contador(
+    PREFIXO + 'sql_comandos_total',
+    'Comandos SQL executados por rota')
+
+METRICAS = [requisicoes, duracao_requisicao, comandos_por_requisicao, tempo_sql_por_requisicao, comandos_sql]
+
+# Chamados a cada requisição concluída como observador(duracao_em_segundos)
+observadores_requisicao: List[Callable[[float], None]] = []
+
+class ColetorRequisicao:
+    """Acumula os comandos SQL e o tempo de SQLite de uma requisição"""
+    __slots__ = ('inicio', 'comandos', 'tempo_sql')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.comandos = 0
+        self.tempo_sql = 0.0
+
+def registrar_requisicao(rota: str, metodo: str, status: int, coletor: ColetorRequisicao) -> None:
+    duracao = time.perf_counter() - coletor.inicio
+    rotulos = (('rota', rota), ('metodo', metodo))
+    with _lock:
+        requisicoes.incrementar(rotulos + (('status', str(status)),))
+        duracao_requisicao.observar(rotulos, duracao)
+        comandos_por_requisicao.observar(rotulos, coletor.comandos)
+        tempo_sql_por_requisicao.observar(rotulos, coletor.tempo_sql)
+        comandos_sql.incrementar(rotulos, coletor.comandos)
+    _alteradas.set()
+    for observador in observadores_requisicao:
+        observador(duracao)
+
+def _exportar(metricas: Sequence, inicio: float, processos: int) -> str:
+    linhas = [
+        f'# HELP {PREFIXO}inicio_processo_segundos Início do processo mais antigo (epoch)',
+        f'# TYPE {PREFIXO}inicio_processo_segundos gauge',
+        f'{PREFIXO}inicio_processo_segundos {_numero(inicio)}',
+        f'# HELP {PREFIXO}processos Processos somados nas métricas',
+        f'# TYPE {PREFIXO}processos gauge',
+        f'{PREFIXO}processos {processos}',
+    ]
+    for metrica in metricas:
+        linhas.extend(metrica.exportar())
+    return '\n'.join(linhas) + '\n'
+
+def exportar_prometheus() -> str:
+    """Todas as métricas no formato texto do Prometheus (versão 0.0.4)"""
+    if not METRICAS_DIR:
+        with _lock:
+            return _exportar(METRICAS, _inicio_processo, 1)
+
+    # O processo que atende a coleta grava o próprio estado antes de somar
+    gravar_estado()
+    somadas = [copy.copy(metrica) for metrica in METRICAS]
+    for metrica in somadas:
+        metrica._series = {}
+    por_nome = {metrica.nome: metrica for metrica in somadas}
+    estados = _ler_estados()
+    for estado in estados:
+        for nome, series in estado['series'].items():
+            metrica = por_nome.get(nome)
+            if metrica is None:
+                continue
+            for rotulos, valor in series:
+                metrica.somar(tuple(tuple(par) for par in rotulos), valor)
+    return _exportar(somadas, min(estado['inicio'] for estado in estados), len(estados))
+
+def limpar() -> None:
+    with _lock:
+        for metrica in METRICAS:
+            metrica._series.clear()
+
+# ============================================================================
+# VÁRIOS PROCESSOS (METRICAS_DIR)
+# ============================================================================
+
+_alteradas = threading.Event()
+_gravador: Optional[threading.Thread] = None
+
+def _estado_processo() -> Dict[str, Any]:
+    with _lock:
+        return {
+            'pid': os.getpid(),
+            'inicio': _inicio_processo,
+            'series': {
+                metrica.nome: [[list(rotulos), valor] for rotulos, valor in metrica._series.items()]
+                for metrica in METRICAS
+            },
+        }
+
+def gravar_estado() -> None:
+    """Grava as séries deste processo em METRICAS_DIR (escrita atômica: grava e renomeia)"""
+    caminho = os.path.join(METRICAS_DIR, f'{os.getpid()}.json')
+    temporario = f'{caminho}.{threading.get_ident()}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(_estado_processo(), f)
+    os.replace(temporario, caminho)
+
+def _ler_estados() -> List[Dict[str, Any]]:
+    """
+    Estados de todos os processos, inclusive de workers já encerrados: os
+    contadores continuam somando o que eles atenderam
+    """
+    estados = []
+    for nome in os.listdir(METRICAS_DIR):
+        if not nome.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(METRICAS_DIR, nome), encoding='utf-8') as f:
+                estados.append(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            continue
+    return estados
+
+def _gravar_periodicamente() -> None:
+    while True:
+        _alteradas.wait()
+        time.sleep(INTERVALO_GRAVACAO_SEGUNDOS)
+        _alteradas.clear()
+        try:
+            gravar_estado()
+        except OSError:
+            pass  # tenta de novo na próxima requisição
+
+# ============================================================================
+# INTEGRAÇÃO COM O FLASK
+# ============================================================================
+
+def _observar_sql(sql: Optional[str], duracao: float) -> None:
+    if not has_app_context():
+        return
+    coletor = g.get('_metricas')
+    if coletor is not None:
+        if sql is not None:
+            coletor.comandos += 1
+        coletor.tempo_sql += duracao
+
+def _iniciar_requisicao() -> None:
+    g._metricas = ColetorRequisicao()
+
+def _finalizar_requisicao(resposta):
+    coletor = g.get('_metricas')
+    if coletor is None:
+        return resposta
+    rota = request.url_rule.rule if request.url_rule else 'sem_rota'
+    metodo = request.method
+    status = resposta.status_code
+    # Registrado no fechamento da resposta para incluir o corpo em streaming
+    # (exportações CSV) na latência e nos comandos SQL
+    resposta.call_on_close(lambda: registrar_requisicao(rota, metodo, status, coletor))
+    return resposta
+
+def init_app(app) -> None:
+    """Instrumenta todas as rotas da aplicação e a camada de banco"""
+    if _observar_sql not in database.observadores_sql:
+        database.observadores_sql.append(_observar_sql)
+    app.before_request(_iniciar_requisicao)
+    app.after_request(_finalizar_requisicao)
+    global _gravador
+    if METRICAS_DIR and _gravador is None:
+        os.makedirs(METRICAS_DIR, exist_ok=True)
+        _gravador = threading.Thread(target=_gravar_periodicamente, name='metricas', daemon=True)
+        _gravador.start()
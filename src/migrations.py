@@ -0,0 +1,245 @@
+# src/migrations.py - Migrações versionadas do esquema e índices gerenciados
+#
+# As migrações pendentes também são aplicadas na inicialização do app.
+#   python src/migrations.py            # aplica as migrações pendentes
+#   python src/migrations.py status     # lista as migrações e quais já foram aplicadas
+#   python src/migrations.py explain    # EXPLAIN QUERY PLAN de cada consulta do models.py
+import argparse
+import sqlite3
+from datetime import datetime
+from typing import Callable, List, Optional, Set, Tuple, Union
+
+from database import criar_conexao, executar_script, iniciar_escrita
+from busca_texto import criar_indice_fts, criar_indice_identificadores
+from resumos import criar_resumo_local, criar_resumos
+from cache import SQL_CONTROLE_VERSAO
+from historico import criar_historico
+
+# ============================================================================
+# MIGRAÇÕES
+# ============================================================================
+
+# Esquema original da tabela (equivalente ao antigo init_db.py)
+SQL_ESQUEMA_BASE = """
+    CREATE TABLE IF NOT EXISTS equipamentos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT,
+        descritivo TEXT,
+        centro_custo TEXT,
+        patrimonio TEXT,
+        numero_serie TEXT UNIQUE,
+        local_atual TEXT,
+        setor TEXT,
+        usuario TEXT,
+        funcao TEXT,
+        obra_projeto TEXT,
+        observacao TEXT,
+        data_recebimento TEXT,
+        data_devolucao TEXT,
+        valor_locacao REAL,
+        status TEXT DEFAULT 'Em uso',
+        teamviewer_id TEXT,
+        cargo TEXT,
+        host TEXT
+    );
+
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_pat_unico ON equipamentos(patrimonio);
+"""
+
+# Índices escolhidos a partir das consultas do models.py
+SQL_INDICES_CONSULTAS = """
+    -- listar_centros_custo, obter_resumo_centro_custo (por status),
+    -- verificar_centro_custo_existe, buscar_equipamentos_por_centro_custo
+    CREATE INDEX IF NOT EXISTS idx_equip_cc_status_valor
+        ON equipamentos(centro_custo, status, valor_locacao);
+
+    -- obter_resumo_centro_custo (distribuição por tipo)
+    CREATE INDEX IF NOT EXISTS idx_equip_cc_tipo_valor
+        ON equipamentos(centro_custo, tipo, valor_locacao);
+
+    -- obter_equipamentos_mais_valiosos_centro_custo (ORDER BY valor DESC LIMIT)
+    CREATE INDEX IF NOT EXISTS idx_equip_cc_valor
+        ON equipamentos(centro_custo, valor_locacao);
+
+    -- obter_equipamentos_recentes_centro_custo e evolução mensal do relatório
+    CREATE INDEX IF NOT EXISTS idx_equip_cc_data
+        ON equipamentos(centro_custo, data_recebimento);
+
+    -- obter_estatisticas_gerais (por tipo), obter_resumo_dashboard, filtros por tipo
+    CREATE INDEX IF NOT EXISTS idx_equip_tipo_status_local
+        ON equipamentos(tipo, status, local_atual);
+
+    -- obter_estatisticas_gerais (por status), distribuição do dashboard de centros
+    CREATE INDEX IF NOT EXISTS idx_equip_status_cc_valor
+        ON equipamentos(status, centro_custo, valor_locacao);
+
+    -- Ordenação (e paginação por cursor) da pesquisa avançada
+    CREATE INDEX IF NOT EXISTS idx_equip_data_recebimento
+        ON equipamentos(data_recebimento);
+
+    CREATE INDEX IF NOT EXISTS idx_equip_valor_locacao
+        ON equipamentos(valor_locacao);
+"""
+
+def _migrar_indices_consultas(conn: sqlite3.Connection) -> None:
+    executar_script(conn, SQL_INDICES_CONSULTAS)
+    conn.execute("ANALYZE")
+
+# (versão, descrição, SQL ou função que recebe a conexão). Uma função que
+# retorna False não pôde ser aplicada (ex.: SQLite sem FTS5): a migração não
+# é registrada e volta a ser tentada na próxima inicialização.
+Migracao = Tuple[int, str, Union[str, Callable[[sqlite3.Connection], Optional[bool]]]]
+
+MIGRACOES: List[Migracao] = [
+    (1, 'Esquema base da tabela equipamentos', SQL_ESQUEMA_BASE),
+    (2, 'Índice FTS5 da busca geral', criar_indice_fts),
+    (3, 'Índices compostos das consultas de centro de custo, estatísticas e ordenação', _migrar_indices_consultas),
+    (4, 'Tabelas de resumo por centro de custo/status e por tipo', criar_resumos),
+    (5, 'Contador de versão dos dados (invalidação de cache)', SQL_CONTROLE_VERSAO),
+    (6, 'Histórico de alterações dos equipamentos', criar_historico),
+    (7, 'Tabela de resumo por local (dashboard inicial)', criar_resumo_local),
+    (8, 'Índice trigram de patrimônio e número de série (busca por trecho)', criar_indice_identificadores),
+]
+
+def _garantir_tabela_controle(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migracoes (
+            versao INTEGER PRIMARY KEY,
+            descricao TEXT NOT NULL,
+            aplicada_em TEXT NOT NULL
+        )
+    """)
+
+def versao_atual(conn: sqlite3.Connection) -> int:
+    """Última versão aplicada (0 se nenhuma)"""
+    _garantir_tabela_controle(conn)
+    return conn.execute("SELECT COALESCE(MAX(versao), 0) FROM schema_migracoes").fetchone()[0]
+
+def versoes_aplicadas(conn: sqlite3.Connection) -> Set[int]:
+    """Versões registradas em schema_migracoes (pode haver lacunas)"""
+    _garantir_tabela_controle(conn)
+    return {row[0] for row in conn.execute("SELECT versao FROM schema_migracoes")}
+
+def migrar(conn: sqlite3.Connection) -> List[int]:
+    """
+    Aplica as migrações pendentes, cada uma em sua própria transação.
+    BEGIN IMMEDIATE garante que só um processo migre por vez.
+    Retorna as versões aplicadas.
+    """
+    aplicadas = []
+    for versao, descricao, passo in MIGRACOES:
+        if versao in versoes_aplicadas(conn):
+            continue
+
+        iniciar_escrita(conn)
+        try:
+            # Outro processo pode ter migrado enquanto esperávamos o lock
+            if versao in versoes_aplicadas(conn):
+                conn.rollback()
+                continue
+
+            if callable(passo):
+                if passo(conn) is False:
+                    conn.rollback()
+                    continue
+            else:
+                executar_script(conn, passo)
+
+            conn.execute(
+                "INSERT INTO schema_migracoes (versao, descricao, aplicada_em) VALUES (?, ?, ?)",
+                (versao, descricao, datetime.now().isoformat(timespec='seconds'))
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        aplicadas.append(versao)
+    return aplicadas
+
+# ============================================================================
+# EXPLAIN QUERY PLAN DAS CONSULTAS DO MODELS
+# ============================================================================
+
+def _consultas_models(centro_custo: str) -> List[Tuple[str, Callable[[], object]]]:
+    """Chamadas representativas de cada consulta pública do models.py"""
+    import models
+
+    return [
+        ('buscar_equipamentos (patrimonio)', lambda: models.buscar_equipamentos({'patrimonio': ['0']})),
+        ('buscar_equipamentos (tipo/status)', lambda: models.buscar_equipamentos({'tipo': ['Notebook'], 'status': ['Em uso']})),
+        ('buscar_equipamentos_avancado (q)', lambda: models.buscar_equipamentos_avancado({'q': 'notebook'})),
+        ('buscar_equipamentos_avancado (centro_custo, data)', lambda: models.buscar_equipamentos_avancado(
+            {'centro_custo': centro_custo}, ordenar_por='data_recebimento', ordenar_direcao='DESC')),
+        ('buscar_equipamentos_cursor (valor_locacao)', lambda: models.buscar_equipamentos_cursor(
+            ordenar_por='valor_locacao', cursor=models.codificar_cursor('valor_locacao', 'ASC', 0, 0))),
+        ('buscar_equipamentos_por_chaves', lambda: models.buscar_equipamentos_por_chaves(['0', '1'])),
+        ('obter_valores_distintos (tipo)', lambda: models.obter_valores_distintos('tipo')),
+        ('obter_estatisticas_gerais', models.obter_estatisticas_gerais),
+        ('obter_resumo_dashboard', models.obter_resumo_dashboard),
+        ('listar_centros_custo', models.listar_centros_custo),
+        ('buscar_equipamentos_por_centro_custo', lambda: models.buscar_equipamentos_por_centro_custo(
+            centro_custo, {'status': 'Em uso'})),
+        ('obter_resumo_centro_custo', lambda: models.obter_resumo_centro_custo(centro_custo)),
+        ('obter_equipamentos_mais_valiosos_centro_custo', lambda: models.obter_equipamentos_mais_valiosos_centro_custo(centro_custo)),
+        ('obter_equipamentos_recentes_centro_custo', lambda: models.obter_equipamentos_recentes_centro_custo(centro_custo)),
+        ('contar_equipamentos_centro_custo', lambda: models.contar_equipamentos_centro_custo(centro_custo)),
+        ('verificar_centro_custo_existe', lambda: models.verificar_centro_custo_existe(centro_custo)),
+    ]
+
+def explicar_consultas() -> None:
+    """
+    Executa cada consulta do models.py capturando o SQL gerado (com os
+    parâmetros já substituídos) e imprime o EXPLAIN QUERY PLAN de cada um.
+    Varreduras completas ("SCAN equipamentos") ficam marcadas com "!!".
+    """
+    from database import get_db_connection
+
+    conn = get_db_connection()
+    linha = conn.execute(
+        "SELECT centro_custo FROM equipamentos WHERE centro_custo IS NOT NULL AND centro_custo != '' LIMIT 1"
+    ).fetchone()
+    centro_custo = linha[0] if linha else ''
+
+    explicador = criar_conexao()
+    for nome, chamada in _consultas_models(centro_custo):
+        capturados: List[str] = []
+        conn.set_trace_callback(capturados.append)
+        try:
+            chamada()
+        finally:
+            conn.set_trace_callback(None)
+
+        print(f"\n=== {nome}")
+        for sql in capturados:
+            if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                continue
+            print("  " + " ".join(sql.split())[:160])
+            for _, _, _, detalhe in explicador.execute("EXPLAIN QUERY PLAN " + sql):
+                alerta = "!!" if detalhe.startswith('SCAN equipamentos') and 'INDEX' not in detalhe else "  "
+                print(f"  {alerta} {detalhe}")
+    explicador.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Migrações do banco de equipamentos')
+    parser.add_argument('comando', nargs='?', default='migrar', choices=['migrar', 'status', 'explain'])
+    args = parser.parse_args()
+
+    conn = criar_conexao()
+    if args.comando == 'migrar':
+        aplicadas = migrar(conn)
+        print(f"Migrações aplicadas: {aplicadas or 'nenhuma'} (versão atual: {versao_atual(conn)})")
+    elif args.comando == 'status':
+        _garantir_tabela_controle(conn)
+        aplicadas = {
+            row[0]: row[1] for row in conn.execute("SELECT versao, aplicada_em FROM schema_migracoes")
+        }
+        for versao, descricao, _ in MIGRACOES:
+            situacao = f"aplicada em {aplicadas[versao]}" if versao in aplicadas else "PENDENTE"
+            print(f"{versao:>3}  {descricao} - {situacao}")
+    else:
+        migrar(conn)
+        explicar_consultas()
+    conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,22 @@
 # src/models.py - VERSÃO REFATORADA
+import base64
+import json
 import sqlite3
-import os
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
-# Caminho absoluto para o banco (funciona em qualquer ambiente)
-DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'equipamentos.db')
+# Conexões reaproveitadas (pool por requisição / por thread) com WAL e PRAGMAs
+from database import DB_PATH, get_db_connection, iniciar_escrita
+from busca_texto import fts_ativo, identificadores_ativo, montar_consulta_fts, montar_consulta_trecho
 
-def get_db_connection():
-    """Retorna uma conexão com o banco de dados SQLite"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # permite acesso por nome da coluna
-    return conn
+# Campos aceitos no cadastro e na atualização de equipamentos
+CAMPOS_CADASTRO = {
+    "patrimonio", "tipo", "descritivo", "centro_custo", "numero_serie",
+    "local_atual", "setor", "usuario", "cargo", "obra_projeto",
+    "observacao", "data_recebimento", "data_devolucao", "valor_locacao",
+    "status", "teamviewer_id", "host", "funcao"
+}
+
+CAMPOS_ATUALIZACAO = CAMPOS_CADASTRO - {"patrimonio"}
 
 # ============================================================================
 # FUNÇÕES PRINCIPAIS DE CRUD
@@ -47,134 +53,400 @@ def buscar_equipamentos(filtros: Dict[str, List[str]]) -> List[sqlite3.Row]:
         cursor.execute(query, params)
         return cursor.fetchall()
 
+# Colunas aceitas na ordenação da busca avançada
+CAMPOS_ORDENACAO = ['id', 'tipo', 'descritivo', 'centro_custo', 'patrimonio', 
+                    'numero_serie', 'local_atual', 'setor', 'usuario', 'funcao',
+                    'obra_projeto', 'data_recebimento', 'data_devolucao', 
+                    'valor_locacao', 'status', 'cargo', 'host']
+
+def _montar_condicao_termo(termo: str) -> Tuple[str, List[Any]]:
+    """
+    Condição do termo geral "q": usa o índice FTS5 (prefixo por palavra)
+    quando disponível e cai para LIKE '%termo%' nos sete campos caso contrário.
+    Patrimônio e número de série também casam por trecho em qualquer posição
+    (índice trigram; LIKE para termos curtos ou sem o índice)
+    """
+    conn = get_db_connection()
+    consulta_fts = montar_consulta_fts(termo)
+    if consulta_fts and fts_ativo(conn):
+        consulta_trecho = montar_consulta_trecho(termo)
+        if consulta_trecho and identificadores_ativo(conn):
+            trecho = "id IN (SELECT rowid FROM equipamentos_ids_fts WHERE equipamentos_ids_fts MATCH ?)"
+            params = [consulta_trecho]
+        else:
+            trecho = "patrimonio LIKE ? OR numero_serie LIKE ?"
+            params = [f"%{termo}%"] * 2
+        return f"""
+            AND ({trecho}
+            OR id IN (SELECT rowid FROM equipamentos_fts WHERE equipamentos_fts MATCH ?))
+        """, params + [consulta_fts]
+    
+    return """
+        AND (patrimonio LIKE ? 
+        OR descritivo LIKE ? 
+        OR numero_serie LIKE ?
+        OR usuario LIKE ?
+        OR host LIKE ?
+        OR local_atual LIKE ?
+        OR tipo LIKE ?)
+    """, [f"%{termo}%"] * 7
+
+def _montar_filtros_avancados(filtros: Optional[Dict[str, Any]]) -> Tuple[str, List[Any]]:
+    """
+    Monta a cláusula WHERE (começando em "WHERE 1=1") e seus parâmetros
+    a partir dos filtros da busca avançada
+    """
+    query = " WHERE 1=1"
+    params = []
+    
+    if filtros:
+        # Busca por termo geral (procura em múltiplos campos)
+        if filtros.get('q'):
+            condicao, params_termo = _montar_condicao_termo(filtros['q'])
+            query += condicao
+            params.extend(params_termo)
+        
+        # Filtros exatos
+        campos_exatos = ['tipo', 'status', 'setor', 'centro_custo', 'obra_projeto', 'funcao', 'cargo']
+        for campo in campos_exatos:
+            valor = filtros.get(campo)
+            if valor:
+                if isinstance(valor, list) and len(valor) > 0:
+                    placeholders = ', '.join(['?'] * len(valor))
+                    query += f" AND {campo} IN ({placeholders})"
+                    params.extend(valor)
+                elif valor:
+                    query += f" AND {campo} = ?"
+                    params.append(valor)
+        
+        # Filtros de texto parcial
+        campos_parcial = ['usuario', 'local_atual', 'descritivo', 'patrimonio', 'serie', 'teamviewer_id', 'host']
+        for campo in campos_parcial:
+            valor = filtros.get(campo)
+            if valor:
+                query += f" AND {campo} LIKE ?"
+                params.append(f"%{valor}%")
+        
+        # Filtros de data
+        if filtros.get('data_recebimento_inicio'):
+            query += " AND date(data_recebimento) >= date(?)"
+            params.append(filtros['data_recebimento_inicio'])
+        
+        if filtros.get('data_recebimento_fim'):
+            query += " AND date(data_recebimento) <= date(?)"
+            params.append(filtros['data_recebimento_fim'])
+        
+        # Filtros de valor
+        if filtros.get('valor_min'):
+            query += " AND valor_locacao >= ?"
+            params.append(float(filtros['valor_min']))
+        
+        if filtros.get('valor_max'):
+            query += " AND valor_locacao <= ?"
+            params.append(float(filtros['valor_max']))
+    
+    return query, params
+
+def _normalizar_ordenacao(ordenar_por: str, ordenar_direcao: str) -> Tuple[str, str]:
+    """Valida campo e direção de ordenação (padrão: patrimonio ASC)"""
+    if ordenar_por not in CAMPOS_ORDENACAO:
+        return 'patrimonio', 'ASC'
+    direcao = (ordenar_direcao or 'ASC').upper()
+    return ordenar_por, direcao if direcao in ('ASC', 'DESC') else 'ASC'
+
+def _montar_ordenacao(ordenar_por: str, ordenar_direcao: str) -> str:
+    """
+    Cláusula ORDER BY validada contra CAMPOS_ORDENACAO. O id desempata os
+    valores repetidos: a ordem é a mesma entre páginas e igual à do cursor
+    """
+    ordenar_por, ordenar_direcao = _normalizar_ordenacao(ordenar_por, ordenar_direcao)
+    if ordenar_por == 'id':
+        return f" ORDER BY id {ordenar_direcao}"
+    return f" ORDER BY {ordenar_por} {ordenar_direcao}, id {ordenar_direcao}"
+
+# Com total estimado, a contagem para nesta quantidade de linhas após a página
+LIMITE_CONTAGEM_ESTIMADA = 10000
+
+def _montar_contagem(where: str, params: List[Any], limite: Optional[int] = None) -> Tuple[str, List[Any]]:
+    """
+    Subconsulta escalar com o total filtrado. Não depende da linha externa,
+    então o SQLite a avalia uma única vez por comando; com `limite`, conta
+    no máximo essa quantidade de linhas
+    """
+    if limite is None:
+        return f"(SELECT COUNT(*) FROM equipamentos{where})", list(params)
+    return f"(SELECT COUNT(*) FROM (SELECT 1 FROM equipamentos{where} LIMIT ?))", list(params) + [limite]
+
+def _separar_total(conn: sqlite3.Connection, linhas: List[sqlite3.Row]) -> Tuple[List[sqlite3.Row], Optional[int]]:
+    """
+    Tira a coluna total_filtrado (a última) das linhas, devolvendo
+    sqlite3.Row apenas com as colunas de equipamentos
+    """
+    if not linhas:
+        return linhas, None
+    total = linhas[0]['total_filtrado']
+    molde = conn.execute("SELECT * FROM equipamentos LIMIT 0")
+    try:
+        return [sqlite3.Row(molde, tuple(linha)[:-1]) for linha in linhas], total
+    finally:
+        molde.close()
+
 def buscar_equipamentos_avancado(
     filtros: Optional[Dict[str, Any]] = None, 
     pagina: int = 1, 
     por_pagina: int = 50, 
     ordenar_por: str = 'patrimonio', 
-    ordenar_direcao: str = 'ASC'
+    ordenar_direcao: str = 'ASC',
+    total_estimado: bool = False
 ) -> Tuple[List[sqlite3.Row], int]:
     """
-    Busca avançada com filtros complexos e paginação
+    Busca avançada com filtros complexos e paginação.
+    
+    A página e o total (com todos os filtros) vêm do mesmo comando. Com
+    total_estimado=True a contagem para em LIMITE_CONTAGEM_ESTIMADA linhas
+    depois da página, e o total devolvido passa a ser um mínimo.
     """
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        query = "SELECT * FROM equipamentos WHERE 1=1"
-        params = []
-        
-        if filtros:
-            # Busca por termo geral (procura em múltiplos campos)
-            if filtros.get('q'):
-                termo = f"%{filtros['q']}%"
-                query += """
-                    AND (patrimonio LIKE ? 
-                    OR descritivo LIKE ? 
-                    OR numero_serie LIKE ?
-                    OR usuario LIKE ?
-                    OR host LIKE ?
-                    OR local_atual LIKE ?
-                    OR tipo LIKE ?)
-                """
-                params.extend([termo] * 7)
-            
-            # Filtros exatos
-            campos_exatos = ['tipo', 'status', 'setor', 'centro_custo', 'obra_projeto', 'funcao', 'cargo']
-            for campo in campos_exatos:
-                valor = filtros.get(campo)
-                if valor:
-                    if isinstance(valor, list) and len(valor) > 0:
-                        placeholders = ', '.join(['?'] * len(valor))
-                        query += f" AND {campo} IN ({placeholders})"
-                        params.extend(valor)
-                    elif valor:
-                        query += f" AND {campo} = ?"
-                        params.append(valor)
-            
-            # Filtros de texto parcial
-            campos_parcial = ['usuario', 'local_atual', 'descritivo', 'patrimonio', 'serie', 'teamviewer_id', 'host']
-            for campo in campos_parcial:
-                valor = filtros.get(campo)
-                if valor:
-                    query += f" AND {campo} LIKE ?"
-                    params.append(f"%{valor}%")
-            
-            # Filtros de data
-            if filtros.get('data_recebimento_inicio'):
-                query += " AND date(data_recebimento) >= date(?)"
-                params.append(filtros['data_recebimento_inicio'])
-            
-            if filtros.get('data_recebimento_fim'):
-                query += " AND date(data_recebimento) <= date(?)"
-                params.append(filtros['data_recebimento_fim'])
-            
-            # Filtros de valor
-            if filtros.get('valor_min'):
-                query += " AND valor_locacao >= ?"
-                params.append(float(filtros['valor_min']))
-            
-            if filtros.get('valor_max'):
-                query += " AND valor_locacao <= ?"
-                params.append(float(filtros['valor_max']))
-        
-        # Ordenação
-        campos_validos = ['id', 'tipo', 'descritivo', 'centro_custo', 'patrimonio', 
-                         'numero_serie', 'local_atual', 'setor', 'usuario', 'funcao',
-                         'obra_projeto', 'data_recebimento', 'data_devolucao', 
-                         'valor_locacao', 'status', 'cargo', 'host']
+        where, params_filtro = _montar_filtros_avancados(filtros)
+        offset = (pagina - 1) * por_pagina
         
-        if ordenar_por in campos_validos:
-            query += f" ORDER BY {ordenar_por} {ordenar_direcao}"
+        colunas, params = "equipamentos.*", []
+        if por_pagina > 0:
+            limite = offset + LIMITE_CONTAGEM_ESTIMADA if total_estimado else None
+            contagem, params = _montar_contagem(where, params_filtro, limite)
+            colunas += f", {contagem} AS total_filtrado"
+        
+        # Ordenação ("relevancia" = ranking bm25 do FTS5 para o termo geral)
+        consulta_fts = montar_consulta_fts(filtros.get('q')) if filtros and filtros.get('q') else None
+        if ordenar_por == 'relevancia' and consulta_fts and fts_ativo(conn):
+            # Só rowid/rank do FTS: as demais colunas dele têm os mesmos
+            # nomes das de equipamentos e deixariam os filtros ambíguos.
+            # LEFT JOIN porque o termo também casa por trecho de patrimônio/
+            # série; essas linhas (sem rank) vêm depois das do FTS
+            query = (
+                f"SELECT {colunas} FROM equipamentos "
+                "LEFT JOIN (SELECT rowid, rank FROM equipamentos_fts WHERE equipamentos_fts MATCH ?) AS fts "
+                "ON fts.rowid = equipamentos.id" + where
+                + " ORDER BY fts.rank IS NULL, fts.rank, equipamentos.id"
+            )
+            params.append(consulta_fts)
         else:
-            query += " ORDER BY patrimonio ASC"
+            query = f"SELECT {colunas} FROM equipamentos" + where + _montar_ordenacao(ordenar_por, ordenar_direcao)
+        params.extend(params_filtro)
         
         # Paginação
         if por_pagina > 0:
-            offset = (pagina - 1) * por_pagina
             query += " LIMIT ? OFFSET ?"
             params.extend([por_pagina, offset])
         
         cursor.execute(query, params)
         resultados = cursor.fetchall()
         
-        # Conta total
-        if por_pagina > 0:
-            # Query de contagem simplificada
-            count_params = []
-            count_query = "SELECT COUNT(*) FROM equipamentos WHERE 1=1"
-            
-            if filtros and filtros.get('q'):
-                count_query += """
-                    AND (patrimonio LIKE ? 
-                    OR descritivo LIKE ? 
-                    OR numero_serie LIKE ?
-                    OR usuario LIKE ?
-                    OR host LIKE ?
-                    OR local_atual LIKE ?
-                    OR tipo LIKE ?)
-                """
-                count_params.extend([f"%{filtros['q']}%"] * 7)
-            
-            cursor.execute(count_query, count_params)
-            total = cursor.fetchone()[0]
-        else:
-            total = len(resultados)
+        if por_pagina <= 0:
+            return resultados, len(resultados)
+        
+        resultados, total = _separar_total(conn, resultados)
+        if total is None:
+            # Página vazia: só é preciso contar se ela está além do fim
+            total = 0
+            if offset > 0:
+                contagem, params = _montar_contagem(where, params_filtro, limite)
+                total = conn.execute("SELECT " + contagem, params).fetchone()[0]
         
         return resultados, total
 
+# CTE materializada (SQLite >= 3.35): o filtro é avaliado uma vez só
+_CTE_MATERIALIZADA = 'MATERIALIZED ' if sqlite3.sqlite_version_info >= (3, 35, 0) else ''
+
+def contar_facetas_busca(
+    filtros: Optional[Dict[str, Any]],
+    campos: List[str]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Quantidade por valor de cada campo pedido (status, tipo, centro_custo...)
+    dentro do resultado filtrado da busca avançada, em um único comando:
+    o conjunto filtrado é materializado uma vez e cada faceta o agrupa
+    """
+    campos = list(dict.fromkeys(c for c in campos if c in CAMPOS_FILTRO))
+    if not campos:
+        return {}
+    
+    where, params = _montar_filtros_avancados(filtros)
+    agrupamentos = " UNION ALL ".join(
+        f"SELECT '{campo}' AS campo, {campo} AS valor, COUNT(*) AS total FROM filtrados "
+        f"WHERE {campo} IS NOT NULL AND {campo} != '' GROUP BY {campo}"
+        for campo in campos
+    )
+    query = (
+        f"WITH filtrados AS {_CTE_MATERIALIZADA}(SELECT {', '.join(campos)} FROM equipamentos{where}) "
+        f"{agrupamentos} ORDER BY campo, total DESC, valor"
+    )
+    
+    facetas: Dict[str, List[Dict[str, Any]]] = {campo: [] for campo in campos}
+    for campo, valor, total in get_db_connection().execute(query, params):
+        facetas[campo].append({'valor': valor, 'total': total})
+    return facetas
+
+# Limite seguro de parâmetros por comando (SQLITE_MAX_VARIABLE_NUMBER é 999
+# em versões antigas do SQLite)
+TAMANHO_BLOCO_IN = 900
+
+def buscar_equipamentos_por_chaves(
+    chaves: List[str],
+    campo: str = 'patrimonio'
+) -> Tuple[List[sqlite3.Row], List[str]]:
+    """
+    Busca vários equipamentos de uma vez por patrimônio ou número de série.
+    As chaves são consultadas em blocos de IN (...) usando os índices únicos.
+    Retorna (encontrados na ordem das chaves, chaves não encontradas).
+    """
+    if campo not in ('patrimonio', 'numero_serie'):
+        raise ValueError(f"Campo de busca inválido: {campo}")
+    
+    # Remove vazios e duplicadas mantendo a ordem informada
+    chaves = list(dict.fromkeys(c.strip() for c in chaves if c and c.strip()))
+    
+    por_chave: Dict[str, sqlite3.Row] = {}
+    with get_db_connection() as conn:
+        for inicio in range(0, len(chaves), TAMANHO_BLOCO_IN):
+            bloco = chaves[inicio:inicio + TAMANHO_BLOCO_IN]
+            placeholders = ','.join(['?'] * len(bloco))
+            cursor = conn.execute(
+                f"SELECT * FROM equipamentos WHERE {campo} IN ({placeholders})", bloco
+            )
+            for row in cursor:
+                por_chave[row[campo]] = row
+    
+    encontrados = [por_chave[c] for c in chaves if c in por_chave]
+    nao_encontrados = [c for c in chaves if c not in por_chave]
+    return encontrados, nao_encontrados
+
+def codificar_cursor(ordenar_por: str, ordenar_direcao: str, valor: Any, id_: int) -> str:
+    """Gera o cursor opaco (base64 url-safe) a partir da última linha da página"""
+    dados = json.dumps([ordenar_por, ordenar_direcao, valor, id_], separators=(',', ':'))
+    return base64.urlsafe_b64encode(dados.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decodificar_cursor(cursor: str, ordenar_por: str, ordenar_direcao: str) -> Tuple[Any, int]:
+    """
+    Decodifica um cursor e confere se ele pertence à mesma ordenação.
+    Lança ValueError para cursores inválidos.
+    """
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        dados = json.loads(base64.urlsafe_b64decode(cursor + preenchimento).decode('utf-8'))
+        campo, direcao, valor, id_ = dados
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+    
+    if campo != ordenar_por or direcao != ordenar_direcao or not isinstance(id_, int):
+        raise ValueError("Cursor não corresponde à ordenação solicitada")
+    return valor, id_
+
+def _montar_condicao_cursor(campo: str, direcao: str, valor: Any, id_: int) -> Tuple[str, List[Any]]:
+    """
+    Condição "depois da última linha vista" para ORDER BY campo, id.
+    No SQLite NULL ordena antes de qualquer valor em ASC (e depois em DESC).
+    """
+    if campo == 'id':
+        return (" AND id > ?" if direcao == 'ASC' else " AND id < ?"), [id_]
+    
+    if direcao == 'ASC':
+        if valor is None:
+            return f" AND ({campo} IS NOT NULL OR ({campo} IS NULL AND id > ?))", [id_]
+        return f" AND ({campo} > ? OR ({campo} = ? AND id > ?))", [valor, valor, id_]
+    
+    if valor is None:
+        return f" AND ({campo} IS NULL AND id < ?)", [id_]
+    return f" AND ({campo} < ? OR ({campo} = ? AND id < ?) OR {campo} IS NULL)", [valor, valor, id_]
+
+def buscar_equipamentos_cursor(
+    filtros: Optional[Dict[str, Any]] = None,
+    por_pagina: int = 50,
+    ordenar_por: str = 'patrimonio',
+    ordenar_direcao: str = 'ASC',
+    cursor: Optional[str] = None,
+    contar_total: bool = False
+) -> Tuple[List[sqlite3.Row], Optional[str], Optional[int]]:
+    """
+    Busca avançada paginada por cursor (keyset): o custo de cada página não
+    depende da profundidade, ao contrário de LIMIT/OFFSET.
+    Retorna (resultados, próximo cursor ou None, total ou None).
+    """
+    ordenar_por, ordenar_direcao = _normalizar_ordenacao(ordenar_por, ordenar_direcao)
+    por_pagina = max(1, por_pagina)
+    
+    with get_db_connection() as conn:
+        where, params = _montar_filtros_avancados(filtros)
+        
+        # Total (só na primeira página) no mesmo comando da página
+        colunas, params_total = "*", []
+        if contar_total:
+            contagem, params_total = _montar_contagem(where, params)
+            colunas += f", {contagem} AS total_filtrado"
+        
+        if cursor:
+            valor, id_ = decodificar_cursor(cursor, ordenar_por, ordenar_direcao)
+            condicao, params_cursor = _montar_condicao_cursor(ordenar_por, ordenar_direcao, valor, id_)
+            where += condicao
+            params = params + params_cursor
+        
+        # Uma linha extra indica se existe próxima página
+        query = f"SELECT {colunas} FROM equipamentos" + where + _montar_ordenacao(ordenar_por, ordenar_direcao) + " LIMIT ?"
+        resultados = conn.execute(query, params_total + params + [por_pagina + 1]).fetchall()
+        
+        total = None
+        if contar_total:
+            resultados, total = _separar_total(conn, resultados)
+            if total is None:
+                # Página vazia: depois de um cursor, o total ainda precisa ser contado
+                total = conn.execute("SELECT " + contagem, params_total).fetchone()[0] if cursor else 0
+        
+        proximo_cursor = None
+        if len(resultados) > por_pagina:
+            resultados = resultados[:por_pagina]
+            ultima = resultados[-1]
+            proximo_cursor = codificar_cursor(ordenar_por, ordenar_direcao, ultima[ordenar_por], ultima['id'])
+        
+        return resultados, proximo_cursor, total
+
+def iterar_equipamentos_avancado(
+    filtros: Optional[Dict[str, Any]] = None,
+    ordenar_por: str = 'patrimonio',
+    ordenar_direcao: str = 'ASC',
+    tamanho_bloco: int = 1000
+) -> Tuple[List[str], Iterator[List[sqlite3.Row]]]:
+    """
+    Versão em streaming da busca avançada (sem paginação): retorna os nomes
+    das colunas e um gerador de blocos lidos com fetchmany, para exportações
+    com memória constante
+    """
+    conn = get_db_connection()
+    where, params = _montar_filtros_avancados(filtros)
+    query = "SELECT * FROM equipamentos" + where + _montar_ordenacao(ordenar_por, ordenar_direcao)
+    
+    cursor = conn.execute(query, params)
+    colunas = [descricao[0] for descricao in cursor.description]
+    return colunas, _iterar_blocos(cursor, tamanho_bloco)
+
+def _iterar_blocos(cursor: sqlite3.Cursor, tamanho_bloco: int) -> Iterator[List[sqlite3.Row]]:
+    """Lê o cursor em blocos de `tamanho_bloco` linhas e o fecha ao final"""
+    try:
+        while True:
+            bloco = cursor.fetchmany(tamanho_bloco)
+            if not bloco:
+                break
+            yield bloco
+    finally:
+        cursor.close()
+
 def atualizar_equipamento(patrimonio: str, dados: Dict[str, Any]) -> bool:
     """
     Atualiza os dados de um equipamento
     """
-    campos_permitidos = {
-        "status", "data_recebimento", "data_devolucao", "valor_locacao", 
-        "local_atual", "usuario", "teamviewer_id", "cargo", "host", 
-        "descritivo", "centro_custo", "numero_serie", "setor", "obra_projeto", 
-        "observacao", "tipo", "funcao"
-    }
-    
     # Filtra apenas os campos válidos
-    dados_filtrados = {k: v for k, v in dados.items() if k in campos_permitidos}
+    dados_filtrados = {k: v for k, v in dados.items() if k in CAMPOS_ATUALIZACAO}
     
     if not dados_filtrados:
         return False
@@ -185,23 +457,97 @@ def atualizar_equipamento(patrimonio: str, dados: Dict[str, Any]) -> bool:
     query = f"UPDATE equipamentos SET {set_clause} WHERE patrimonio = ?"
     
     with get_db_connection() as conn:
+        iniciar_escrita(conn)
         cursor = conn.cursor()
         cursor.execute(query, params)
         conn.commit()
         return cursor.rowcount > 0
 
+def _selecionar_alvos_em_massa(
+    conn: sqlite3.Connection,
+    patrimonios: Optional[List[str]],
+    filtros: Optional[Dict[str, Any]]
+) -> Tuple[List[str], List[str], List[Tuple[str, List[Any]]]]:
+    """
+    Resolve os alvos de uma operação em massa dentro da transação aberta.
+    Retorna (patrimônios encontrados, não encontrados, [(WHERE, params)] para
+    aplicar a operação — um por bloco de IN, ou um único para filtros).
+    """
+    if patrimonios is not None:
+        chaves = list(dict.fromkeys(p.strip() for p in patrimonios if p and p.strip()))
+        existentes = set()
+        condicoes = []
+        for inicio in range(0, len(chaves), TAMANHO_BLOCO_IN):
+            bloco = chaves[inicio:inicio + TAMANHO_BLOCO_IN]
+            where = f" WHERE patrimonio IN ({','.join(['?'] * len(bloco))})"
+            existentes.update(
+                row[0] for row in conn.execute("SELECT patrimonio FROM equipamentos" + where, bloco)
+            )
+            condicoes.append((where, bloco))
+        encontrados = [c for c in chaves if c in existentes]
+        return encontrados, [c for c in chaves if c not in existentes], condicoes
+    
+    where, params = _montar_filtros_avancados(filtros)
+    encontrados = [
+        row[0] for row in conn.execute("SELECT patrimonio FROM equipamentos" + where, params)
+    ]
+    return encontrados, [], [(where, params)]
+
+def atualizar_equipamentos_em_massa(
+    dados: Dict[str, Any],
+    patrimonios: Optional[List[str]] = None,
+    filtros: Optional[Dict[str, Any]] = None
+) -> Dict[str, List[str]]:
+    """
+    Aplica o mesmo conjunto de alterações a uma lista de patrimônios ou a
+    todos os equipamentos que atendem aos filtros, em uma única transação.
+    Retorna {'atualizados': [...], 'nao_encontrados': [...]}.
+    """
+    dados_filtrados = {k: v for k, v in dados.items() if k in CAMPOS_ATUALIZACAO}
+    if not dados_filtrados:
+        raise ValueError("Nenhum campo válido para atualizar")
+    
+    set_clause = ", ".join([f"{k} = ?" for k in dados_filtrados.keys()])
+    valores = list(dados_filtrados.values())
+    
+    with get_db_connection() as conn:
+        # IMMEDIATE: reserva a escrita antes de ler os alvos
+        iniciar_escrita(conn)
+        encontrados, nao_encontrados, condicoes = _selecionar_alvos_em_massa(conn, patrimonios, filtros)
+        for where, params in condicoes:
+            conn.execute(f"UPDATE equipamentos SET {set_clause}" + where, valores + list(params))
+    
+    return {'atualizados': encontrados, 'nao_encontrados': nao_encontrados}
+
+def deletar_equipamentos_em_massa(
+    patrimonios: Optional[List[str]] = None,
+    filtros: Optional[Dict[str, Any]] = None
+) -> Dict[str, List[str]]:
+    """
+    Exclui uma lista de patrimônios (ou tudo que atende aos filtros) em uma
+    única transação. Retorna {'excluidos': [...], 'nao_encontrados': [...]}.
+    """
+    with get_db_connection() as conn:
+        iniciar_escrita(conn)
+        encontrados, nao_encontrados, condicoes = _selecionar_alvos_em_massa(conn, patrimonios, filtros)
+        for where, params in condicoes:
+            conn.execute("DELETE FROM equipamentos" + where, list(params))
+    
+    return {'excluidos': encontrados, 'nao_encontrados': nao_encontrados}
+
 # ============================================================================
 # FUNÇÕES DE FILTROS E ESTATÍSTICAS
 # ============================================================================
 
+# Campos com lista de valores nos filtros (ver também facetas.py)
+CAMPOS_FILTRO = ['tipo', 'status', 'centro_custo', 'setor',
+                 'funcao', 'cargo', 'obra_projeto', 'local_atual', 'usuario']
+
 def obter_valores_distintos(campo: str) -> List[str]:
     """
     Retorna valores distintos de um campo para usar em filtros
     """
-    campos_permitidos = ['tipo', 'status', 'centro_custo', 'setor', 
-                        'funcao', 'cargo', 'obra_projeto', 'local_atual', 'usuario']
-    
-    if campo not in campos_permitidos:
+    if campo not in CAMPOS_FILTRO:
         return []
     
     with get_db_connection() as conn:
@@ -218,14 +564,15 @@ def obter_valores_distintos(campo: str) -> List[str]:
 def obter_estatisticas_gerais() -> Dict[str, Any]:
     """
     Retorna estatísticas gerais dos equipamentos
+    (lidas das tabelas de resumo mantidas por triggers, ver resumos.py)
     """
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
         # Total por status
         cursor.execute("""
-            SELECT status, COUNT(*) as total 
-            FROM equipamentos 
+            SELECT NULLIF(status, '') as status, SUM(total) as total 
+            FROM resumo_centro_status 
             GROUP BY status 
             ORDER BY total DESC
         """)
@@ -233,19 +580,18 @@ def obter_estatisticas_gerais() -> Dict[str, Any]:
         
         # Total por tipo
         cursor.execute("""
-            SELECT tipo, COUNT(*) as total 
-            FROM equipamentos 
-            WHERE tipo IS NOT NULL AND tipo != ''
-            GROUP BY tipo 
+            SELECT tipo, total 
+            FROM resumo_tipo 
+            WHERE tipo != ''
             ORDER BY total DESC
         """)
         por_tipo = cursor.fetchall()
         
         # Total por centro de custo
         cursor.execute("""
-            SELECT centro_custo, COUNT(*) as total 
-            FROM equipamentos 
-            WHERE centro_custo IS NOT NULL AND centro_custo != ''
+            SELECT centro_custo, SUM(total) as total 
+            FROM resumo_centro_status 
+            WHERE centro_custo != ''
             GROUP BY centro_custo 
             ORDER BY total DESC
         """)
@@ -253,9 +599,9 @@ def obter_estatisticas_gerais() -> Dict[str, Any]:
         
         # Equipamentos sem centro de custo
         cursor.execute("""
-            SELECT COUNT(*) as total_sem_cc
-            FROM equipamentos
-            WHERE centro_custo IS NULL OR centro_custo = ''
+            SELECT IFNULL(SUM(total), 0) as total_sem_cc
+            FROM resumo_centro_status
+            WHERE centro_custo = ''
         """)
         sem_centro_custo = cursor.fetchone()[0]
         
@@ -266,6 +612,41 @@ def obter_estatisticas_gerais() -> Dict[str, Any]:
             'sem_centro_custo': sem_centro_custo
         }
 
+def obter_resumo_dashboard(limite_locais: int = 6) -> Dict[str, Any]:
+    """
+    Totais do dashboard inicial lidos das tabelas de resumo (ver resumos.py),
+    em um único comando: custo proporcional ao número de grupos
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT 'tipo', tipo, total FROM resumo_tipo
+            UNION ALL
+            SELECT 'status', status, SUM(total) FROM resumo_centro_status GROUP BY status
+            UNION ALL
+            SELECT 'local', local_atual, total FROM resumo_local
+        """)
+        
+        series: Dict[str, Dict[str, int]] = {'tipo': {}, 'status': {}, 'local': {}}
+        for serie, valor, quantidade in cursor.fetchall():
+            # Vazio/nulo ficam no mesmo grupo (os resumos guardam nulo como '')
+            valor = valor or 'Não informado'
+            series[serie][valor] = series[serie].get(valor, 0) + quantidade
+        por_tipo, por_status, por_local = series['tipo'], series['status'], series['local']
+        
+        def ordenar(contagens):
+            return sorted(contagens.items(), key=lambda item: (-item[1], item[0]))
+        
+        return {
+            'total': sum(por_tipo.values()),
+            'em_uso': por_status.get('Em uso', 0),
+            'devolvidos': por_status.get('Devolvido', 0),
+            'notebooks': por_tipo.get('Notebook', 0),
+            'por_tipo': ordenar(por_tipo),
+            'por_status': ordenar(por_status),
+            'por_local': ordenar(por_local)[:limite_locais]
+        }
+
 # ============================================================================
 # FUNÇÕES ESPECÍFICAS PARA CENTRO DE CUSTO
 # ============================================================================
@@ -273,6 +654,7 @@ def obter_estatisticas_gerais() -> Dict[str, Any]:
 def listar_centros_custo() -> List[sqlite3.Row]:
     """
     Retorna todos os centros de custo com estatísticas básicas
+    (lidas das tabelas de resumo mantidas por triggers, ver resumos.py)
     """
     with get_db_connection() as conn:
         cursor = conn.cursor()
@@ -280,21 +662,40 @@ def listar_centros_custo() -> List[sqlite3.Row]:
         cursor.execute("""
             SELECT 
                 centro_custo,
-                COUNT(*) as total_equipamentos,
-                COUNT(CASE WHEN status = 'Em uso' THEN 1 END) as em_uso,
-                COUNT(CASE WHEN status = 'Disponível' THEN 1 END) as disponivel,
-                COUNT(CASE WHEN status = 'Manutenção' THEN 1 END) as manutencao,
-                COUNT(CASE WHEN status = 'Baixado' THEN 1 END) as baixado,
-                SUM(CASE WHEN valor_locacao IS NOT NULL THEN valor_locacao ELSE 0 END) as valor_total
-            FROM equipamentos
-            WHERE centro_custo IS NOT NULL 
-            AND centro_custo != ''
+                SUM(total) as total_equipamentos,
+                SUM(CASE WHEN status = 'Em uso' THEN total ELSE 0 END) as em_uso,
+                SUM(CASE WHEN status = 'Disponível' THEN total ELSE 0 END) as disponivel,
+                SUM(CASE WHEN status = 'Manutenção' THEN total ELSE 0 END) as manutencao,
+                SUM(CASE WHEN status = 'Baixado' THEN total ELSE 0 END) as baixado,
+                SUM(valor_total) as valor_total
+            FROM resumo_centro_status
+            WHERE centro_custo != ''
             GROUP BY centro_custo
             ORDER BY total_equipamentos DESC
         """)
         
         return cursor.fetchall()
 
+def obter_distribuicao_status_centros_custo() -> List[sqlite3.Row]:
+    """
+    Distribuição por status dos equipamentos que têm centro de custo
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT 
+                NULLIF(status, '') as status,
+                SUM(total) as total,
+                SUM(valor_total) as valor_total
+            FROM resumo_centro_status
+            WHERE centro_custo != ''
+            GROUP BY status
+            ORDER BY total DESC
+        """)
+        
+        return cursor.fetchall()
+
 def buscar_equipamentos_por_centro_custo(
     centro_custo: str, 
     filtros: Optional[Dict[str, Any]] = None,
@@ -370,6 +771,21 @@ def buscar_equipamentos_por_centro_custo(
         
         return resultados, total
 
+def iterar_equipamentos_centro_custo(
+    centro_custo: str,
+    tamanho_bloco: int = 1000
+) -> Tuple[List[str], Iterator[List[sqlite3.Row]]]:
+    """
+    Lê os equipamentos de um centro de custo em blocos (streaming)
+    """
+    conn = get_db_connection()
+    cursor = conn.execute(
+        "SELECT * FROM equipamentos WHERE centro_custo = ? ORDER BY patrimonio ASC",
+        (centro_custo,)
+    )
+    colunas = [descricao[0] for descricao in cursor.description]
+    return colunas, _iterar_blocos(cursor, tamanho_bloco)
+
 def obter_resumo_centro_custo(centro_custo: str) -> Optional[Dict[str, Any]]:
     """
     Retorna resumo detalhado de um centro de custo
@@ -0,0 +1,261 @@
+# src/relatorio_pdf.py - Relatório PDF de equipamentos gerado no servidor
+#
+# Mesmo layout do PDF que a tela Gerenciar montava no navegador (jsPDF):
+# agrupado por tipo, com Descritivo, Patrimônio e Nº Série. As linhas são
+# lidas do banco em blocos e desenhadas à medida que chegam, sem carregar o
+# conjunto inteiro; o PDF pronto fica em cache por filtros + versão dos dados.
+#
+# A renderização (fpdf2, Python puro) roda em um pool de processos para não
+# prender o GIL das requisições, e os relatórios de vários centros de custo
+# são gerados em paralelo.
+#
+# Dependência opcional: pip install fpdf2 (sem ela as rotas de PDF
+# respondem 503 e a tela volta a gerar o PDF no navegador)
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from cache import CacheVersionado, versao_dados
+from database import DB_PATH, criar_conexao, get_db_connection
+
+try:
+    from fpdf import FPDF
+except ImportError:
+    FPDF = None
+
+# Filtros aceitos (igualdade), os mesmos da exportação CSV
+CAMPOS_FILTRO_PDF = ['tipo', 'status', 'centro_custo', 'setor', 'local_atual', 'usuario']
+
+PDF_PROCESSOS = int(os.environ.get('PDF_PROCESSOS', min(4, os.cpu_count() or 1)))
+TAMANHO_BLOCO_LEITURA = 2000
+
+# Larguras em mm (A4 retrato, margens de 14 mm)
+COLUNAS_PDF = (('Descritivo', 100), ('Patrimônio', 37), ('Nº Série', 45))
+ALTURA_LINHA = 6
+MARGEM_CELULA = 1
+COR_CABECALHO = (13, 74, 130)
+COR_GRUPO = (230, 230, 230)
+
+_GRUPO = "COALESCE(NULLIF(tipo, ''), 'Sem tipo')"
+
+_cache_pdfs = CacheVersionado(max_itens=32)
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def pdf_disponivel() -> bool:
+    return FPDF is not None
+
+def normalizar_filtros(filtros: Optional[Dict[str, Any]]) -> Tuple[Tuple[str, str], ...]:
+    """Filtros válidos e não vazios, em ordem fixa (chave do cache)"""
+    filtros = filtros or {}
+    return tuple(
+        (campo, str(filtros[campo]).strip())
+        for campo in CAMPOS_FILTRO_PDF
+        if filtros.get(campo) and str(filtros[campo]).strip()
+    )
+
+def _texto(valor: Any) -> str:
+    """As fontes padrão do PDF só têm latin-1"""
+    return str(valor if valor is not None else '').encode('latin-1', 'replace').decode('latin-1')
+
+def _ajustar(pdf, texto: str, largura: float) -> str:
+    """
+    Corta o texto (com reticências) para caber na célula. Mede pela tabela
+    de larguras da fonte padrão: get_string_width do fpdf2 é o passo mais
+    caro por linha em relatórios grandes.
+    """
+    larguras = pdf.current_font.cw
+    limite = (largura - 2 * MARGEM_CELULA) * 1000 * pdf.k / pdf.font_size_pt
+    total = sum(larguras.get(c, 600) for c in texto)
+    if total <= limite:
+        return texto
+    limite -= 3 * larguras['.']
+    for posicao, caractere in enumerate(texto):
+        largura_caractere = larguras.get(caractere, 600)
+        if largura_caractere > limite:
+            return texto[:posicao] + '...'
+        limite -= largura_caractere
+    return texto + '...'
+
+if FPDF is not None:
+    class _DocumentoRelatorio(FPDF):
+        """Repete o cabeçalho da tabela e numera as páginas"""
+
+        def header(self):
+            if self.page_no() > 1:
+                _desenhar_cabecalho_tabela(self)
+
+        def footer(self):
+            self.set_y(-12)
+            self.set_font('Helvetica', '', 8)
+            self.set_text_color(120)
+            self.cell(0, 6, f'Página {self.page_no()} de {self.str_alias_nb_pages}', align='R')
+
+def _desenhar_cabecalho_tabela(pdf) -> None:
+    pdf.set_font('Helvetica', 'B', 9)
+    pdf.set_fill_color(*COR_CABECALHO)
+    pdf.set_text_color(255)
+    for titulo, largura in COLUNAS_PDF:
+        pdf.cell(largura, ALTURA_LINHA + 1, _texto(titulo), border=1, fill=True)
+    pdf.ln()
+    pdf.set_text_color(0)
+
+def _desenhar_grupo(pdf, grupo: str, quantidade: int) -> None:
+    if pdf.will_page_break(2 * ALTURA_LINHA):
+        pdf.add_page()  # não deixa o título do grupo sozinho no fim da página
+    pdf.set_font('Helvetica', 'B', 9)
+    pdf.set_fill_color(*COR_GRUPO)
+    largura_total = sum(largura for _, largura in COLUNAS_PDF)
+    pdf.cell(largura_total, ALTURA_LINHA, _texto(f'{grupo} ({quantidade})'), border=1, fill=True)
+    pdf.ln()
+    pdf.set_font('Helvetica', '', 9)
+
+def _desenhar_linha(pdf, valores: Tuple[Any, ...]) -> None:
+    """
+    Linha da tabela com text() + rect(), sem cell(): cell() faz layout
+    completo (quebra, estilos, cópia do estado gráfico) e domina o tempo
+    de geração com dezenas de milhares de linhas
+    """
+    if pdf.get_y() + ALTURA_LINHA > pdf.page_break_trigger:
+        pdf.add_page()  # header() repete o cabeçalho da tabela
+    x, y = pdf.l_margin, pdf.get_y()
+    linha_base = y + ALTURA_LINHA / 2 + 0.3 * pdf.font_size
+    for valor, (_, largura) in zip(valores, COLUNAS_PDF):
+        pdf.rect(x, y, largura, ALTURA_LINHA)
+        pdf.text(x + MARGEM_CELULA, linha_base, _ajustar(pdf, _texto(valor), largura))
+        x += largura
+    pdf.set_y(y + ALTURA_LINHA)
+
+def _montar_where(filtros: Iterable[Tuple[str, str]]) -> Tuple[str, List[str]]:
+    condicoes, params = [], []
+    for campo, valor in filtros:
+        condicoes.append(f"{campo} = ?")
+        params.append(valor)
+    return (" WHERE " + " AND ".join(condicoes)) if condicoes else "", params
+
+def renderizar_pdf(db_path: str, filtros: Tuple[Tuple[str, str], ...], titulo: str) -> Optional[bytes]:
+    """
+    Gera o PDF lendo o banco em blocos (roda nos processos do pool, com
+    conexão própria). Retorna None se nenhum equipamento atender aos filtros.
+    """
+    where, params = _montar_where(filtros)
+    conn = criar_conexao(db_path)
+    try:
+        # Uma transação de leitura: contagens e linhas da mesma fotografia
+        conn.execute("BEGIN")
+        contagens = dict(conn.execute(
+            f"SELECT {_GRUPO} AS grupo, COUNT(*) FROM equipamentos{where} GROUP BY grupo", params
+        ).fetchall())
+        if not contagens:
+            return None
+
+        pdf = _DocumentoRelatorio(orientation='P', unit='mm', format='A4')
+        pdf.set_margins(14, 14, 14)
+        pdf.set_auto_page_break(True, margin=16)
+        pdf.set_title(_texto(titulo))
+        pdf.alias_nb_pages('{total_paginas}')  # reserva largura para 5+ dígitos
+        pdf.add_page()
+
+        pdf.set_font('Helvetica', 'B', 16)
+        pdf.cell(0, 8, _texto(titulo), new_x='LMARGIN', new_y='NEXT')
+        pdf.set_font('Helvetica', '', 11)
+        pdf.cell(0, 7, f"Data: {datetime.now().strftime('%d/%m/%Y')}", new_x='LMARGIN', new_y='NEXT')
+        if filtros:
+            descricao = ', '.join(f'{campo}: {valor}' for campo, valor in filtros)
+            pdf.set_font('Helvetica', '', 9)
+            pdf.cell(0, 6, _ajustar(pdf, _texto(f'Filtros - {descricao}'), 182), new_x='LMARGIN', new_y='NEXT')
+        pdf.cell(0, 6, f'Total: {sum(contagens.values())} equipamento(s)', new_x='LMARGIN', new_y='NEXT')
+        pdf.ln(2)
+        _desenhar_cabecalho_tabela(pdf)
+
+        cursor = conn.execute(
+            f"SELECT {_GRUPO} AS grupo, descritivo, patrimonio, numero_serie "
+            f"FROM equipamentos{where} ORDER BY grupo, patrimonio", params
+        )
+        grupo_atual = None
+        while True:
+            bloco = cursor.fetchmany(TAMANHO_BLOCO_LEITURA)
+            if not bloco:
+                break
+            for grupo, *valores in bloco:
+                if grupo != grupo_atual:
+                    grupo_atual = grupo
+                    _desenhar_grupo(pdf, _texto(grupo), contagens.get(grupo, 0))
+                _desenhar_linha(pdf, valores)
+        return bytes(pdf.output())
+    finally:
+        conn.close()
+
+# ============================================================================
+# POOL DE PROCESSOS E CACHE
+# ============================================================================
+
+def _obter_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: o servidor tem threads, e fork copiaria locks em uso
+                _pool = ProcessPoolExecutor(
+                    max_workers=max(1, PDF_PROCESSOS),
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _pool
+
+def _titulo(filtros: Tuple[Tuple[str, str], ...]) -> str:
+    centro_custo = dict(filtros).get('centro_custo')
+    if centro_custo:
+        return f'Relatório de Equipamentos - {centro_custo}'
+    return 'Relatório de Equipamentos'
+
+def _chave(filtros: Tuple[Tuple[str, str], ...]) -> Tuple:
+    # A data impressa no relatório também faz parte da chave
+    return ('pdf', filtros, date.today().isoformat())
+
+def obter_pdf(filtros: Optional[Dict[str, Any]] = None) -> Optional[bytes]:
+    """PDF dos equipamentos filtrados (None se não houver nenhum)"""
+    if FPDF is None:
+        raise RuntimeError("Geração de PDF indisponível: instale o pacote fpdf2")
+    filtros_normalizados = normalizar_filtros(filtros)
+    versao = versao_dados(get_db_connection())
+    return _cache_pdfs.obter_ou_calcular(
+        _chave(filtros_normalizados), versao,
+        lambda: _obter_pool().submit(
+            renderizar_pdf, DB_PATH, filtros_normalizados, _titulo(filtros_normalizados)
+        ).result()
+    )
+
+def obter_pdfs_centros_custo(
+    centros_custo: List[str],
+    filtros: Optional[Dict[str, Any]] = None
+) -> Dict[str, Optional[bytes]]:
+    """
+    Um PDF por centro de custo (com os demais filtros em comum). Os que não
+    estão em cache são renderizados em paralelo no pool de processos.
+    """
+    if FPDF is None:
+        raise RuntimeError("Geração de PDF indisponível: instale o pacote fpdf2")
+    base = {campo: valor for campo, valor in normalizar_filtros(filtros) if campo != 'centro_custo'}
+    versao = versao_dados(get_db_connection())
+
+    resultados: Dict[str, Optional[bytes]] = {}
+    pendentes = {}
+    for centro_custo in dict.fromkeys(centros_custo):
+        filtros_centro = normalizar_filtros({**base, 'centro_custo': centro_custo})
+        pdf = _cache_pdfs.obter(_chave(filtros_centro), versao)
+        if pdf is not None:
+            resultados[centro_custo] = pdf
+        else:
+            pendentes[centro_custo] = (filtros_centro, _obter_pool().submit(
+                renderizar_pdf, DB_PATH, filtros_centro, _titulo(filtros_centro)
+            ))
+
+    for centro_custo, (filtros_centro, futuro) in pendentes.items():
+        pdf = futuro.result()
+        if pdf is not None:
+            _cache_pdfs.guardar(_chave(filtros_centro), versao, pdf)
+        resultados[centro_custo] = pdf
+    return resultados
@@ -0,0 +1,187 @@
+# src/relatorios.py - Relatório de centro de custo em uma única leitura
+import heapq
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from cache import CacheVersionado, versao_dados
+from database import get_db_connection
+
+_cache_relatorios = CacheVersionado(max_itens=512)
+
+def _numero(valor: Any) -> float:
+    """Valor numérico como o SUM do SQLite o trataria (texto inválido = 0)"""
+    if valor is None:
+        return 0.0
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _chave_sqlite(valor: Any):
+    """Ordem de comparação do SQLite: NULL < números < texto"""
+    if valor is None:
+        return (0, 0)
+    if isinstance(valor, (int, float)):
+        return (1, valor)
+    return (2, str(valor))
+
+def _percentual(quantidade: int, total: int) -> float:
+    return round((quantidade / total * 100), 1) if total > 0 else 0
+
+def montar_relatorio_centro_custo(centro_custo: str) -> Optional[Dict[str, Any]]:
+    """
+    Monta o relatório completo de um centro de custo a partir de UMA varredura
+    das suas linhas, dentro de uma transação de leitura (todas as seções
+    refletem a mesma fotografia do banco). Retorna None se o centro não existir.
+    """
+    conn = get_db_connection()
+    with conn:
+        conn.execute("BEGIN")
+        cursor = conn.execute("""
+            SELECT
+                patrimonio, tipo, descritivo, usuario, setor, local_atual,
+                status, valor_locacao, data_recebimento,
+                strftime('%Y-%m', data_recebimento) as mes,
+                data_recebimento >= date('now', '-12 months') as ultimos_12_meses
+            FROM equipamentos
+            WHERE centro_custo = ?
+        """, (centro_custo,))
+        linhas = cursor.fetchall()
+
+    total_equipamentos = len(linhas)
+    if total_equipamentos == 0:
+        return None
+
+    tipos, usuarios, setores = set(), set(), set()
+    datas: List[str] = []
+    investimento_total = 0.0
+    valores: List[float] = []
+    por_status: Dict[Any, List[float]] = {}
+    por_tipo: Dict[str, List[Any]] = {}
+    por_mes: Dict[str, List[float]] = {}
+
+    for row in linhas:
+        valor = row['valor_locacao']
+        valor_num = _numero(valor)
+        investimento_total += valor_num
+        if valor is not None:
+            valores.append(valor_num)
+
+        if row['tipo'] is not None:
+            tipos.add(row['tipo'])
+        if row['usuario'] is not None:
+            usuarios.add(row['usuario'])
+        if row['setor'] is not None:
+            setores.add(row['setor'])
+        if row['data_recebimento'] is not None:
+            datas.append(row['data_recebimento'])
+
+        grupo = por_status.setdefault(row['status'], [0, 0.0])
+        grupo[0] += 1
+        grupo[1] += valor_num
+
+        if row['tipo']:
+            # [quantidade, soma, soma dos não nulos, quantidade de não nulos]
+            grupo = por_tipo.setdefault(row['tipo'], [0, 0.0, 0.0, 0])
+            grupo[0] += 1
+            grupo[1] += valor_num
+            if valor is not None:
+                grupo[2] += valor_num
+                grupo[3] += 1
+
+        if row['data_recebimento'] is not None and row['ultimos_12_meses']:
+            grupo = por_mes.setdefault(row['mes'], [0, 0.0])
+            grupo[0] += 1
+            grupo[1] += valor_num
+
+    primeira_data = min(datas, key=_chave_sqlite) if datas else None
+    ultima_data = max(datas, key=_chave_sqlite) if datas else None
+    valor_medio = sum(valores) / len(valores) if valores else 0
+
+    mais_valiosos = heapq.nlargest(
+        10, (row for row in linhas if row['valor_locacao'] is not None),
+        key=lambda row: _chave_sqlite(row['valor_locacao'])
+    )
+    recentes = heapq.nlargest(
+        10, (row for row in linhas if row['data_recebimento'] is not None),
+        key=lambda row: _chave_sqlite(row['data_recebimento'])
+    )
+    distribuicao_status = sorted(por_status.items(), key=lambda item: -item[1][0])
+    distribuicao_tipo = sorted(por_tipo.items(), key=lambda item: -item[1][0])[:10]
+    evolucao_mensal = sorted(por_mes.items(), key=lambda item: _chave_sqlite(item[0]), reverse=True)
+
+    return {
+        'centro_custo': centro_custo,
+        'resumo_geral': {
+            'total_equipamentos': total_equipamentos,
+            'tipos_diferentes': len(tipos),
+            'usuarios_diferentes': len(usuarios),
+            'setores_diferentes': len(setores),
+            'investimento_total': investimento_total or 0,
+            'valor_medio': valor_medio or 0,
+            'periodo': f"{primeira_data} a {ultima_data}" if primeira_data and ultima_data else "N/A"
+        },
+        'distribuicao_status': [
+            {
+                'status': status,
+                'quantidade': quantidade,
+                'percentual': _percentual(quantidade, total_equipamentos),
+                'valor_total': valor_total or 0
+            } for status, (quantidade, valor_total) in distribuicao_status
+        ],
+        'distribuicao_tipo': [
+            {
+                'tipo': tipo,
+                'quantidade': quantidade,
+                'percentual': _percentual(quantidade, total_equipamentos),
+                'valor_total': valor_total or 0,
+                'valor_medio': soma_nao_nulos / nao_nulos if nao_nulos else 0
+            } for tipo, (quantidade, valor_total, soma_nao_nulos, nao_nulos) in distribuicao_tipo
+        ],
+        'equipamentos_mais_valiosos': [
+            {
+                'patrimonio': row['patrimonio'],
+                'tipo': row['tipo'],
+                'descritivo': row['descritivo'],
+                'valor_locacao': _numero(row['valor_locacao']) or 0,
+                'usuario': row['usuario'],
+                'status': row['status']
+            } for row in mais_valiosos
+        ],
+        'equipamentos_recentes': [
+            {
+                'patrimonio': row['patrimonio'],
+                'tipo': row['tipo'],
+                'descritivo': row['descritivo'],
+                'data_recebimento': row['data_recebimento'],
+                'usuario': row['usuario']
+            } for row in recentes
+        ],
+        'evolucao_mensal': [
+            {
+                'mes': mes,
+                'quantidade': quantidade,
+                'valor_total': valor_total or 0
+            } for mes, (quantidade, valor_total) in evolucao_mensal
+        ]
+    }
+
+def obter_relatorio_centro_custo(centro_custo: str) -> Optional[Dict[str, Any]]:
+    """
+    Relatório de centro de custo com cache por (centro de custo, data, versão
+    dos dados): enquanto nada for alterado no banco, o relatório não é
+    recalculado no mesmo dia. A data de geração é a da resposta, não a do
+    cálculo guardado em cache
+    """
+    versao = versao_dados(get_db_connection())
+    # A janela de 12 meses usa date('now') do SQLite, que é em UTC
+    hoje = datetime.now(timezone.utc).date().isoformat()
+    relatorio = _cache_relatorios.obter_ou_calcular(
+        ('centro_custo', centro_custo, hoje), versao,
+        lambda: montar_relatorio_centro_custo(centro_custo)
+    )
+    if relatorio is None:
+        return None
+    return {**relatorio, 'data_geracao': datetime.now().isoformat()}
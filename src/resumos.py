@@ -0,0 +1,210 @@
+# src/resumos.py - Tabelas de resumo mantidas por triggers
+#
+# Contadores e somas de valor_locacao por (centro_custo, status), por tipo e
+# por local, atualizados a cada INSERT/UPDATE/DELETE em "equipamentos".
+# Estatísticas, dashboard e listagem de centros de custo passam a custar
+# O(número de grupos).
+#   python src/resumos.py verificar     # compara os resumos com a tabela
+#   python src/resumos.py reconstruir   # recalcula os resumos do zero
+import argparse
+import sqlite3
+from typing import List, Tuple
+
+from database import criar_conexao, executar_script
+
+# Valores nulos são guardados como '' (mesmo grupo de "não informado")
+SQL_TABELAS_RESUMO = """
+    CREATE TABLE IF NOT EXISTS resumo_centro_status (
+        centro_custo TEXT NOT NULL,
+        status TEXT NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        valor_total REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (centro_custo, status)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS resumo_tipo (
+        tipo TEXT NOT NULL PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0,
+        valor_total REAL NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+"""
+
+def _incrementar(ref: str) -> str:
+    """Comandos que somam a linha `ref` (new) nos resumos"""
+    return f"""
+        INSERT INTO resumo_centro_status (centro_custo, status, total, valor_total)
+        VALUES (IFNULL({ref}.centro_custo, ''), IFNULL({ref}.status, ''), 1, IFNULL({ref}.valor_locacao, 0))
+        ON CONFLICT (centro_custo, status) DO UPDATE SET
+            total = total + 1,
+            valor_total = valor_total + excluded.valor_total;
+        INSERT INTO resumo_tipo (tipo, total, valor_total)
+        VALUES (IFNULL({ref}.tipo, ''), 1, IFNULL({ref}.valor_locacao, 0))
+        ON CONFLICT (tipo) DO UPDATE SET
+            total = total + 1,
+            valor_total = valor_total + excluded.valor_total;"""
+
+def _decrementar(ref: str) -> str:
+    """Comandos que subtraem a linha `ref` (old) dos resumos e removem grupos vazios"""
+    return f"""
+        UPDATE resumo_centro_status
+        SET total = total - 1, valor_total = valor_total - IFNULL({ref}.valor_locacao, 0)
+        WHERE centro_custo = IFNULL({ref}.centro_custo, '') AND status = IFNULL({ref}.status, '');
+        DELETE FROM resumo_centro_status
+        WHERE centro_custo = IFNULL({ref}.centro_custo, '') AND status = IFNULL({ref}.status, '') AND total <= 0;
+        UPDATE resumo_tipo
+        SET total = total - 1, valor_total = valor_total - IFNULL({ref}.valor_locacao, 0)
+        WHERE tipo = IFNULL({ref}.tipo, '');
+        DELETE FROM resumo_tipo WHERE tipo = IFNULL({ref}.tipo, '') AND total <= 0;"""
+
+SQL_TRIGGERS_RESUMO = f"""
+    CREATE TRIGGER IF NOT EXISTS resumos_ai AFTER INSERT ON equipamentos BEGIN
+        {_incrementar('new')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS resumos_ad AFTER DELETE ON equipamentos BEGIN
+        {_decrementar('old')}
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS resumos_au AFTER UPDATE OF centro_custo, status, tipo, valor_locacao ON equipamentos BEGIN
+        {_decrementar('old')}
+        {_incrementar('new')}
+    END;
+"""
+
+# Agregações equivalentes calculadas diretamente na tabela
+SQL_CALCULO_CENTRO_STATUS = """
+    SELECT IFNULL(centro_custo, ''), IFNULL(status, ''), COUNT(*), SUM(IFNULL(valor_locacao, 0))
+    FROM equipamentos
+    GROUP BY 1, 2
+"""
+
+SQL_CALCULO_TIPO = """
+    SELECT IFNULL(tipo, ''), COUNT(*), SUM(IFNULL(valor_locacao, 0))
+    FROM equipamentos
+    GROUP BY 1
+"""
+
+# Resumo por local (dashboard inicial), criado em uma migração posterior:
+# tabela e triggers próprias, porque as de cima não disparam com local_atual
+SQL_RESUMO_LOCAL = """
+    CREATE TABLE IF NOT EXISTS resumo_local (
+        local_atual TEXT NOT NULL PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0,
+        valor_total REAL NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS resumo_local_ai AFTER INSERT ON equipamentos BEGIN
+        INSERT INTO resumo_local (local_atual, total, valor_total)
+        VALUES (IFNULL(new.local_atual, ''), 1, IFNULL(new.valor_locacao, 0))
+        ON CONFLICT (local_atual) DO UPDATE SET
+            total = total + 1,
+            valor_total = valor_total + excluded.valor_total;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS resumo_local_ad AFTER DELETE ON equipamentos BEGIN
+        UPDATE resumo_local
+        SET total = total - 1, valor_total = valor_total - IFNULL(old.valor_locacao, 0)
+        WHERE local_atual = IFNULL(old.local_atual, '');
+        DELETE FROM resumo_local WHERE local_atual = IFNULL(old.local_atual, '') AND total <= 0;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS resumo_local_au AFTER UPDATE OF local_atual, valor_locacao ON equipamentos BEGIN
+        UPDATE resumo_local
+        SET total = total - 1, valor_total = valor_total - IFNULL(old.valor_locacao, 0)
+        WHERE local_atual = IFNULL(old.local_atual, '');
+        DELETE FROM resumo_local WHERE local_atual = IFNULL(old.local_atual, '') AND total <= 0;
+        INSERT INTO resumo_local (local_atual, total, valor_total)
+        VALUES (IFNULL(new.local_atual, ''), 1, IFNULL(new.valor_locacao, 0))
+        ON CONFLICT (local_atual) DO UPDATE SET
+            total = total + 1,
+            valor_total = valor_total + excluded.valor_total;
+    END;
+"""
+
+SQL_CALCULO_LOCAL = """
+    SELECT IFNULL(local_atual, ''), COUNT(*), SUM(IFNULL(valor_locacao, 0))
+    FROM equipamentos
+    GROUP BY 1
+"""
+
+# Tabela de resumo -> (colunas, agregação equivalente calculada na tabela)
+CALCULOS_RESUMO = {
+    'resumo_centro_status': ('centro_custo, status, total, valor_total', SQL_CALCULO_CENTRO_STATUS),
+    'resumo_tipo': ('tipo, total, valor_total', SQL_CALCULO_TIPO),
+    'resumo_local': ('local_atual, total, valor_total', SQL_CALCULO_LOCAL),
+}
+
+def criar_resumos(conn: sqlite3.Connection) -> None:
+    """Cria tabelas e triggers e preenche os resumos (usado pela migração)"""
+    executar_script(conn, SQL_TABELAS_RESUMO)
+    executar_script(conn, SQL_TRIGGERS_RESUMO)
+    _recalcular(conn, ('resumo_centro_status', 'resumo_tipo'))
+
+def criar_resumo_local(conn: sqlite3.Connection) -> None:
+    """Cria e preenche o resumo por local (usado pela migração)"""
+    executar_script(conn, SQL_RESUMO_LOCAL)
+    _recalcular(conn, ('resumo_local',))
+
+def _recalcular(conn: sqlite3.Connection, tabelas: Tuple[str, ...] = tuple(CALCULOS_RESUMO)) -> None:
+    for tabela in tabelas:
+        colunas, sql_calculado = CALCULOS_RESUMO[tabela]
+        conn.execute(f"DELETE FROM {tabela}")
+        conn.execute(f"INSERT INTO {tabela} ({colunas}) " + sql_calculado)
+
+def reconstruir_resumos(conn: sqlite3.Connection) -> None:
+    """Recalcula os resumos do zero em uma única transação"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _recalcular(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def verificar_resumos(conn: sqlite3.Connection, tolerancia: float = 0.005) -> List[str]:
+    """
+    Compara os resumos com as agregações da tabela (em uma mesma leitura).
+    Retorna a lista de divergências encontradas (vazia = tudo certo).
+    """
+    divergencias = []
+
+    with conn:
+        conn.execute("BEGIN")  # mesma fotografia do banco para todas as leituras
+        for tabela, (colunas, sql_calculado) in CALCULOS_RESUMO.items():
+            sql_resumo = f"SELECT {colunas} FROM {tabela}"
+            calculado = {tuple(row[:-2]): (row[-2], row[-1]) for row in conn.execute(sql_calculado)}
+            resumo = {tuple(row[:-2]): (row[-2], row[-1]) for row in conn.execute(sql_resumo)}
+
+            for chave in sorted(set(calculado) | set(resumo)):
+                esperado = calculado.get(chave, (0, 0))
+                atual = resumo.get(chave, (0, 0))
+                if esperado[0] != atual[0] or abs((esperado[1] or 0) - (atual[1] or 0)) > tolerancia:
+                    divergencias.append(
+                        f"{tabela} {chave}: esperado total={esperado[0]} valor={esperado[1]}, "
+                        f"resumo total={atual[0]} valor={atual[1]}"
+                    )
+    return divergencias
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Tabelas de resumo de equipamentos')
+    parser.add_argument('comando', choices=['verificar', 'reconstruir'])
+    args = parser.parse_args()
+
+    from migrations import migrar
+
+    conn = criar_conexao()
+    migrar(conn)
+    if args.comando == 'reconstruir':
+        reconstruir_resumos(conn)
+        print("Resumos reconstruídos.")
+    else:
+        divergencias = verificar_resumos(conn)
+        for divergencia in divergencias:
+            print(divergencia)
+        print("Resumos consistentes." if not divergencias else f"{len(divergencias)} divergência(s).")
+        conn.close()
+        raise SystemExit(1 if divergencias else 0)
+    conn.close()
+
+if __name__ == '__main__':
+    main()
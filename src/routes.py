@@ -1,30 +1,135 @@
 # src/routes.py - VERSÃO REFATORADA
 import sqlite3
 import csv
+import hashlib
 import io
-from datetime import datetime
+import zipfile
+from datetime import date, datetime
 from io import StringIO
-from flask import Blueprint, jsonify, request, Response
+from itertools import chain
+from flask import Blueprint, current_app, g, jsonify, request, Response, send_file, stream_with_context
 
 # Importe as funções do models refatorado
 from models import (
     get_db_connection,
     buscar_equipamentos,
     buscar_equipamentos_avancado,
+    buscar_equipamentos_cursor,
+    buscar_equipamentos_por_chaves,
+    contar_facetas_busca,
+    iterar_equipamentos_avancado,
     atualizar_equipamento,
+    atualizar_equipamentos_em_massa,
+    deletar_equipamentos_em_massa,
     obter_valores_distintos,
     obter_estatisticas_gerais,
-    listar_centros_custo,
+    obter_resumo_dashboard,
+    listar_centros_custo as consultar_centros_custo,
+    obter_distribuicao_status_centros_custo,
     buscar_equipamentos_por_centro_custo,
+    iterar_equipamentos_centro_custo,
     obter_resumo_centro_custo,
     obter_equipamentos_mais_valiosos_centro_custo,
     obter_equipamentos_recentes_centro_custo,
     contar_equipamentos_centro_custo,
-    verificar_centro_custo_existe
+    verificar_centro_custo_existe,
+    CAMPOS_FILTRO,
+    LIMITE_CONTAGEM_ESTIMADA
 )
+from lote import processar_lote as processar_lote_csv, TAMANHO_BLOCO_PADRAO
+from tarefas_lote import criar_tarefa, obter_tarefa, listar_tarefas, TAMANHO_BLOCO_TAREFA
+from relatorios import obter_relatorio_centro_custo
+from facetas import obter_facetas
+from historico import historico_equipamento, inventario_em, interpretar_momento
+from relatorio_pdf import obter_pdf, obter_pdfs_centros_custo, pdf_disponivel, CAMPOS_FILTRO_PDF
+from cache import versao_dados
+from database import iniciar_escrita
+from metricas import exportar_prometheus
+from consultas_lentas import ARQUIVO_PADRAO as LOG_CONSULTAS_LENTAS, resumir as resumir_consultas_lentas
 
 api_bp = Blueprint('api', __name__)
 
+# ============================================================================
+# GET CONDICIONAL (ETag)
+# ============================================================================
+
+# Rotas cuja resposta não depende só dos dados (ex.: timestamp do health)
+ENDPOINTS_SEM_ETAG = {'api.health_check', 'api.exportar_metricas', 'api.consultas_lentas',
+                      'api.listar_tarefas_lote', 'api.status_tarefa_lote', 'api.erros_tarefa_lote'}
+
+# Parâmetros que não alteram a resposta (anti-cache do jQuery/DataTables)
+PARAMETROS_IGNORADOS_ETAG = {'_'}
+
+def _calcular_etag() -> str:
+    """
+    ETag forte da requisição: versão dos dados + rota + parâmetros
+    normalizados (ordenados) + data do dia, pois algumas consultas usam
+    date('now')
+    """
+    parametros = sorted(
+        (chave, valor) for chave, valor in request.args.items(multi=True)
+        if chave not in PARAMETROS_IGNORADOS_ETAG
+    )
+    base = repr((
+        versao_dados(get_db_connection()),
+        request.path,
+        parametros,
+        _formato_colunar(),
+        date.today().isoformat()
+    ))
+    return hashlib.sha1(base.encode('utf-8')).hexdigest()
+
+@api_bp.before_request
+def verificar_etag():
+    """Responde 304 a If-None-Match antes de executar qualquer consulta"""
+    if request.method != 'GET' or request.endpoint in ENDPOINTS_SEM_ETAG:
+        return None
+    try:
+        g.etag = _calcular_etag()
+    except sqlite3.Error:
+        return None  # sem versão disponível: segue sem validação condicional
+
+    if request.if_none_match.contains(g.etag):
+        resposta = Response(status=304)
+        resposta.set_etag(g.etag)
+        resposta.headers['Cache-Control'] = 'no-cache'
+        return resposta
+    return None
+
+@api_bp.after_request
+def adicionar_etag(resposta):
+    etag = g.pop('etag', None)
+    if etag and resposta.status_code == 200:
+        resposta.set_etag(etag)
+        resposta.headers['Cache-Control'] = 'no-cache'
+        resposta.vary.add('Accept')
+    return resposta
+
+# ============================================================================
+# FORMATO COLUNAR
+# ============================================================================
+
+# Ativado por ?formato=colunar ou pelo cabeçalho Accept
+MIMETYPE_COLUNAR = 'application/vnd.equipamentos.colunar+json'
+
+def _formato_colunar() -> bool:
+    if request.args.get('formato', '').lower() == 'colunar':
+        return True
+    return MIMETYPE_COLUNAR in request.accept_mimetypes.values()
+
+def _serializar_linhas(linhas):
+    """
+    Lista de dicts (padrão) ou, no formato colunar,
+    {"columns": [...], "rows": [[...], ...]} montado direto das tuplas,
+    sem repetir os nomes das colunas em cada linha
+    """
+    if not _formato_colunar():
+        return [dict(row) for row in linhas]
+    return {
+        'columns': list(linhas[0].keys()) if linhas else [],
+        'rows': [tuple(row) for row in linhas]
+    }
+
 # ============================================================================
 # ROTAS BÁSICAS DE EQUIPAMENTOS
 # ============================================================================
@@ -48,7 +153,7 @@ def buscar():
     filtros = {k: [v for v in valores if v] for k, valores in filtros.items() if valores}
     
     resultados = buscar_equipamentos(filtros)
-    return jsonify([dict(row) for row in resultados])
+    return jsonify(_serializar_linhas(resultados))
 
 @api_bp.route('/equipamentos', methods=['POST'])
 def criar_equipamento():
@@ -75,6 +180,7 @@ def criar_equipamento():
 
     try:
         with get_db_connection() as conn:
+            iniciar_escrita(conn)
             cursor = conn.cursor()
             colunas = ', '.join(dados_filtrados.keys())
             placeholders = ', '.join(['?'] * len(dados_filtrados))
@@ -92,6 +198,39 @@ def criar_equipamento():
     except Exception as e:
         return jsonify({"erro": f"Erro interno: {str(e)}"}), 500
 
+@api_bp.route('/equipamentos/busca-lote', methods=['POST'])
+def buscar_lote():
+    """
+    Busca vários equipamentos em uma única requisição
+    Ex: POST /api/equipamentos/busca-lote
+        {"campo": "patrimonio", "chaves": ["7720", "ARK402741", ...]}
+    """
+    dados = request.get_json(silent=True)
+    if not dados or not isinstance(dados.get('chaves'), list):
+        return jsonify({"sucesso": False, "erro": "Informe a lista 'chaves'"}), 400
+    
+    campo = dados.get('campo', 'patrimonio')
+    if campo not in ('patrimonio', 'numero_serie'):
+        return jsonify({"sucesso": False, "erro": "Campo deve ser 'patrimonio' ou 'numero_serie'"}), 400
+    
+    try:
+        chaves = [str(c) for c in dados['chaves'] if c is not None]
+        encontrados, nao_encontrados = buscar_equipamentos_por_chaves(chaves, campo)
+        
+        return jsonify({
+            'sucesso': True,
+            'campo': campo,
+            'encontrados': [dict(row) for row in encontrados],
+            'nao_encontrados': nao_encontrados,
+            'total_encontrados': len(encontrados)
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'sucesso': False,
+            'erro': f'Erro na busca em lote: {str(e)}'
+        }), 500
+
 @api_bp.route('/equipamentos/<patrimonio>', methods=['PATCH'])
 def atualizar(patrimonio):
     dados = request.get_json()
@@ -119,6 +258,7 @@ def atualizar(patrimonio):
 def deletar_equipamento(patrimonio):
     try:
         with get_db_connection() as conn:
+            iniciar_escrita(conn)  # lê e exclui na mesma transação de escrita
             cursor = conn.cursor()
             cursor.execute("SELECT patrimonio FROM equipamentos WHERE patrimonio = ?", (patrimonio,))
             if not cursor.fetchone():
@@ -131,6 +271,86 @@ def deletar_equipamento(patrimonio):
     except Exception as e:
         return jsonify({"erro": f"Erro ao excluir: {str(e)}"}), 500
 
+def _alvos_em_massa(dados):
+    """
+    Extrai os alvos de uma operação em massa do corpo JSON:
+    {"patrimonios": [...]} ou {"filtros": {...}} (mesmos filtros da pesquisa)
+    """
+    if isinstance(dados.get('patrimonios'), list):
+        return [str(p) for p in dados['patrimonios'] if p is not None], None
+    
+    campos_filtro = {
+        'q', 'tipo', 'status', 'centro_custo', 'setor', 'local_atual', 'usuario',
+        'patrimonio', 'serie', 'host', 'descritivo', 'funcao', 'cargo', 'obra_projeto',
+        'teamviewer_id', 'data_recebimento_inicio', 'data_recebimento_fim',
+        'valor_min', 'valor_max'
+    }
+    filtros = {k: v for k, v in (dados.get('filtros') or {}).items() if k in campos_filtro and v}
+    if not filtros:
+        raise ValueError("Informe 'patrimonios' ou ao menos um filtro em 'filtros'")
+    return None, filtros
+
+def _resultados_em_massa(chave, processados, nao_encontrados):
+    """Resultado por patrimônio de uma operação em massa"""
+    return (
+        [{'patrimonio': p, chave: True} for p in processados] +
+        [{'patrimonio': p, chave: False, 'erro': 'Equipamento não encontrado'} for p in nao_encontrados]
+    )
+
+@api_bp.route('/equipamentos/em-massa', methods=['PATCH'])
+def atualizar_em_massa():
+    """
+    Aplica as mesmas alterações a vários equipamentos em uma transação
+    Ex: PATCH /api/equipamentos/em-massa
+        {"patrimonios": ["7720", "7721"], "dados": {"status": "Devolvido"}}
+        {"filtros": {"tipo": "Notebook", "centro_custo": "ARKLOK"}, "dados": {"status": "Devolvido"}}
+    """
+    dados = request.get_json(silent=True)
+    if not dados or not isinstance(dados.get('dados'), dict):
+        return jsonify({"sucesso": False, "erro": "Informe as alterações em 'dados'"}), 400
+    
+    try:
+        patrimonios, filtros = _alvos_em_massa(dados)
+        resultado = atualizar_equipamentos_em_massa(dados['dados'], patrimonios=patrimonios, filtros=filtros)
+    except ValueError as e:
+        return jsonify({"sucesso": False, "erro": str(e)}), 400
+    except sqlite3.IntegrityError as e:
+        return jsonify({"sucesso": False, "erro": f"Erro de integridade, nenhuma alteração gravada: {str(e)}"}), 409
+    except Exception as e:
+        return jsonify({"sucesso": False, "erro": f"Erro ao atualizar: {str(e)}"}), 500
+    
+    return jsonify({
+        'sucesso': True,
+        'mensagem': f"{len(resultado['atualizados'])} equipamento(s) atualizado(s)",
+        'total_atualizados': len(resultado['atualizados']),
+        'resultados': _resultados_em_massa('atualizado', resultado['atualizados'], resultado['nao_encontrados'])
+    })
+
+@api_bp.route('/equipamentos/em-massa', methods=['DELETE'])
+def deletar_em_massa():
+    """
+    Exclui vários equipamentos em uma transação
+    Ex: DELETE /api/equipamentos/em-massa  {"patrimonios": ["7720", "7721"]}
+    """
+    dados = request.get_json(silent=True)
+    if not dados:
+        return jsonify({"sucesso": False, "erro": "Corpo JSON vazio"}), 400
+    
+    try:
+        patrimonios, filtros = _alvos_em_massa(dados)
+        resultado = deletar_equipamentos_em_massa(patrimonios=patrimonios, filtros=filtros)
+    except ValueError as e:
+        return jsonify({"sucesso": False, "erro": str(e)}), 400
+    except Exception as e:
+        return jsonify({"sucesso": False, "erro": f"Erro ao excluir: {str(e)}"}), 500
+    
+    return jsonify({
+        'sucesso': True,
+        'mensagem': f"{len(resultado['excluidos'])} equipamento(s) excluído(s)",
+        'total_excluidos': len(resultado['excluidos']),
+        'resultados': _resultados_em_massa('excluido', resultado['excluidos'], resultado['nao_encontrados'])
+    })
+
 @api_bp.route('/equipamentos/lote', methods=['POST'])
 def processar_lote():
     if 'file' not in request.files:
@@ -148,65 +368,55 @@ def processar_lote():
     if acao not in ['create', 'update', 'delete']:
         return jsonify({"erro": "Ação inválida. Use: create, update ou delete"}), 400
     
+    tudo_ou_nada = request.form.get('tudo_ou_nada', '').lower() in ('1', 'true', 'on', 'sim')
+    assincrono = request.form.get('assincrono', '').lower() in ('1', 'true', 'on', 'sim')
+    try:
+        tamanho_bloco = int(request.form.get(
+            'tamanho_bloco', TAMANHO_BLOCO_TAREFA if assincrono else TAMANHO_BLOCO_PADRAO))
+    except ValueError:
+        return jsonify({"erro": "tamanho_bloco deve ser um número inteiro"}), 400
+    
+    if assincrono:
+        # Grava o arquivo em disco e processa em segundo plano; o cliente
+        # acompanha pelo status da tarefa
+        try:
+            tarefa = criar_tarefa(arquivo, acao, tudo_ou_nada, tamanho_bloco)
+        except UnicodeDecodeError:
+            return jsonify({"erro": "Erro ao ler arquivo CSV. Use codificação UTF-8"}), 400
+        except ValueError as e:
+            return jsonify({"erro": str(e)}), 400
+        except Exception as e:
+            return jsonify({"erro": f"Erro ao enfileirar: {str(e)}"}), 500
+        
+        return jsonify({
+            "mensagem": "Arquivo recebido, processamento em andamento",
+            "tarefa": tarefa.para_dict(),
+            "status_url": f"/api/equipamentos/lote/tarefas/{tarefa.id}"
+        }), 202
+    
     try:
         stream = io.StringIO(arquivo.stream.read().decode("UTF-8-sig"))
         csv_input = csv.DictReader(stream)
         
-        if 'patrimonio' not in csv_input.fieldnames:
+        if 'patrimonio' not in (csv_input.fieldnames or []):
             return jsonify({"erro": "Coluna 'patrimonio' obrigatória no CSV"}), 400
         
-        resultados = {"sucesso": 0, "erros": [], "detalhes": []}
+        # Uma transação por bloco (ou uma única no modo tudo-ou-nada),
+        # com SAVEPOINT por linha para o relatório de erros
+        resultados = processar_lote_csv(
+            acao,
+            enumerate(csv_input, start=2),
+            tamanho_bloco=tamanho_bloco,
+            tudo_ou_nada=tudo_ou_nada
+        )
         
-        for linha_num, linha in enumerate(csv_input, start=2):
-            try:
-                patrimonio = linha.get('patrimonio', '').strip()
-                if not patrimonio:
-                    resultados["erros"].append(f"Linha {linha_num}: Patrimônio obrigatório")
-                    continue
-                
-                if acao == 'create':
-                    dados = {k: v.strip() for k, v in linha.items() if k != 'patrimonio' and v.strip()}
-                    if not dados.get('tipo'):
-                        raise ValueError("Tipo é obrigatório para criação")
-                    dados['patrimonio'] = patrimonio
-                    if 'status' not in dados:
-                        dados['status'] = 'Em uso'
-                    
-                    with get_db_connection() as conn:
-                        cursor = conn.cursor()
-                        colunas = list(dados.keys())
-                        valores = list(dados.values())
-                        query = f"INSERT INTO equipamentos ({', '.join(colunas)}) VALUES ({', '.join(['?'] * len(valores))})"
-                        cursor.execute(query, valores)
-                        conn.commit()
-                    resultados["sucesso"] += 1
-                    resultados["detalhes"].append(f"Criado: {patrimonio}")
-                    
-                elif acao == 'update':
-                    dados = {k: v.strip() for k, v in linha.items() if k != 'patrimonio' and v.strip()}
-                    if not dados:
-                        raise ValueError("Nenhum campo para atualizar")
-                    if not atualizar_equipamento(patrimonio, dados):
-                        raise ValueError("Equipamento não encontrado")
-                    resultados["sucesso"] += 1
-                    resultados["detalhes"].append(f"Atualizado: {patrimonio}")
-                    
-                elif acao == 'delete':
-                    with get_db_connection() as conn:
-                        cursor = conn.cursor()
-                        cursor.execute("SELECT patrimonio FROM equipamentos WHERE patrimonio = ?", (patrimonio,))
-                        if not cursor.fetchone():
-                            raise ValueError("Equipamento não encontrado")
-                        cursor.execute("DELETE FROM equipamentos WHERE patrimonio = ?", (patrimonio,))
-                        conn.commit()
-                    resultados["sucesso"] += 1
-                    resultados["detalhes"].append(f"Excluído: {patrimonio}")
-            
-            except Exception as e:
-                resultados["erros"].append(f"Linha {linha_num} ({patrimonio}): {str(e)}")
+        if resultados["revertido"]:
+            mensagem = f"{acao.capitalize()} cancelado: {len(resultados['erros'])} erro(s), nenhuma alteração gravada"
+        else:
+            mensagem = f"{acao.capitalize()} concluído: {resultados['sucesso']} operações bem-sucedidas"
         
         return jsonify({
-            "mensagem": f"{acao.capitalize()} concluído: {resultados['sucesso']} operações bem-sucedidas",
+            "mensagem": mensagem,
             "resultados": resultados
         }), 200
         
@@ -215,10 +425,68 @@ def processar_lote():
     except Exception as e:
         return jsonify({"erro": f"Erro ao processar: {str(e)}"}), 500
 
+@api_bp.route('/equipamentos/lote/tarefas', methods=['GET'])
+def listar_tarefas_lote():
+    """Cargas em segundo plano de todos os workers, das mais recentes às mais antigas"""
+    return jsonify({
+        'sucesso': True,
+        'tarefas': [tarefa.para_dict() for tarefa in listar_tarefas()]
+    })
+
+@api_bp.route('/equipamentos/lote/tarefas/<tarefa_id>', methods=['GET'])
+def status_tarefa_lote(tarefa_id):
+    """
+    Andamento de uma carga: status (na_fila, processando, concluida,
+    falhou), linhas lidas, gravadas e erros até o momento
+    """
+    tarefa = obter_tarefa(tarefa_id)
+    if tarefa is None:
+        return jsonify({'sucesso': False, 'erro': 'Tarefa não encontrada'}), 404
+    return jsonify({'sucesso': True, 'tarefa': tarefa.para_dict()})
+
+@api_bp.route('/equipamentos/lote/tarefas/<tarefa_id>/erros', methods=['GET'])
+def erros_tarefa_lote(tarefa_id):
+    """Relatório completo de erros da carga (CSV)"""
+    tarefa = obter_tarefa(tarefa_id)
+    if tarefa is None:
+        return jsonify({'sucesso': False, 'erro': 'Tarefa não encontrada'}), 404
+    if not tarefa.concluida or tarefa.total_erros == 0:
+        return jsonify({'sucesso': False, 'erro': 'Relatório de erros indisponível'}), 404
+    
+    return send_file(
+        tarefa.caminho_erros,
+        mimetype='text/csv',
+        as_attachment=True,
+        download_name=f"erros_lote_{tarefa.nome_arquivo.rsplit('.', 1)[0]}.csv"
+    )
+
 # ============================================================================
 # ROTAS DE PESQUISA E FILTROS AVANÇADOS
 # ============================================================================
 
+@api_bp.route('/equipamentos/facetas', methods=['GET'])
+def obter_facetas_filtros():
+    """
+    Valores distintos e quantidades de todos os campos de filtro em uma
+    única resposta (uma leitura da tabela, em cache até a próxima alteração)
+    Ex: GET /api/equipamentos/facetas
+    Ex: GET /api/equipamentos/facetas?campos=tipo,status,centro_custo
+    """
+    try:
+        campos = [c.strip() for c in request.args.get('campos', '').split(',') if c.strip()]
+        facetas = obter_facetas(campos)
+        
+        return jsonify({
+            'sucesso': True,
+            'facetas': facetas
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'sucesso': False,
+            'erro': f'Erro ao calcular facetas: {str(e)}'
+        }), 500
+
 @api_bp.route('/equipamentos/filtros/<campo>', methods=['GET'])
 def obter_valores_filtro(campo):
     """
@@ -247,6 +515,11 @@ def pesquisa_avancada():
     """
     Pesquisa avançada com múltiplos filtros
     Ex: GET /api/equipamentos/pesquisa?q=notebook&centro_custo=TI&status=Em uso
+    Ex: GET /api/equipamentos/pesquisa?cursor=&ordenar_por=data_recebimento (paginação por cursor)
+    Ex: GET /api/equipamentos/pesquisa?q=lenovo l14&ordenar_por=relevancia
+    Ex: GET /api/equipamentos/pesquisa?por_pagina=1000&formato=colunar
+    Ex: GET /api/equipamentos/pesquisa?q=dell&facetas=status,tipo,centro_custo
+    Ex: GET /api/equipamentos/pesquisa?status=Em uso&total=estimado (não conta tudo)
     """
     try:
         # Parâmetros de paginação
@@ -301,28 +574,71 @@ def pesquisa_avancada():
             except ValueError:
                 pass
         
-        # Executa busca
+        # Contagens por valor dentro do resultado filtrado (opcional)
+        campos_facetas = [c.strip() for c in request.args.get('facetas', '').split(',') if c.strip()]
+        facetas = contar_facetas_busca(filtros, campos_facetas) if campos_facetas else None
+        
+        # Paginação por cursor (keyset): ativada pelo parâmetro "cursor"
+        # (vazio na primeira página). O total só é calculado na primeira página.
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            try:
+                resultados, proximo_cursor, total = buscar_equipamentos_cursor(
+                    filtros=filtros,
+                    por_pagina=por_pagina,
+                    ordenar_por=ordenar_por,
+                    ordenar_direcao=ordenar_direcao,
+                    cursor=cursor.strip() or None,
+                    contar_total=not cursor.strip()
+                )
+            except ValueError as e:
+                return jsonify({'sucesso': False, 'erro': str(e)}), 400
+            
+            resposta = {
+                'sucesso': True,
+                'resultados': _serializar_linhas(resultados),
+                'paginacao': {
+                    'modo': 'cursor',
+                    'por_pagina': por_pagina,
+                    'total': total,
+                    'next_cursor': proximo_cursor
+                },
+                'filtros_aplicados': filtros
+            }
+            if facetas is not None:
+                resposta['facetas'] = facetas
+            return jsonify(resposta)
+        
+        # Executa busca (página e total no mesmo comando). Com total=estimado
+        # a contagem para LIMITE_CONTAGEM_ESTIMADA linhas depois da página
+        total_estimado = request.args.get('total', '').lower() == 'estimado'
         resultados, total = buscar_equipamentos_avancado(
             filtros=filtros,
             pagina=pagina,
             por_pagina=por_pagina,
             ordenar_por=ordenar_por,
-            ordenar_direcao=ordenar_direcao
+            ordenar_direcao=ordenar_direcao,
+            total_estimado=total_estimado
         )
         
         total_paginas = (total + por_pagina - 1) // por_pagina if por_pagina > 0 else 0
+        total_exato = not total_estimado or total < (pagina - 1) * por_pagina + LIMITE_CONTAGEM_ESTIMADA
         
-        return jsonify({
+        resposta = {
             'sucesso': True,
-            'resultados': [dict(row) for row in resultados],
+            'resultados': _serializar_linhas(resultados),
             'paginacao': {
                 'pagina': pagina,
                 'por_pagina': por_pagina,
                 'total': total,
+                'total_exato': total_exato,
                 'total_paginas': total_paginas
             },
             'filtros_aplicados': filtros
-        })
+        }
+        if facetas is not None:
+            resposta['facetas'] = facetas
+        return jsonify(resposta)
         
     except Exception as e:
         return jsonify({
@@ -370,7 +686,7 @@ def listar_centros_custo():
     Ex: GET /api/centros-custo
     """
     try:
-        centros = listar_centros_custo()
+        centros = consultar_centros_custo()
         
         return jsonify({
             'sucesso': True,
@@ -486,7 +802,7 @@ def listar_equipamentos_por_centro_custo(centro_custo):
         return jsonify({
             'sucesso': True,
             'centro_custo': centro_custo,
-            'equipamentos': [dict(row) for row in resultados],
+            'equipamentos': _serializar_linhas(resultados),
             'paginacao': {
                 'pagina': pagina,
                 'por_pagina': por_pagina,
@@ -597,6 +913,37 @@ def equipamentos_recentes_centro_custo(centro_custo):
 # ROTAS DE EXPORTAÇÃO
 # ============================================================================
 
+def _gerar_csv(colunas, primeiro_bloco, blocos):
+    """
+    Gera o CSV bloco a bloco: cada bloco lido do banco vira um pedaço da
+    resposta, sem acumular o arquivo inteiro em memória
+    """
+    output = StringIO()
+    writer = csv.writer(output)
+    
+    # Cabeçalho
+    writer.writerow(colunas)
+    
+    for bloco in chain([primeiro_bloco], blocos):
+        writer.writerows(
+            [str(value) if value is not None else '' for value in row]
+            for row in bloco
+        )
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+
+def _resposta_csv(colunas, primeiro_bloco, blocos, filename):
+    """Response em streaming para exportação CSV"""
+    return Response(
+        stream_with_context(_gerar_csv(colunas, primeiro_bloco, blocos)),
+        mimetype='text/csv',
+        headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            'Content-Type': 'text/csv; charset=utf-8'
+        }
+    )
+
 @api_bp.route('/equipamentos/exportar', methods=['GET'])
 def exportar_equipamentos():
     """
@@ -613,39 +960,19 @@ def exportar_equipamentos():
             if valor:
                 filtros[campo] = valor
         
-        # Busca todos os equipamentos (sem paginação)
-        resultados, _ = buscar_equipamentos_avancado(filtros=filtros, por_pagina=0)
+        # Lê em blocos (sem paginação); o primeiro bloco é lido já aqui
+        # para responder 404 quando não houver resultados
+        colunas, blocos = iterar_equipamentos_avancado(filtros=filtros)
+        primeiro_bloco = next(blocos, None)
         
-        if not resultados:
+        if not primeiro_bloco:
             return jsonify({
                 'sucesso': False,
                 'erro': 'Nenhum equipamento encontrado para exportar'
             }), 404
         
-        # Cria CSV
-        output = StringIO()
-        writer = csv.writer(output)
-        
-        # Cabeçalho
-        if resultados:
-            cabecalho = resultados[0].keys()
-            writer.writerow(cabecalho)
-            
-            # Dados
-            for row in resultados:
-                writer.writerow([str(value) if value is not None else '' for value in row])
-        
-        # Configura resposta
         filename = f'equipamentos_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        
-        return Response(
-            output.getvalue(),
-            mimetype='text/csv',
-            headers={
-                'Content-Disposition': f'attachment; filename={filename}',
-                'Content-Type': 'text/csv; charset=utf-8'
-            }
-        )
+        return _resposta_csv(colunas, primeiro_bloco, blocos, filename)
         
     except Exception as e:
         return jsonify({
@@ -667,42 +994,18 @@ def exportar_equipamentos_centro_custo(centro_custo):
                 'erro': f'Centro de custo "{centro_custo}" não encontrado'
             }), 404
         
-        # Busca todos os equipamentos do centro de custo
-        resultados, total = buscar_equipamentos_por_centro_custo(
-            centro_custo=centro_custo,
-            por_pagina=0  # 0 = sem paginação
-        )
+        # Lê todos os equipamentos do centro de custo em blocos
+        colunas, blocos = iterar_equipamentos_centro_custo(centro_custo)
+        primeiro_bloco = next(blocos, None)
         
-        if total == 0:
+        if not primeiro_bloco:
             return jsonify({
                 'sucesso': False,
                 'erro': f'Nenhum equipamento encontrado para o centro de custo "{centro_custo}"'
             }), 404
         
-        # Cria CSV
-        output = StringIO()
-        writer = csv.writer(output)
-        
-        # Cabeçalho
-        if resultados:
-            cabecalho = resultados[0].keys()
-            writer.writerow(cabecalho)
-            
-            # Dados
-            for row in resultados:
-                writer.writerow([str(value) if value is not None else '' for value in row])
-        
-        # Configura resposta
         filename = f'equipamentos_{centro_custo}_{datetime.now().strftime("%Y%m%d")}.csv'
-        
-        return Response(
-            output.getvalue(),
-            mimetype='text/csv',
-            headers={
-                'Content-Disposition': f'attachment; filename={filename}',
-                'Content-Type': 'text/csv; charset=utf-8'
-            }
-        )
+        return _resposta_csv(colunas, primeiro_bloco, blocos, filename)
         
     except Exception as e:
         return jsonify({
@@ -710,6 +1013,203 @@ def exportar_equipamentos_centro_custo(centro_custo):
             'erro': f'Erro ao exportar equipamentos: {str(e)}'
         }), 500
 
+def _pdf_indisponivel():
+    return jsonify({
+        'sucesso': False,
+        'erro': 'Geração de PDF indisponível no servidor (instale o pacote fpdf2)'
+    }), 503
+
+def _filtros_pdf():
+    return {
+        campo: request.args.get(campo, '').strip()
+        for campo in CAMPOS_FILTRO_PDF
+        if request.args.get(campo, '').strip()
+    }
+
+def _resposta_pdf(conteudo, filename):
+    return send_file(
+        io.BytesIO(conteudo),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=filename
+    )
+
+@api_bp.route('/equipamentos/relatorio.pdf', methods=['GET'])
+def exportar_pdf_equipamentos():
+    """
+    Relatório PDF (agrupado por tipo) dos equipamentos filtrados
+    Ex: GET /api/equipamentos/relatorio.pdf?centro_custo=TI&status=Em uso
+    """
+    if not pdf_disponivel():
+        return _pdf_indisponivel()
+    try:
+        conteudo = obter_pdf(_filtros_pdf())
+        if conteudo is None:
+            return jsonify({
+                'sucesso': False,
+                'erro': 'Nenhum equipamento encontrado para exportar'
+            }), 404
+
+        filename = f'relatorio_equipamentos_{datetime.now().strftime("%Y%m%d")}.pdf'
+        return _resposta_pdf(conteudo, filename)
+
+    except Exception as e:
+        return jsonify({
+            'sucesso': False,
+            'erro': f'Erro ao gerar PDF: {str(e)}'
+        }), 500
+
+@api_bp.route('/centros-custo/<centro_custo>/relatorio.pdf', methods=['GET'])
+def exportar_pdf_centro_custo(centro_custo):
+    """
+    Relatório PDF dos equipamentos de um centro de custo
+    Ex: GET /api/centros-custo/A2WORKS/relatorio.pdf?status=Em uso
+    """
+    if not pdf_disponivel():
+        return _pdf_indisponivel()
+    try:
+        if not verificar_centro_custo_existe(centro_custo):
+            return jsonify({
+                'sucesso': False,
+                'erro': f'Centro de custo "{centro_custo}" não encontrado'
+            }), 404
+
+        conteudo = obter_pdf({**_filtros_pdf(), 'centro_custo': centro_custo})
+        if conteudo is None:
+            return jsonify({
+                'sucesso': False,
+                'erro': f'Nenhum equipamento encontrado para o centro de custo "{centro_custo}"'
+            }), 404
+
+        filename = f'relatorio_{centro_custo}_{datetime.now().strftime("%Y%m%d")}.pdf'
+        return _resposta_pdf(conteudo, filename)
+
+    except Exception as e:
+        return jsonify({
+            'sucesso': False,
+            'erro': f'Erro ao gerar PDF: {str(e)}'
+        }), 500
+
+@api_bp.route('/centros-custo/relatorios.zip', methods=['GET'])
+def exportar_pdfs_centros_custo():
+    """
+    Um PDF por centro de custo, gerados em paralelo, em um arquivo ZIP
+    (sem ?centros=, todos os centros de custo)
+    Ex: GET /api/centros-custo/relatorios.zip?centros=A2WORKS,OBRA-01&status=Em uso
+    """
+    if not pdf_disponivel():
+        return _pdf_indisponivel()
+    try:
+        centros = [c.strip() for c in request.args.get('centros', '').split(',') if c.strip()]
+        if not centros:
+            centros = [item['centro_custo'] for item in consultar_centros_custo()]
+
+        pdfs = obter_pdfs_centros_custo(centros, _filtros_pdf())
+        pdfs = {centro: conteudo for centro, conteudo in pdfs.items() if conteudo is not None}
+        if not pdfs:
+            return jsonify({
+                'sucesso': False,
+                'erro': 'Nenhum equipamento encontrado para exportar'
+            }), 404
+
+        arquivo = io.BytesIO()
+        # PDFs já são comprimidos: ZIP só empacota
+        with zipfile.ZipFile(arquivo, 'w', zipfile.ZIP_STORED) as zip_saida:
+            for centro, conteudo in pdfs.items():
+                nome = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in centro)
+                zip_saida.writestr(f'relatorio_{nome}.pdf', conteudo)
+        arquivo.seek(0)
+
+        return send_file(
+            arquivo,
+            mimetype='application/zip',
+            as_attachment=True,
+            download_name=f'relatorios_centros_custo_{datetime.now().strftime("%Y%m%d")}.zip'
+        )
+
+    except Exception as e:
+        return jsonify({
+            'sucesso': False,
+            'erro': f'Erro ao gerar PDFs: {str(e)}'
+        }), 500
+
+# ============================================================================
+# ROTAS DE HISTÓRICO
+# ============================================================================
+
+@api_bp.route('/equipamentos/<patrimonio>/historico', methods=['GET'])
+def historico_do_equipamento(patrimonio):
+    """
+    Alterações de um equipamento, da mais recente à mais antiga
+    Ex: GET /api/equipamentos/7720/historico?limite=50
+    """
+    try:
+        limite = request.args.get('limite', type=int)
+        eventos = historico_equipamento(patrimonio, limite=limite if limite and limite > 0 else None)
+        if not eventos:
+            return jsonify({
+                'sucesso': False,
+                'erro': f'Nenhum histórico encontrado para o patrimônio "{patrimonio}"'
+            }), 404
+
+        return jsonify({
+            'sucesso': True,
+            'patrimonio': patrimonio,
+            'total': len(eventos),
+            'historico': eventos
+        })
+
+    except Exception as e:
+        return jsonify({
+            'sucesso': False,
+            'erro': f'Erro ao buscar histórico: {str(e)}'
+        }), 500
+
+@api_bp.route('/equipamentos/inventario', methods=['GET'])
+def inventario_na_data():
+    """
+    Inventário como estava em uma data (fim do dia) ou momento
+    Ex: GET /api/equipamentos/inventario?data=2026-01-31&centro_custo=A2WORKS
+        GET /api/equipamentos/inventario?data=2026-01-31T18:00&formato=csv
+    """
+    try:
+        try:
+            momento = interpretar_momento(request.args.get('data', ''))
+        except ValueError:
+            return jsonify({
+                'sucesso': False,
+                'erro': "Parâmetro 'data' obrigatório (AAAA-MM-DD ou AAAA-MM-DDTHH:MM)"
+            }), 400
+
+        filtros = {
+            campo: request.args.get(campo, '').strip()
+            for campo in CAMPOS_FILTRO
+            if request.args.get(campo, '').strip()
+        }
+        try:
+            colunas, blocos = inventario_em(momento, filtros)
+        except ValueError as e:
+            return jsonify({'sucesso': False, 'erro': str(e)}), 400
+
+        if request.args.get('formato', '').lower() == 'csv':
+            primeiro_bloco = next(blocos, [])
+            filename = f'inventario_{momento[:10].replace("-", "")}.csv'
+            return _resposta_csv(colunas, primeiro_bloco, blocos, filename)
+
+        equipamentos = [dict(zip(colunas, linha)) for bloco in blocos for linha in bloco]
+        return jsonify({
+            'sucesso': True,
+            'data': momento,
+            'total': len(equipamentos),
+            'equipamentos': equipamentos
+        })
+
+    except Exception as e:
+        return jsonify({
+            'sucesso': False,
+            'erro': f'Erro ao montar inventário: {str(e)}'
+        }), 500
+
 # ============================================================================
 # ROTAS DE RELATÓRIOS E DASHBOARD
 # ============================================================================
@@ -721,106 +1221,53 @@ def relatorio_centro_custo(centro_custo):
     Ex: GET /api/centros-custo/A2WORKS/relatorio
     """
     try:
-        # Verifica se o centro de custo existe
-        resumo = obter_resumo_centro_custo(centro_custo)
+        relatorio = obter_relatorio_centro_custo(centro_custo)
         
-        if not resumo:
+        if not relatorio:
             return jsonify({
                 'sucesso': False,
                 'erro': f'Centro de custo "{centro_custo}" não encontrado'
             }), 404
         
-        total_equipamentos = resumo['total_equipamentos']
-        info_geral = resumo['info_geral']
-        
-        # Obtém equipamentos valiosos
-        equipamentos_valiosos = obter_equipamentos_mais_valiosos_centro_custo(centro_custo, 10)
-        
-        # Obtém equipamentos recentes
-        equipamentos_recentes = obter_equipamentos_recentes_centro_custo(centro_custo, 10)
+        return jsonify({
+            'sucesso': True,
+            'relatorio': relatorio
+        })
         
-        # Obtém distribuição por mês (últimos 12 meses)
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT 
-                    strftime('%Y-%m', data_recebimento) as mes,
-                    COUNT(*) as quantidade,
-                    SUM(CASE WHEN valor_locacao IS NOT NULL THEN valor_locacao ELSE 0 END) as valor_total
-                FROM equipamentos
-                WHERE centro_custo = ?
-                AND data_recebimento IS NOT NULL
-                AND data_recebimento >= date('now', '-12 months')
-                GROUP BY strftime('%Y-%m', data_recebimento)
-                ORDER BY mes DESC
-            """, (centro_custo,))
-            
-            evolucao_mensal = cursor.fetchall()
+    except Exception as e:
+        return jsonify({
+            'sucesso': False,
+            'erro': f'Erro ao gerar relatório: {str(e)}'
+        }), 500
+
+@api_bp.route('/dashboard', methods=['GET'])
+def dashboard_geral():
+    """
+    Cards e séries do dashboard inicial, agregados no banco
+    Ex: GET /api/dashboard
+    """
+    try:
+        resumo = obter_resumo_dashboard()
         
         return jsonify({
             'sucesso': True,
-            'relatorio': {
-                'centro_custo': centro_custo,
-                'data_geracao': datetime.now().isoformat(),
-                'resumo_geral': {
-                    'total_equipamentos': total_equipamentos,
-                    'tipos_diferentes': info_geral[0],
-                    'usuarios_diferentes': info_geral[1],
-                    'setores_diferentes': info_geral[2],
-                    'investimento_total': float(info_geral[5]) if info_geral[5] else 0,
-                    'valor_medio': float(info_geral[6]) if info_geral[6] else 0,
-                    'periodo': f"{info_geral[3]} a {info_geral[4]}" if info_geral[3] and info_geral[4] else "N/A"
+            'dashboard': {
+                'cards': {
+                    'total': resumo['total'],
+                    'em_uso': resumo['em_uso'],
+                    'devolvidos': resumo['devolvidos'],
+                    'notebooks': resumo['notebooks']
                 },
-                'distribuicao_status': [
-                    {
-                        'status': row[0],
-                        'quantidade': row[1],
-                        'percentual': round((row[1] / total_equipamentos * 100), 1) if total_equipamentos > 0 else 0,
-                        'valor_total': float(row[2]) if row[2] else 0
-                    } for row in resumo['distribuicao_status']
-                ],
-                'distribuicao_tipo': [
-                    {
-                        'tipo': row[0],
-                        'quantidade': row[1],
-                        'percentual': round((row[1] / total_equipamentos * 100), 1) if total_equipamentos > 0 else 0,
-                        'valor_total': float(row[2]) if row[2] else 0,
-                        'valor_medio': float(row[3]) if row[3] else 0
-                    } for row in resumo['distribuicao_tipo']
-                ],
-                'equipamentos_mais_valiosos': [
-                    {
-                        'patrimonio': row[0],
-                        'tipo': row[1],
-                        'descritivo': row[2],
-                        'valor_locacao': float(row[5]) if row[5] else 0,
-                        'usuario': row[3],
-                        'status': row[6]
-                    } for row in equipamentos_valiosos
-                ],
-                'equipamentos_recentes': [
-                    {
-                        'patrimonio': row[0],
-                        'tipo': row[1],
-                        'descritivo': row[2],
-                        'data_recebimento': row[4],
-                        'usuario': row[3]
-                    } for row in equipamentos_recentes
-                ],
-                'evolucao_mensal': [
-                    {
-                        'mes': row[0],
-                        'quantidade': row[1],
-                        'valor_total': float(row[2]) if row[2] else 0
-                    } for row in evolucao_mensal
-                ]
+                'por_tipo': [{'tipo': tipo, 'total': total} for tipo, total in resumo['por_tipo']],
+                'por_status': [{'status': status, 'total': total} for status, total in resumo['por_status']],
+                'por_local': [{'local_atual': local, 'total': total} for local, total in resumo['por_local']]
             }
         })
         
     except Exception as e:
         return jsonify({
             'sucesso': False,
-            'erro': f'Erro ao gerar relatório: {str(e)}'
+            'erro': f'Erro ao gerar dashboard: {str(e)}'
         }), 500
 
 @api_bp.route('/dashboard/centros-custo', methods=['GET'])
@@ -830,7 +1277,7 @@ def dashboard_centros_custo():
     Ex: GET /api/dashboard/centros-custo
     """
     try:
-        centros = listar_centros_custo()
+        centros = consultar_centros_custo()
         
         # Calcula totais
         total_centros = len(centros)
@@ -849,20 +1296,7 @@ def dashboard_centros_custo():
         ]
         
         # Distribuição por status (consolidado)
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT 
-                    status,
-                    COUNT(*) as total,
-                    SUM(CASE WHEN valor_locacao IS NOT NULL THEN valor_locacao ELSE 0 END) as valor_total
-                FROM equipamentos
-                WHERE centro_custo IS NOT NULL AND centro_custo != ''
-                GROUP BY status
-                ORDER BY total DESC
-            """)
-            
-            distribuicao_status = cursor.fetchall()
+        distribuicao_status = obter_distribuicao_status_centros_custo()
         
         return jsonify({
             'sucesso': True,
@@ -923,4 +1357,40 @@ def health_check():
             'mensagem': 'Erro na API',
             'erro': str(e),
             'timestamp': datetime.now().isoformat()
-        }), 500
\ No newline at end of file
+        }), 500
+
+@api_bp.route('/metrics', methods=['GET'])
+def exportar_metricas():
+    """
+    Métricas de latência por rota e de SQL por requisição (formato Prometheus)
+    Ex: GET /api/metrics
+    """
+    return Response(exportar_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@api_bp.route('/consultas-lentas', methods=['GET'])
+def consultas_lentas():
+    """
+    Piores formatos de consulta do log de consultas lentas
+    Ex: GET /api/consultas-lentas?top=10&ordenar=max
+    """
+    try:
+        top = int(request.args.get('top', 20))
+        ordenar = request.args.get('ordenar', 'total')
+        if ordenar not in ('total', 'max', 'ocorrencias'):
+            return jsonify({'sucesso': False, 'erro': "ordenar deve ser 'total', 'max' ou 'ocorrencias'"}), 400
+        
+        # O mesmo arquivo em que o app grava (init_app do consultas_lentas)
+        arquivo = current_app.config.get('CONSULTAS_LENTAS_LOG', LOG_CONSULTAS_LENTAS)
+        consultas = resumir_consultas_lentas(arquivo, top=top, ordenar=ordenar)
+        
+        return jsonify({
+            'sucesso': True,
+            'consultas': consultas,
+            'total': len(consultas)
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'sucesso': False,
+            'erro': f'Erro ao ler o log de consultas lentas: {str(e)}'
+        }), 500
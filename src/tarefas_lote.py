@@ -0,0 +1,301 @@
+# src/tarefas_lote.py - Cargas em lote em segundo plano
+#
+# O upload é gravado em disco (LOTES_DIR) e processado por uma thread de
+# trabalho, lendo o CSV linha a linha. O cliente recebe o id da tarefa e
+# acompanha o andamento (linhas lidas, gravadas, erros) até a conclusão;
+# os erros ficam disponíveis como CSV para download.
+#
+# O estado de cada tarefa fica em memória no processo que recebeu o upload
+# e é espelhado em LOTES_DIR/<id>.json, para que o status possa ser
+# consultado em qualquer processo do servidor (vários workers).
+#
+# Cada processo tem sua própria thread de cargas. Com vários workers, a
+# trava LOTES_DIR/.fila.trava faz as cargas de todos rodarem uma de cada vez:
+# as demais continuam "na_fila" até a anterior terminar.
+import csv
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from lote import processar_lote
+
+try:
+    import fcntl  # trava entre processos (Linux/macOS)
+except ImportError:
+    fcntl = None
+
+LOTES_DIR = os.path.abspath(os.environ.get(
+    'LOTES_DIR',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'lotes')
+))
+TAMANHO_BLOCO_TAREFA = 10000
+MAX_TAREFAS = 50  # tarefas concluídas mantidas (com seus arquivos)
+ERROS_NO_STATUS = 50  # amostra de erros devolvida no status
+
+# Uma única thread: o SQLite aceita um escritor por vez, então as cargas
+# são enfileiradas em vez de disputarem o lock do banco (entre processos,
+# ver _vez_na_fila)
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lote')
+_tarefas: Dict[str, 'TarefaLote'] = {}
+_lock = threading.Lock()
+_ID_VALIDO = re.compile(r'[0-9a-f]{32}')
+
+class TarefaLote:
+    """Estado de uma carga em segundo plano"""
+
+    def __init__(self, acao: str, nome_arquivo: str, tudo_ou_nada: bool, tamanho_bloco: int):
+        self.id = uuid.uuid4().hex
+        self.acao = acao
+        self.nome_arquivo = nome_arquivo
+        self.tudo_ou_nada = tudo_ou_nada
+        self.tamanho_bloco = tamanho_bloco
+        self.caminho = os.path.join(LOTES_DIR, f'{self.id}.csv')
+        self.caminho_erros = os.path.join(LOTES_DIR, f'{self.id}-erros.csv')
+        self.status = 'na_fila'
+        self.criada_em = time.time()
+        self.iniciada_em: Optional[float] = None
+        self.concluida_em: Optional[float] = None
+        self.tamanho_bytes = 0
+        self.bytes_lidos = 0
+        self.linhas_lidas = 0
+        self.sucesso = 0
+        self.total_erros = 0
+        self.erros: List[str] = []
+        self.transacoes = 0
+        self.revertido = False
+        self.mensagem: Optional[str] = None
+
+    @property
+    def caminho_estado(self) -> str:
+        return os.path.join(LOTES_DIR, f'{self.id}.json')
+
+    @property
+    def concluida(self) -> bool:
+        return self.status in ('concluida', 'falhou')
+
+    def para_dict(self) -> Dict[str, Any]:
+        fim = self.concluida_em or time.time()
+        return {
+            'id': self.id,
+            'acao': self.acao,
+            'arquivo': self.nome_arquivo,
+            'status': self.status,
+            'tudo_ou_nada': self.tudo_ou_nada,
+            'percentual': round(100 * self.bytes_lidos / self.tamanho_bytes, 1) if self.tamanho_bytes else 0,
+            'linhas_lidas': self.linhas_lidas,
+            'sucesso': self.sucesso,
+            'total_erros': self.total_erros,
+            'erros': self.erros[:ERROS_NO_STATUS],
+            'transacoes': self.transacoes,
+            'revertido': self.revertido,
+            'mensagem': self.mensagem,
+            'criada_em': self.criada_em,
+            'duracao_segundos': round(fim - self.iniciada_em, 3) if self.iniciada_em else None,
+            'relatorio_erros': self.concluida and self.total_erros > 0,
+        }
+
+def _salvar_estado(tarefa: TarefaLote) -> None:
+    """Espelha o estado em disco (escrita atômica: grava e renomeia)"""
+    temporario = f'{tarefa.caminho_estado}.{os.getpid()}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(vars(tarefa), f)
+    os.replace(temporario, tarefa.caminho_estado)
+
+def _carregar_estado(tarefa_id: str) -> Optional[TarefaLote]:
+    """Tarefa de outro processo, lida do espelho em disco"""
+    try:
+        with open(os.path.join(LOTES_DIR, f'{tarefa_id}.json'), encoding='utf-8') as f:
+            estado = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    tarefa = TarefaLote.__new__(TarefaLote)
+    tarefa.__dict__.update(estado)
+    return tarefa
+
+def _ler_csv(tarefa: TarefaLote) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Lê o CSV gravado em disco linha a linha, atualizando o andamento"""
+    with open(tarefa.caminho, encoding='utf-8-sig', newline='') as arquivo:
+        for linha_num, linha in enumerate(csv.DictReader(arquivo), start=2):
+            tarefa.linhas_lidas += 1
+            if tarefa.linhas_lidas % 1000 == 0:
+                tarefa.bytes_lidos = arquivo.buffer.tell()
+                _salvar_estado(tarefa)
+            yield linha_num, linha
+    tarefa.bytes_lidos = tarefa.tamanho_bytes
+
+@contextmanager
+def _vez_na_fila() -> Iterator[None]:
+    """
+    Espera a carga de outro processo terminar. Sem fcntl (Windows) não há
+    trava, mas lá o app roda em um processo só
+    """
+    os.makedirs(LOTES_DIR, exist_ok=True)
+    with open(os.path.join(LOTES_DIR, '.fila.trava'), 'w') as trava:
+        if fcntl is not None:
+            fcntl.flock(trava, fcntl.LOCK_EX)  # liberada ao fechar o arquivo
+        yield
+
+def _executar(tarefa: TarefaLote) -> None:
+    with _vez_na_fila():
+        _processar(tarefa)
+
+def _processar(tarefa: TarefaLote) -> None:
+    tarefa.status = 'processando'
+    tarefa.iniciada_em = time.time()
+    _salvar_estado(tarefa)
+
+    def progresso(sucesso: int, erros: int) -> None:
+        tarefa.sucesso = sucesso
+        tarefa.total_erros = erros
+        _salvar_estado(tarefa)
+
+    try:
+        resultado = processar_lote(
+            tarefa.acao,
+            _ler_csv(tarefa),
+            tamanho_bloco=tarefa.tamanho_bloco,
+            tudo_ou_nada=tarefa.tudo_ou_nada,
+            progresso=progresso,
+            detalhes=False
+        )
+        tarefa.sucesso = resultado['sucesso']
+        tarefa.total_erros = len(resultado['erros'])
+        tarefa.erros = resultado['erros'][:ERROS_NO_STATUS]
+        tarefa.transacoes = resultado['transacoes']
+        tarefa.revertido = resultado['revertido']
+        if resultado['erros']:
+            _gravar_relatorio_erros(tarefa, resultado['erros'])
+        if tarefa.revertido:
+            tarefa.mensagem = (f"{tarefa.acao.capitalize()} cancelado: {tarefa.total_erros} erro(s), "
+                               f"nenhuma alteração gravada")
+        else:
+            tarefa.mensagem = f"{tarefa.acao.capitalize()} concluído: {tarefa.sucesso} operações bem-sucedidas"
+        tarefa.status = 'concluida'
+    except UnicodeDecodeError:
+        tarefa.status = 'falhou'
+        tarefa.mensagem = f"Erro ao ler arquivo CSV (linha {tarefa.linhas_lidas + 2}). Use codificação UTF-8"
+    except Exception as e:
+        tarefa.status = 'falhou'
+        tarefa.mensagem = f"Erro ao processar: {str(e)}"
+    finally:
+        tarefa.concluida_em = time.time()
+        _remover_arquivo(tarefa.caminho)
+        _salvar_estado(tarefa)
+
+def _gravar_relatorio_erros(tarefa: TarefaLote, erros: List[str]) -> None:
+    with open(tarefa.caminho_erros, 'w', encoding='utf-8-sig', newline='') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(['erro'])
+        for mensagem in erros:
+            escritor.writerow([mensagem])
+
+def _remover_arquivo(caminho: str) -> None:
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+def _descartar_antigas() -> None:
+    """Mantém só as MAX_TAREFAS concluídas mais recentes (chamado com _lock)"""
+    concluidas = sorted((t for t in _tarefas.values() if t.concluida), key=lambda t: t.criada_em)
+    for tarefa in concluidas[:max(0, len(concluidas) - MAX_TAREFAS)]:
+        _remover_arquivo(tarefa.caminho_erros)
+        _remover_arquivo(tarefa.caminho_estado)
+        del _tarefas[tarefa.id]
+
+def recuperar_tarefas() -> Dict[str, int]:
+    """
+    Na inicialização do servidor, antes de qualquer carga: as tarefas que
+    ficaram na fila ou em processamento quando o processo anterior parou
+    passam a falhou (e o CSV delas é apagado), e só os arquivos das
+    MAX_TAREFAS mais recentes (por criada_em) ficam em LOTES_DIR
+    """
+    resultado = {'interrompidas': 0, 'removidas': 0}
+    if not os.path.isdir(LOTES_DIR):
+        return resultado
+
+    tarefas = []
+    for nome in os.listdir(LOTES_DIR):
+        tarefa_id = nome[:-len('.json')]
+        if not nome.endswith('.json') or not _ID_VALIDO.fullmatch(tarefa_id):
+            continue
+        tarefa = _carregar_estado(tarefa_id)
+        if tarefa is None:
+            continue
+        if not tarefa.concluida:
+            tarefa.status = 'falhou'
+            tarefa.mensagem = "Carga interrompida: o servidor parou antes da conclusão"
+            tarefa.concluida_em = time.time()
+            _salvar_estado(tarefa)
+            resultado['interrompidas'] += 1
+        tarefas.append(tarefa)
+
+    tarefas.sort(key=lambda t: t.criada_em, reverse=True)
+    mantidas = {tarefa.id for tarefa in tarefas[:MAX_TAREFAS]}
+    resultado['removidas'] = len(tarefas) - len(mantidas)
+    for nome in os.listdir(LOTES_DIR):
+        tarefa_id = nome[:32]
+        if not _ID_VALIDO.fullmatch(tarefa_id):
+            continue
+        # Nenhuma carga roda agora: uploads (<id>.csv) e estados pela metade
+        # (.tmp) são sobras, mesmo de tarefas mantidas
+        sobra = nome == f'{tarefa_id}.csv' or nome.endswith('.tmp')
+        if tarefa_id not in mantidas or sobra:
+            _remover_arquivo(os.path.join(LOTES_DIR, nome))
+    return resultado
+
+def ler_cabecalho(caminho: str) -> List[str]:
+    with open(caminho, encoding='utf-8-sig', newline='') as arquivo:
+        return next(csv.reader(arquivo), [])
+
+def criar_tarefa(arquivo, acao: str, tudo_ou_nada: bool = False,
+                 tamanho_bloco: int = TAMANHO_BLOCO_TAREFA) -> TarefaLote:
+    """
+    Grava o upload (FileStorage) em disco, valida o cabeçalho e enfileira
+    a carga. Lança ValueError se o CSV não tiver a coluna patrimonio.
+    """
+    os.makedirs(LOTES_DIR, exist_ok=True)
+    tarefa = TarefaLote(acao, arquivo.filename, tudo_ou_nada, tamanho_bloco)
+    arquivo.save(tarefa.caminho)
+    tarefa.tamanho_bytes = os.path.getsize(tarefa.caminho)
+
+    try:
+        cabecalho = ler_cabecalho(tarefa.caminho)
+    except UnicodeDecodeError:
+        _remover_arquivo(tarefa.caminho)
+        raise
+    if 'patrimonio' not in cabecalho:
+        _remover_arquivo(tarefa.caminho)
+        raise ValueError("Coluna 'patrimonio' obrigatória no CSV")
+
+    with _lock:
+        _descartar_antigas()
+        _tarefas[tarefa.id] = tarefa
+    _salvar_estado(tarefa)
+    _executor.submit(_executar, tarefa)
+    return tarefa
+
+def obter_tarefa(tarefa_id: str) -> Optional[TarefaLote]:
+    tarefa = _tarefas.get(tarefa_id)
+    if tarefa is None and _ID_VALIDO.fullmatch(tarefa_id):
+        tarefa = _carregar_estado(tarefa_id)
+    return tarefa
+
+def listar_tarefas() -> List[TarefaLote]:
+    """Tarefas de todos os processos (as deste, do estado em memória)"""
+    with _lock:
+        tarefas = dict(_tarefas)
+    if os.path.isdir(LOTES_DIR):
+        for nome in os.listdir(LOTES_DIR):
+            tarefa_id = nome[:-len('.json')]
+            if nome.endswith('.json') and tarefa_id not in tarefas and _ID_VALIDO.fullmatch(tarefa_id):
+                tarefa = _carregar_estado(tarefa_id)
+                if tarefa is not None:
+                    tarefas[tarefa_id] = tarefa
+    return sorted(tarefas.values(), key=lambda t: t.criada_em, reverse=True)
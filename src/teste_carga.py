@@ -0,0 +1,257 @@
+# src/teste_carga.py - Teste de carga do modo de produção (gunicorn, vários workers)
+#
+# Sobe o gunicorn (gunicorn.conf.py) sobre uma cópia da base sintética, uma
+# vez para cada número de workers, e dispara leitores e escritores em
+# processos separados durante alguns segundos. Mede a vazão e a latência das
+# leituras e confere as escritas: nenhuma resposta 5xx / "database is
+# locked", o valor final de cada equipamento é o do último PATCH confirmado
+# e o histórico tem exatamente um evento por PATCH.
+#   python src/teste_carga.py                                # data/benchmark.db, workers 1,2,4
+#   python src/teste_carga.py --workers 1,2,4,8 --duracao 20 --leitores 16 --escritores 4
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+from urllib.parse import quote, urlencode
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CONFIG_GUNICORN = os.path.join(RAIZ, 'src', 'gunicorn.conf.py')
+
+# Quantos equipamentos cada escritor altera (conjuntos disjuntos entre escritores)
+PATRIMONIOS_POR_ESCRITOR = 50
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _caminhos_leitura(conn: sqlite3.Connection) -> List[str]:
+    """Mistura de leituras da tela: páginas da pesquisa, filtros e busca textual"""
+    centros = [linha[0] for linha in conn.execute(
+        "SELECT centro_custo FROM equipamentos WHERE centro_custo != '' "
+        "GROUP BY centro_custo ORDER BY COUNT(*) DESC LIMIT 5"
+    )]
+    caminhos = []
+    for pagina in range(1, 11):
+        caminhos.append('/api/equipamentos/pesquisa?' + urlencode({'pagina': pagina}))
+        caminhos.append('/api/equipamentos/pesquisa?' + urlencode({'status': 'Em uso', 'pagina': pagina}))
+    for centro in centros:
+        caminhos.append('/api/equipamentos/pesquisa?' + urlencode({'centro_custo': centro}))
+        caminhos.append(f'/api/centros-custo/{quote(centro, safe="")}/equipamentos')
+    caminhos.append('/api/equipamentos/pesquisa?' + urlencode({'q': 'notebook'}))
+    caminhos.append('/api/equipamentos/estatisticas')
+    caminhos.append('/api/dashboard')
+    return caminhos
+
+def _cliente(tipo: str, indice: int, porta: int, duracao: float,
+             caminhos: List[str], patrimonios: List[str]) -> Dict[str, Any]:
+    """
+    Um processo cliente com conexão keep-alive. Leitores percorrem `caminhos`;
+    escritores fazem PATCH de observacao em `patrimonios` com valores únicos
+    e guardam o último valor confirmado de cada um.
+    """
+    conn = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+    latencias, erros, confirmados = [], [], {}
+    n = 0
+    fim = time.monotonic() + duracao
+    while time.monotonic() < fim:
+        inicio = time.perf_counter()
+        try:
+            if tipo == 'leitura':
+                conn.request('GET', caminhos[(indice + n) % len(caminhos)])
+            else:
+                patrimonio = patrimonios[n % len(patrimonios)]
+                valor = f'carga-{indice}-{n}'
+                conn.request(
+                    'PATCH', f'/api/equipamentos/{quote(patrimonio, safe="")}',
+                    body=json.dumps({'observacao': valor}),
+                    headers={'Content-Type': 'application/json'}
+                )
+            resposta = conn.getresponse()
+            corpo = resposta.read()
+        except (OSError, http.client.HTTPException) as e:
+            erros.append(f'{type(e).__name__}: {e}')
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+            n += 1
+            continue
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if resposta.status != 200:
+            erros.append(f'{resposta.status}: {corpo[:200].decode("utf-8", "replace")}')
+        elif tipo == 'escrita':
+            confirmados[patrimonio] = valor
+        n += 1
+    conn.close()
+    return {'tipo': tipo, 'latencias': latencias, 'erros': erros,
+            'confirmados': confirmados, 'escritas_ok': len(latencias) - len(erros) if tipo == 'escrita' else 0}
+
+def _aguardar_servidor(processo: subprocess.Popen, porta: int, limite: float = 60) -> None:
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if processo.poll() is not None:
+            raise RuntimeError(f"gunicorn terminou com código {processo.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', porta, timeout=2)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("gunicorn não respondeu a tempo")
+
+def _verificar(banco: str, ultimo_historico: int, resultados: List[Dict[str, Any]]) -> List[str]:
+    """Confere no banco o efeito das escritas confirmadas"""
+    problemas = []
+    confirmados = {}
+    for resultado in resultados:
+        confirmados.update(resultado['confirmados'])
+    escritas_ok = sum(r['escritas_ok'] for r in resultados)
+
+    conn = sqlite3.connect(banco)
+    try:
+        for patrimonio, valor in confirmados.items():
+            atual = conn.execute(
+                "SELECT observacao FROM equipamentos WHERE patrimonio = ?", (patrimonio,)
+            ).fetchone()
+            if atual is None or atual[0] != valor:
+                problemas.append(f"{patrimonio}: esperado {valor!r}, no banco {atual and atual[0]!r}")
+        eventos = conn.execute(
+            "SELECT COUNT(*) FROM historico_equipamentos WHERE id > ? AND operacao = 'U'",
+            (ultimo_historico,)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    if eventos != escritas_ok:
+        problemas.append(f"histórico com {eventos} evento(s) para {escritas_ok} PATCH confirmados")
+    return problemas
+
+def rodada(base: str, pasta: str, workers: int, threads: int, leitores: int,
+           escritores: int, duracao: float) -> Dict[str, Any]:
+    """Uma execução completa com `workers` processos no gunicorn"""
+    banco = os.path.join(pasta, f'carga-{workers}.db')
+    # API de backup: copia também o que estiver só no -wal da base
+    origem, destino = sqlite3.connect(base), sqlite3.connect(banco)
+    origem.backup(destino)
+    origem.close()
+    destino.close()
+
+    conn = sqlite3.connect(banco)
+    caminhos = _caminhos_leitura(conn)
+    patrimonios = [linha[0] for linha in conn.execute(
+        "SELECT patrimonio FROM equipamentos ORDER BY id LIMIT ?",
+        (max(1, escritores) * PATRIMONIOS_POR_ESCRITOR,)
+    )]
+    conn.close()
+
+    porta = _porta_livre()
+    ambiente = dict(
+        os.environ,
+        EQUIPAMENTOS_DB_PATH=banco,
+        LOTES_DIR=os.path.join(pasta, f'lotes-{workers}'),
+        BACKUP_DIR=os.path.join(pasta, f'backups-{workers}'),
+        WEB_BIND=f'127.0.0.1:{porta}',
+        WEB_WORKERS=str(workers),
+        WEB_THREADS=str(threads),
+    )
+    ambiente.pop('WEB_ACCESSLOG', None)
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', CONFIG_GUNICORN],
+        env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    try:
+        _aguardar_servidor(processo, porta)
+        # Migrações já aplicadas pelo mestre: o histórico existe a partir daqui
+        conn = sqlite3.connect(banco)
+        ultimo_historico = conn.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM historico_equipamentos"
+        ).fetchone()[0]
+        conn.close()
+
+        tarefas = [('leitura', i, porta, duracao, caminhos, []) for i in range(leitores)]
+        tarefas += [
+            ('escrita', i, porta, duracao, caminhos,
+             patrimonios[i * PATRIMONIOS_POR_ESCRITOR:(i + 1) * PATRIMONIOS_POR_ESCRITOR])
+            for i in range(escritores)
+        ]
+        with multiprocessing.get_context('spawn').Pool(len(tarefas)) as pool:
+            resultados = pool.starmap(_cliente, tarefas)
+    finally:
+        processo.terminate()
+        try:
+            _, saida_erro = processo.communicate(timeout=30)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+            _, saida_erro = processo.communicate()
+
+    leituras = [l for r in resultados if r['tipo'] == 'leitura' for l in r['latencias']]
+    escritas = [l for r in resultados if r['tipo'] == 'escrita' for l in r['latencias']]
+    erros = [e for r in resultados for e in r['erros']]
+    problemas = _verificar(banco, ultimo_historico, resultados)
+    travado = 'database is locked' in (saida_erro or '')
+
+    def _percentil(valores: List[float], p: float) -> float:
+        if len(valores) < 2:
+            return valores[0] if valores else 0.0
+        return statistics.quantiles(valores, n=100)[int(p) - 1]
+
+    return {
+        'workers': workers,
+        'leituras_por_s': len(leituras) / duracao,
+        'leitura_p50_ms': _percentil(leituras, 50),
+        'leitura_p95_ms': _percentil(leituras, 95),
+        'escritas_por_s': len(escritas) / duracao,
+        'escrita_p95_ms': _percentil(escritas, 95),
+        'erros': erros + (['"database is locked" no log do gunicorn'] if travado else []),
+        'problemas': problemas,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Teste de carga do gunicorn com vários workers')
+    parser.add_argument('--banco', default=os.path.join(RAIZ, 'data', 'benchmark.db'),
+                        help='Base sintética copiada a cada rodada (padrão: data/benchmark.db)')
+    parser.add_argument('--linhas', type=int, default=100000, help='Tamanho da base, se precisar gerá-la')
+    parser.add_argument('--workers', default='1,2,4', help='Números de workers a comparar (ex.: 1,2,4)')
+    parser.add_argument('--threads', type=int, default=4, help='Threads por worker')
+    parser.add_argument('--leitores', type=int, default=8, help='Processos cliente só de leitura')
+    parser.add_argument('--escritores', type=int, default=2, help='Processos cliente fazendo PATCH')
+    parser.add_argument('--duracao', type=float, default=15, help='Segundos de carga por rodada')
+    args = parser.parse_args()
+
+    banco = os.path.abspath(args.banco)
+    if not os.path.exists(banco):
+        sys.path.insert(0, os.path.join(RAIZ, 'src'))
+        from gerar_dados import popular_banco
+        popular_banco(banco, args.linhas)
+
+    print(f"Base: {banco} | núcleos: {os.cpu_count()} | {args.leitores} leitor(es), "
+          f"{args.escritores} escritor(es), {args.duracao:.0f} s por rodada")
+    print(f"{'workers':>8} {'leituras/s':>11} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'escritas/s':>11} {'p95 ms':>8} {'erros':>6}  verificação")
+
+    falhou = False
+    with tempfile.TemporaryDirectory(prefix='carga-') as pasta:
+        for workers in [int(n) for n in args.workers.split(',') if n.strip()]:
+            r = rodada(banco, pasta, workers, args.threads, args.leitores,
+                       args.escritores, args.duracao)
+            ok = not r['erros'] and not r['problemas']
+            falhou = falhou or not ok
+            print(f"{r['workers']:>8} {r['leituras_por_s']:>11.1f} {r['leitura_p50_ms']:>8.1f} "
+                  f"{r['leitura_p95_ms']:>8.1f} {r['escritas_por_s']:>11.1f} "
+                  f"{r['escrita_p95_ms']:>8.1f} {len(r['erros']):>6}  {'ok' if ok else 'FALHOU'}")
+            for mensagem in (r['erros'] + r['problemas'])[:5]:
+                print(f"         - {mensagem}")
+    sys.exit(1 if falhou else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+# src/wsgi.py - Ponto de entrada WSGI para produção (vários processos)
+#   gunicorn -c src/gunicorn.conf.py
+from app import create_app
+
+app = create_app()
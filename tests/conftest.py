@@ -0,0 +1,85 @@
+# tests/conftest.py - Banco temporário e migrado para cada teste
+#   python -m pytest
+#
+# EQUIPAMENTOS_DB_PATH (e as pastas de trabalho) apontam para uma pasta
+# temporária antes de qualquer import de src/: o database lê o caminho
+# na importação.
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+PASTA_TESTES = tempfile.mkdtemp(prefix='equipamentos-testes-')
+os.environ['EQUIPAMENTOS_DB_PATH'] = os.path.join(PASTA_TESTES, 'equipamentos.db')
+os.environ['LOTES_DIR'] = os.path.join(PASTA_TESTES, 'lotes')
+os.environ['CONSULTAS_LENTAS_LOG'] = os.path.join(PASTA_TESTES, 'consultas_lentas.log')
+os.environ['BACKUP_DIR'] = os.path.join(PASTA_TESTES, 'backups')
+for variavel in ('EQUIPAMENTOS_BANCO_PREPARADO', 'EQUIPAMENTOS_MULTIPROCESSO', 'METRICAS_DIR',
+                 'SQLITE_CONSULTA_LENTA_MS', 'BACKUP_INTERVALO_MIN'):
+    os.environ.pop(variavel, None)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import database  # noqa: E402
+import facetas  # noqa: E402
+import relatorio_pdf  # noqa: E402
+import relatorios  # noqa: E402
+import tarefas_lote  # noqa: E402
+from migrations import migrar  # noqa: E402
+
+COLUNAS_PADRAO = {
+    'tipo': 'Notebook',
+    'centro_custo': 'TI',
+    'local_atual': 'Matriz',
+    'status': 'Em uso',
+    'valor_locacao': 100.0,
+}
+
+def pytest_sessionfinish(session, exitstatus):
+    database.fechar_conexoes()
+    shutil.rmtree(PASTA_TESTES, ignore_errors=True)
+
+@pytest.fixture
+def conn():
+    """Conexão com um banco novo, já migrado; caches em memória zerados"""
+    database.fechar_conexoes()
+    for sufixo in ('', '-wal', '-shm'):
+        caminho = database.DB_PATH + sufixo
+        if os.path.exists(caminho):
+            os.remove(caminho)
+    # A versão dos dados recomeça a cada banco novo: sem limpar, os caches
+    # devolveriam valores do teste anterior
+    for cache in (facetas._cache_facetas, relatorios._cache_relatorios, relatorio_pdf._cache_pdfs):
+        cache.limpar()
+    shutil.rmtree(os.environ['LOTES_DIR'], ignore_errors=True)
+    tarefas_lote._tarefas.clear()
+
+    conexao = database.criar_conexao()
+    migrar(conexao)
+    yield conexao
+    conexao.close()
+    database.fechar_conexoes()
+    # A thread das cargas em segundo plano guarda a própria conexão, que
+    # continuaria apontando para o banco apagado
+    tarefas_lote._executor.submit(database.fechar_conexoes).result()
+
+@pytest.fixture
+def inserir(conn):
+    """inserir(patrimonio, **colunas) -> id, com valores padrão nas demais colunas"""
+    def _inserir(patrimonio: str, **colunas) -> int:
+        valores = {**COLUNAS_PADRAO, 'patrimonio': patrimonio, **colunas}
+        with conn:
+            cursor = conn.execute(
+                f"INSERT INTO equipamentos ({', '.join(valores)}) VALUES ({', '.join('?' * len(valores))})",
+                list(valores.values())
+            )
+        return cursor.lastrowid
+    return _inserir
+
+@pytest.fixture
+def cliente(conn):
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    return app.test_client()
@@ -0,0 +1,72 @@
+# tests/test_busca.py - Termo geral "q": FTS5 por palavra e trecho de identificadores
+import pytest
+
+import database
+import migrations
+import models
+
+@pytest.fixture
+def base(inserir):
+    return {
+        'ark': inserir('ARK436794', numero_serie='PE0DBP5B', descritivo='Notebook Lenovo ThinkPad'),
+        'loc': inserir('LOC400002', numero_serie='JB00000002', descritivo='Monitor Dell 24'),
+        'dsk': inserir('DSK400003', numero_serie='XQ7H2LM9', descritivo='Desktop HP ProDesk'),
+    }
+
+def _ids(q, **kwargs):
+    linhas, total = models.buscar_equipamentos_avancado({'q': q}, **kwargs)
+    assert total == len(linhas)
+    return {linha['id'] for linha in linhas}
+
+@pytest.mark.parametrize('termo', ['436794', 'K4367', 'DBP5B', 'dbp5b', '0DBP', '94'])
+def test_trecho_de_patrimonio_e_serie(base, termo):
+    assert _ids(termo) == {base['ark']}
+
+def test_trecho_tambem_na_ordenacao_por_relevancia(base):
+    assert _ids('436794', ordenar_por='relevancia') == {base['ark']}
+
+def test_relevancia_traz_primeiro_as_linhas_do_fts(base, inserir):
+    # "lenovo" casa o descritivo de um e o trecho do serial do outro
+    serial = inserir('ZZZ000001', numero_serie='XLENOVO9', descritivo='Cabo')
+    linhas, _ = models.buscar_equipamentos_avancado({'q': 'lenovo'}, ordenar_por='relevancia')
+    assert [linha['id'] for linha in linhas] == [base['ark'], serial]
+
+def test_prefixo_de_palavra_continua_pelo_fts(base):
+    assert _ids('lenov') == {base['ark']}
+    assert _ids('notebook think') == {base['ark']}
+    assert _ids('dell') == {base['loc']}
+
+def test_indice_de_trechos_acompanha_alteracoes(conn, base):
+    with conn:
+        conn.execute("UPDATE equipamentos SET numero_serie = 'NOVO12345' WHERE id = ?", (base['dsk'],))
+    assert _ids('O1234') == {base['dsk']}
+    assert _ids('XQ7H2') == set()
+
+    with conn:
+        conn.execute("DELETE FROM equipamentos WHERE id = ?", (base['dsk'],))
+    assert _ids('O1234') == set()
+
+def test_trecho_sem_indice_trigram_usa_like(base, monkeypatch):
+    monkeypatch.setattr(models, 'identificadores_ativo', lambda conn: False)
+    assert _ids('436794') == {base['ark']}
+    assert _ids('DBP5B') == {base['ark']}
+
+def test_migracao_sem_fts5_nao_fica_registrada(conn, tmp_path, monkeypatch):
+    caminho = str(tmp_path / 'sem_fts.db')
+    monkeypatch.setattr(migrations, 'MIGRACOES', [
+        (versao, descricao, (lambda c: False) if versao == 2 else passo)
+        for versao, descricao, passo in migrations.MIGRACOES
+    ])
+    novo = database.criar_conexao(caminho)
+    try:
+        aplicadas = migrations.migrar(novo)
+        assert 2 not in aplicadas
+        assert 2 not in migrations.versoes_aplicadas(novo)
+        assert 3 in migrations.versoes_aplicadas(novo)
+
+        # Na inicialização seguinte, com FTS5 disponível, a versão 2 é aplicada
+        monkeypatch.undo()
+        assert migrations.migrar(novo) == [2]
+        assert novo.execute("SELECT 1 FROM sqlite_master WHERE name = 'equipamentos_fts'").fetchone()
+    finally:
+        novo.close()
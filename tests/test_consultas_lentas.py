@@ -0,0 +1,31 @@
+# tests/test_consultas_lentas.py - Leitura e limpeza do log de consultas lentas
+import json
+import sys
+
+import consultas_lentas
+
+def _gravar(caminho, *duracoes):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        for duracao in duracoes:
+            f.write(json.dumps({'sql': 'SELECT * FROM equipamentos WHERE id = ?', 'duracao_ms': duracao}) + '\n')
+
+def test_rota_le_o_log_configurado_no_app(cliente, tmp_path):
+    arquivo = tmp_path / 'lentas.log'
+    _gravar(arquivo, 30.0)
+    _gravar(str(arquivo) + '.1', 10.0, 20.0)
+    cliente.application.config['CONSULTAS_LENTAS_LOG'] = str(arquivo)
+
+    dados = cliente.get('/api/consultas-lentas').get_json()
+
+    assert dados['sucesso']
+    assert [(c['ocorrencias'], c['total_ms'], c['max_ms']) for c in dados['consultas']] == [(3, 60.0, 30.0)]
+
+def test_limpar_remove_so_o_log_e_as_rotacoes(tmp_path, monkeypatch):
+    arquivo = tmp_path / 'lentas.log'
+    for nome in ('lentas.log', 'lentas.log.1', 'lentas.log.2', 'lentas.log.bak', 'lentas.log_antigo'):
+        _gravar(tmp_path / nome, 1.0)
+
+    monkeypatch.setattr(sys, 'argv', ['consultas_lentas.py', 'limpar', '--arquivo', str(arquivo)])
+    consultas_lentas.main()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['lentas.log.bak', 'lentas.log_antigo']
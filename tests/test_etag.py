@@ -0,0 +1,54 @@
+# tests/test_etag.py - GET condicional (ETag) invalidado pela versão dos dados
+from cache import versao_dados
+
+PESQUISA = '/api/equipamentos/pesquisa?tipo=Notebook'
+
+def _usuarios(resposta):
+    return [linha['usuario'] for linha in resposta.get_json()['resultados']]
+
+def test_mesmo_etag_responde_304_sem_corpo(cliente, inserir):
+    inserir('PAT001', usuario='ana')
+    primeira = cliente.get(PESQUISA)
+    assert primeira.status_code == 200
+    assert primeira.headers['Cache-Control'] == 'no-cache'
+
+    segunda = cliente.get(PESQUISA, headers={'If-None-Match': primeira.headers['ETag']})
+    assert segunda.status_code == 304
+    assert segunda.data == b''
+    assert segunda.headers['ETag'] == primeira.headers['ETag']
+
+def test_escrita_pela_api_invalida_o_etag(cliente, conn, inserir):
+    inserir('PAT001', usuario='ana')
+    primeira = cliente.get(PESQUISA)
+    versao = versao_dados(conn)
+
+    assert cliente.patch('/api/equipamentos/PAT001', json={'usuario': 'bruno'}).status_code == 200
+    assert versao_dados(conn) > versao
+
+    segunda = cliente.get(PESQUISA, headers={'If-None-Match': primeira.headers['ETag']})
+    assert segunda.status_code == 200
+    assert segunda.headers['ETag'] != primeira.headers['ETag']
+    assert _usuarios(segunda) == ['bruno']
+
+def test_escrita_de_outra_conexao_invalida_o_etag(cliente, conn, inserir):
+    # O contador é incrementado por trigger: vale para qualquer processo
+    inserir('PAT001', usuario='ana')
+    etag = cliente.get(PESQUISA).headers['ETag']
+    with conn:
+        conn.execute("DELETE FROM equipamentos WHERE patrimonio = 'PAT001'")
+
+    resposta = cliente.get(PESQUISA, headers={'If-None-Match': etag})
+    assert resposta.status_code == 200
+    assert _usuarios(resposta) == []
+
+def test_etag_considera_os_parametros(cliente, inserir):
+    inserir('PAT001')
+    etag = cliente.get(PESQUISA).headers['ETag']
+    assert cliente.get(PESQUISA + '&_=1712345678').headers['ETag'] == etag  # anti-cache do jQuery
+    assert cliente.get(PESQUISA + '&status=Em uso').headers['ETag'] != etag
+    assert cliente.get(PESQUISA, headers={'If-None-Match': etag}).status_code == 304
+
+def test_rotas_sem_etag(cliente):
+    resposta = cliente.get('/api/health')
+    assert resposta.status_code == 200
+    assert 'ETag' not in resposta.headers
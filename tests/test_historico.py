@@ -0,0 +1,106 @@
+# tests/test_historico.py - Histórico de alterações e inventário em uma data passada
+from datetime import datetime, timedelta
+
+import pytest
+
+import historico
+
+def _momento(dias_atras, hora):
+    """Momento no formato dos eventos, `dias_atras` dias antes de hoje"""
+    dia = datetime.now().replace(hour=hora, minute=0, second=0, microsecond=0) - timedelta(days=dias_atras)
+    return historico._formatar_momento(dia)
+
+def _datar(conn, datas):
+    """Reescreve alterado_em dos eventos (na ordem de id) e recua o início do histórico"""
+    ids = [row[0] for row in conn.execute("SELECT id FROM historico_equipamentos ORDER BY id")]
+    assert len(ids) == len(datas)
+    with conn:
+        conn.executemany("UPDATE historico_equipamentos SET alterado_em = ? WHERE id = ?", zip(datas, ids))
+        conn.execute("UPDATE historico_controle SET inicio = ? WHERE id = 1", (_momento(90, 0),))
+
+def _inventario(momento, filtros=None):
+    colunas, blocos = historico.inventario_em(momento, filtros)
+    return {
+        linha['patrimonio']: linha
+        for bloco in blocos for linha in (dict(zip(colunas, valores)) for valores in bloco)
+    }
+
+@pytest.fixture
+def alterado(conn, inserir):
+    """
+    Dia 60: A, B e C cadastrados. Dia 10: A muda de usuário, B é excluído,
+    D é cadastrado e C troca de patrimônio para C2
+    """
+    inserir('A', usuario='ana')
+    inserir('B', usuario='bia')
+    inserir('C', usuario='caio')
+    with conn:
+        conn.execute("UPDATE equipamentos SET usuario = 'bruno' WHERE patrimonio = 'A'")
+        conn.execute("DELETE FROM equipamentos WHERE patrimonio = 'B'")
+    inserir('D', usuario='davi')
+    with conn:
+        conn.execute("UPDATE equipamentos SET patrimonio = 'C2' WHERE patrimonio = 'C'")
+    _datar(conn, [_momento(60, 9)] * 3 + [_momento(10, 9)] * 4)
+
+def test_inventario_passado_desfaz_alteracoes_exclusoes_e_cadastros(alterado):
+    antes = _inventario(_momento(30, 0))
+    assert sorted(antes) == ['A', 'B', 'C']
+    assert {p: linha['usuario'] for p, linha in antes.items()} == {'A': 'ana', 'B': 'bia', 'C': 'caio'}
+    # As demais colunas do excluído vêm do evento de exclusão
+    assert antes['B']['valor_locacao'] == 100.0
+
+    depois = _inventario(_momento(0, 23))
+    assert {p: linha['usuario'] for p, linha in depois.items()} == {'A': 'bruno', 'C2': 'caio', 'D': 'davi'}
+
+def test_inventario_passado_com_filtro(alterado):
+    assert sorted(_inventario(_momento(30, 0), {'usuario': 'ana'})) == ['A']
+    assert _inventario(_momento(30, 0), {'usuario': 'bruno'}) == {}
+    assert sorted(_inventario(_momento(0, 23), {'usuario': 'bruno'})) == ['A']
+
+def test_inventario_antes_do_inicio_do_historico(alterado):
+    with pytest.raises(ValueError):
+        historico.inventario_em(_momento(120, 0))
+
+def test_historico_inclui_patrimonio_anterior(alterado):
+    eventos = historico.historico_equipamento('C')
+    assert [evento['operacao'] for evento in eventos] == ['U', 'I']
+    assert eventos[0]['alteracoes'] == {'patrimonio': ['C', 'C2']}
+    assert historico.historico_equipamento('C2') == eventos
+
+def test_compactacao_une_alteracoes_do_mesmo_dia(conn, inserir):
+    inserir('A', usuario='ana', status='Em uso')
+    for sql in ("UPDATE equipamentos SET usuario = 'bruno'",
+                "UPDATE equipamentos SET status = 'Manutenção'",
+                "UPDATE equipamentos SET usuario = 'carla', status = 'Em uso'",
+                "UPDATE equipamentos SET usuario = 'davi'"):
+        with conn:
+            conn.execute(sql)
+    # Três alterações no dia 40 e uma no dia 39
+    _datar(conn, [_momento(50, 9), _momento(40, 9), _momento(40, 11), _momento(40, 15), _momento(39, 9)])
+    fim_do_dia = _momento(40, 23)
+    esperado = _inventario(fim_do_dia)
+
+    assert historico.compactar(conn, retencao_dias=730, agrupar_apos_dias=30) == {'removidos': 0, 'agrupados': 2}
+
+    eventos = historico.historico_equipamento('A')
+    assert [evento['operacao'] for evento in eventos] == ['U', 'U', 'I']
+    # O status voltou ao valor original no mesmo dia e sai do evento unido
+    assert eventos[1]['alteracoes'] == {'usuario': ['ana', 'carla']}
+    assert _inventario(fim_do_dia) == esperado
+    assert _inventario(_momento(45, 0))['A']['usuario'] == 'ana'
+    assert _inventario(_momento(0, 23))['A']['usuario'] == 'davi'
+
+    # Incremental: os dias já agrupados não são revistos
+    assert historico.compactar(conn, retencao_dias=730, agrupar_apos_dias=30) == {'removidos': 0, 'agrupados': 0}
+
+def test_compactacao_descarta_eventos_fora_da_retencao(conn, inserir):
+    inserir('A', usuario='ana')
+    with conn:
+        conn.execute("UPDATE equipamentos SET usuario = 'bruno'")
+    _datar(conn, [_momento(80, 9), _momento(5, 9)])
+
+    assert historico.compactar(conn, retencao_dias=60, agrupar_apos_dias=30)['removidos'] == 1
+    assert historico.inicio_historico(conn) == _momento(60, 0)
+    with pytest.raises(ValueError):
+        historico.inventario_em(_momento(70, 0))
+    assert _inventario(_momento(30, 0))['A']['usuario'] == 'ana'
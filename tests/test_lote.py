@@ -0,0 +1,81 @@
+# tests/test_lote.py - Motor transacional das cargas em lote
+import pytest
+
+from lote import processar_lote
+
+def _linhas(*registros):
+    """(linha_num, dados) como o csv.DictReader entrega, a partir da linha 2"""
+    return [(num, dados) for num, dados in enumerate(registros, start=2)]
+
+def _novos(*patrimonios):
+    return _linhas(*({'patrimonio': p, 'tipo': 'Notebook'} for p in patrimonios))
+
+@pytest.fixture
+def comandos(conn):
+    """Comandos SQL executados na conexão durante o teste"""
+    executados = []
+    conn.set_trace_callback(executados.append)
+    yield executados
+    conn.set_trace_callback(None)
+
+def _patrimonios(conn):
+    return [row[0] for row in conn.execute("SELECT patrimonio FROM equipamentos ORDER BY patrimonio")]
+
+def test_blocos_sem_erro_usam_o_caminho_rapido(conn, comandos):
+    resultado = processar_lote('create', _novos('A1', 'A2', 'A3', 'A4', 'A5'), tamanho_bloco=2, conn=conn)
+
+    assert resultado['sucesso'] == 5
+    assert resultado['erros'] == []
+    assert resultado['transacoes'] == 3
+    assert _patrimonios(conn) == ['A1', 'A2', 'A3', 'A4', 'A5']
+    assert not any('SAVEPOINT' in sql for sql in comandos)
+
+def test_bloco_com_erro_refeito_linha_a_linha(conn, inserir, comandos):
+    inserir('A2')
+    resultado = processar_lote('create', _novos('A1', 'A2', 'A3', 'A4'), tamanho_bloco=3, conn=conn)
+
+    # Só a linha repetida fica de fora; as outras do mesmo bloco são gravadas
+    assert resultado['sucesso'] == 3
+    assert len(resultado['erros']) == 1
+    assert resultado['erros'][0].startswith('Linha 3 (A2):')
+    assert resultado['detalhes'] == ['Criado: A1', 'Criado: A3', 'Criado: A4']
+    assert resultado['transacoes'] == 2
+    assert _patrimonios(conn) == ['A1', 'A2', 'A3', 'A4']
+    assert sum('SAVEPOINT lote_linha' in sql for sql in comandos) == 3
+
+def test_update_de_patrimonio_inexistente(conn, inserir):
+    inserir('A1')
+    inserir('A3')
+    linhas = _linhas(*({'patrimonio': p, 'usuario': 'maria'} for p in ('A1', 'A2', 'A3')))
+    resultado = processar_lote('update', linhas, conn=conn)
+
+    assert resultado['sucesso'] == 2
+    assert resultado['erros'] == ['Linha 3 (A2): Equipamento não encontrado']
+    assert [row[0] for row in conn.execute("SELECT usuario FROM equipamentos ORDER BY patrimonio")] == ['maria', 'maria']
+
+def test_tudo_ou_nada_desfaz_todos_os_blocos(conn, inserir):
+    inserir('A5')
+    resultado = processar_lote(
+        'create', _novos('A1', 'A2', 'A3', 'A4', 'A5'), tamanho_bloco=2, tudo_ou_nada=True, conn=conn)
+
+    assert resultado['revertido']
+    assert resultado['sucesso'] == 0
+    assert resultado['detalhes'] == []
+    assert resultado['transacoes'] == 0
+    assert len(resultado['erros']) == 1
+    assert _patrimonios(conn) == ['A5']
+    assert not conn.in_transaction
+
+def test_tudo_ou_nada_sem_erros_grava_em_uma_transacao(conn):
+    resultado = processar_lote('create', _novos('A1', 'A2', 'A3'), tamanho_bloco=1, tudo_ou_nada=True, conn=conn)
+
+    assert not resultado['revertido']
+    assert (resultado['sucesso'], resultado['transacoes']) == (3, 1)
+    assert _patrimonios(conn) == ['A1', 'A2', 'A3']
+
+def test_linha_invalida_nao_chega_ao_banco(conn):
+    linhas = _linhas({'patrimonio': 'A1', 'tipo': 'Notebook'}, {'patrimonio': 'A2'}, {'tipo': 'Monitor'})
+    resultado = processar_lote('create', linhas, conn=conn)
+
+    assert resultado['erros'] == ['Linha 3 (A2): Tipo é obrigatório para criação', 'Linha 4: Patrimônio obrigatório']
+    assert _patrimonios(conn) == ['A1']
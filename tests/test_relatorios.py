@@ -0,0 +1,29 @@
+# tests/test_relatorios.py - Relatório de centro de custo em cache
+from datetime import datetime
+
+import relatorios
+
+class _Relogio(datetime):
+    """datetime.now() sem fuso devolve o horário fixado no teste"""
+    agora = datetime(2026, 1, 1, 8, 0, 0)
+
+    @classmethod
+    def now(cls, tz=None):
+        return datetime.now(tz) if tz else cls.agora
+
+def test_data_geracao_e_da_resposta_mesmo_com_cache(inserir, monkeypatch):
+    inserir('PAT001', valor_locacao=150.0)
+    monkeypatch.setattr(relatorios, 'datetime', _Relogio)
+
+    primeiro = relatorios.obter_relatorio_centro_custo('TI')
+    _Relogio.agora = datetime(2026, 1, 1, 17, 30, 0)
+    segundo = relatorios.obter_relatorio_centro_custo('TI')
+
+    assert primeiro['data_geracao'] == '2026-01-01T08:00:00'
+    assert segundo['data_geracao'] == '2026-01-01T17:30:00'
+    # O restante veio do cache, sem recálculo
+    assert segundo['resumo_geral'] is primeiro['resumo_geral']
+    assert segundo['resumo_geral']['investimento_total'] == 150.0
+
+def test_centro_sem_equipamentos(conn):
+    assert relatorios.obter_relatorio_centro_custo('INEXISTENTE') is None
@@ -0,0 +1,58 @@
+# tests/test_resumos.py - Tabelas de resumo mantidas por triggers
+import random
+
+import pytest
+
+from lote import processar_lote
+from resumos import CALCULOS_RESUMO, verificar_resumos
+
+def _conteudo(conn, sql):
+    return sorted((tuple(row[:-2]), row[-2], round(row[-1], 2)) for row in conn.execute(sql))
+
+def _assert_igual_recontagem(conn):
+    for tabela, (colunas, sql_calculado) in CALCULOS_RESUMO.items():
+        assert _conteudo(conn, f"SELECT {colunas} FROM {tabela}") == _conteudo(conn, sql_calculado), tabela
+    assert verificar_resumos(conn) == []
+
+def test_resumos_acompanham_insercoes_alteracoes_e_exclusoes(conn, inserir):
+    sorteio = random.Random(7)
+    opcoes = {
+        'centro_custo': ['TI', 'RH', 'OBRA1', None],
+        'status': ['Em uso', 'Devolvido', 'Manutenção', None],
+        'tipo': ['Notebook', 'Monitor', 'Desktop', None],
+        'local_atual': ['Matriz', 'Filial', None],
+        'valor_locacao': [0.0, 99.9, 150.5, 1200.0, None],
+    }
+    ids = [inserir(f'PAT{i:03d}', **{c: sorteio.choice(v) for c, v in opcoes.items()}) for i in range(60)]
+    _assert_igual_recontagem(conn)
+
+    for _ in range(150):
+        coluna = sorteio.choice(list(opcoes))
+        with conn:
+            conn.execute(f"UPDATE equipamentos SET {coluna} = ? WHERE id = ?",
+                         (sorteio.choice(opcoes[coluna]), sorteio.choice(ids)))
+    with conn:
+        conn.execute("UPDATE equipamentos SET centro_custo = 'TI', valor_locacao = valor_locacao * 2 WHERE tipo = 'Monitor'")
+    _assert_igual_recontagem(conn)
+
+    for equipamento_id in sorteio.sample(ids, 25):
+        with conn:
+            conn.execute("DELETE FROM equipamentos WHERE id = ?", (equipamento_id,))
+    _assert_igual_recontagem(conn)
+
+def test_resumos_acompanham_carga_em_lote(conn, inserir):
+    inserir('PAT001', centro_custo='RH', valor_locacao=10.0)
+    linhas = [(2, {'patrimonio': 'PAT001', 'tipo': 'Monitor', 'centro_custo': 'OBRA1', 'valor_locacao': '55.5'}),
+              (3, {'patrimonio': 'PAT002', 'tipo': 'Desktop', 'status': 'Devolvido'})]
+    processar_lote('upsert', linhas, conn=conn)
+    _assert_igual_recontagem(conn)
+
+    processar_lote('delete', [(2, {'patrimonio': 'PAT001'})], conn=conn)
+    _assert_igual_recontagem(conn)
+
+@pytest.mark.parametrize('tabela', list(CALCULOS_RESUMO))
+def test_grupo_esvaziado_sai_do_resumo(conn, inserir, tabela):
+    equipamento_id = inserir('PAT001', centro_custo='UNICO', tipo='Único', local_atual='Único')
+    with conn:
+        conn.execute("DELETE FROM equipamentos WHERE id = ?", (equipamento_id,))
+    assert conn.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0] == 0
@@ -0,0 +1,93 @@
+# tests/test_tarefas_lote.py - Cargas em lote em segundo plano
+import io
+import os
+import time
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import tarefas_lote
+
+def _upload(*patrimonios):
+    conteudo = 'patrimonio,tipo,status\n' + ''.join(f'{p},Notebook,Em uso\n' for p in patrimonios)
+    return FileStorage(io.BytesIO(conteudo.encode('utf-8')), filename='carga.csv')
+
+def _aguardar(tarefa, limite=10.0):
+    fim = time.time() + limite
+    while not tarefa.concluida:
+        assert time.time() < fim, f'tarefa ainda {tarefa.status}'
+        time.sleep(0.01)
+    return tarefa
+
+@pytest.mark.skipif(tarefas_lote.fcntl is None, reason='trava entre processos depende de fcntl')
+def test_carga_espera_a_de_outro_processo(conn):
+    # Outro worker com a vez na fila: a trava é por arquivo aberto, então
+    # segurá-la aqui bloqueia a thread de cargas como um processo à parte
+    with tarefas_lote._vez_na_fila():
+        tarefa = tarefas_lote.criar_tarefa(_upload('PAT001', 'PAT002'), 'create')
+        time.sleep(0.2)
+        assert tarefa.status == 'na_fila'
+        assert conn.execute("SELECT COUNT(*) FROM equipamentos").fetchone()[0] == 0
+
+    _aguardar(tarefa)
+    assert (tarefa.status, tarefa.sucesso) == ('concluida', 2)
+    assert conn.execute("SELECT COUNT(*) FROM equipamentos").fetchone()[0] == 2
+
+def test_carga_pela_api_com_status_e_relatorio_de_erros(cliente, conn):
+    conteudo = 'patrimonio,tipo\nPAT001,Notebook\nPAT002,\nPAT003,Monitor\n'
+    resposta = cliente.post('/api/equipamentos/lote', data={
+        'file': (io.BytesIO(conteudo.encode('utf-8')), 'carga.csv'),
+        'acao': 'create',
+        'assincrono': '1',
+        'tamanho_bloco': '1',
+    })
+    assert resposta.status_code == 202
+    url = resposta.get_json()['status_url']
+
+    fim = time.time() + 10
+    while (tarefa := cliente.get(url).get_json()['tarefa'])['status'] not in ('concluida', 'falhou'):
+        assert time.time() < fim
+        time.sleep(0.01)
+
+    assert tarefa['status'] == 'concluida'
+    assert (tarefa['linhas_lidas'], tarefa['sucesso'], tarefa['total_erros']) == (3, 2, 1)
+    assert tarefa['transacoes'] == 2
+    assert tarefa['relatorio_erros']
+    assert tarefa['percentual'] == 100.0
+
+    erros = cliente.get(url + '/erros')
+    assert erros.status_code == 200
+    assert 'Linha 3 (PAT002): Tipo é obrigatório para criação' in erros.get_data(as_text=True)
+    assert [row[0] for row in conn.execute("SELECT patrimonio FROM equipamentos ORDER BY 1")] == ['PAT001', 'PAT003']
+
+def test_status_de_tarefa_de_outro_processo_vem_do_disco(conn):
+    tarefa = _aguardar(tarefas_lote.criar_tarefa(_upload('PAT001'), 'create'))
+    # Outro worker não tem a tarefa em memória, só o espelho em LOTES_DIR
+    del tarefas_lote._tarefas[tarefa.id]
+
+    copia = tarefas_lote.obter_tarefa(tarefa.id)
+    assert copia.para_dict()['status'] == 'concluida'
+    assert copia.sucesso == 1
+    assert [t.id for t in tarefas_lote.listar_tarefas()] == [tarefa.id]
+
+def test_csv_sem_patrimonio_nao_vira_tarefa(conn):
+    upload = FileStorage(io.BytesIO(b'tipo,status\nNotebook,Em uso\n'), filename='carga.csv')
+    with pytest.raises(ValueError):
+        tarefas_lote.criar_tarefa(upload, 'create')
+    assert os.listdir(tarefas_lote.LOTES_DIR) == []
+
+def test_recuperar_marca_interrompidas_como_falhou(conn):
+    concluida = _aguardar(tarefas_lote.criar_tarefa(_upload('PAT001'), 'create'))
+    interrompida = tarefas_lote.TarefaLote('update', 'grande.csv', False, 100)
+    interrompida.status = 'processando'
+    tarefas_lote._salvar_estado(interrompida)
+    with open(interrompida.caminho, 'w') as f:
+        f.write('patrimonio\n')
+
+    assert tarefas_lote.recuperar_tarefas() == {'interrompidas': 1, 'removidas': 0}
+
+    recuperada = tarefas_lote._carregar_estado(interrompida.id)
+    assert recuperada.status == 'falhou'
+    assert 'interrompida' in recuperada.mensagem
+    assert not os.path.exists(interrompida.caminho)
+    assert tarefas_lote._carregar_estado(concluida.id).status == 'concluida'
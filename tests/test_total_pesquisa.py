@@ -0,0 +1,73 @@
+# tests/test_total_pesquisa.py - Página e total exato da pesquisa no mesmo comando
+import pytest
+
+import database
+import models
+
+@pytest.fixture
+def base(inserir):
+    for i in range(30):
+        inserir(
+            f'PAT{i:03d}',
+            tipo=['Notebook', 'Monitor', 'Desktop'][i % 3],
+            status=['Em uso', 'Devolvido', 'Manutenção'][i % 3 if i % 2 else 0],
+            centro_custo=['TI', 'RH'][i % 2],
+            descritivo=['Notebook Lenovo', 'Monitor Dell', 'Desktop HP'][i % 3],
+            valor_locacao=float(10 * i),
+            data_recebimento=f'2026-{(i % 12) + 1:02d}-15',
+        )
+
+def _contar(conn, where, params):
+    return conn.execute(f"SELECT COUNT(*) FROM equipamentos WHERE {where}", params).fetchone()[0]
+
+CASOS = [
+    ({}, "1", []),
+    ({'tipo': 'Notebook'}, "tipo = ?", ['Notebook']),
+    ({'status': ['Em uso', 'Devolvido']}, "status IN (?, ?)", ['Em uso', 'Devolvido']),
+    ({'q': 'lenovo'}, "descritivo LIKE ?", ['%lenovo%']),
+    ({'valor_min': 50, 'valor_max': 150}, "valor_locacao BETWEEN 50 AND 150", []),
+    ({'centro_custo': 'TI', 'data_recebimento_inicio': '2026-06-01'},
+     "centro_custo = 'TI' AND data_recebimento >= '2026-06-01'", []),
+]
+
+@pytest.mark.parametrize('filtros, where, params', CASOS)
+@pytest.mark.parametrize('pagina', [1, 2, 9])
+def test_total_exato_com_filtros(conn, base, filtros, where, params, pagina):
+    esperado = _contar(conn, where, params)
+    linhas, total = models.buscar_equipamentos_avancado(filtros, pagina=pagina, por_pagina=4)
+
+    assert total == esperado
+    assert len(linhas) == max(0, min(4, esperado - (pagina - 1) * 4))
+    # As linhas continuam sendo só as colunas de equipamentos
+    if linhas:
+        assert 'total_filtrado' not in linhas[0].keys()
+
+def test_pagina_e_total_em_um_unico_comando(conn, base):
+    comandos = []
+    conexao = database.get_db_connection()
+    conexao.set_trace_callback(comandos.append)
+    try:
+        linhas, total = models.buscar_equipamentos_avancado({'tipo': 'Monitor'}, pagina=2, por_pagina=4)
+    finally:
+        conexao.set_trace_callback(None)
+
+    assert (len(linhas), total) == (4, 10)
+    contagens = [sql for sql in comandos if 'COUNT(*)' in sql]
+    assert len(contagens) == 1
+    assert 'LIMIT' in contagens[0] and 'OFFSET' in contagens[0]
+
+def test_total_estimado_para_no_limite(cliente, base, monkeypatch):
+    monkeypatch.setattr(models, 'LIMITE_CONTAGEM_ESTIMADA', 5)
+    monkeypatch.setattr('routes.LIMITE_CONTAGEM_ESTIMADA', 5)
+
+    url = '/api/equipamentos/pesquisa?por_pagina=4'
+    estimado = cliente.get(url + '&total=estimado').get_json()['paginacao']
+    pagina_3 = cliente.get(url + '&total=estimado&pagina=3').get_json()['paginacao']
+    perto_do_fim = cliente.get(url + '&total=estimado&pagina=8').get_json()['paginacao']
+    exato = cliente.get(url).get_json()['paginacao']
+
+    # Conta no máximo o limite a partir do início da página
+    assert (estimado['total'], estimado['total_exato']) == (5, False)
+    assert (pagina_3['total'], pagina_3['total_exato']) == (13, False)
+    assert (perto_do_fim['total'], perto_do_fim['total_exato']) == (30, True)
+    assert (exato['total'], exato['total_exato'], exato['total_paginas']) == (30, True, 8)